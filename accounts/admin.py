@@ -1,11 +1,176 @@
-from django.contrib import admin
-from .models import GuestProfile, Booking, Room
+from django.contrib import admin, messages
+
+from . import assignment
+from .models import (
+    GuestProfile, Booking, Room, DailyRoomTypeStats, DailyRoomTypeInventory, ProcedureCategory, Procedure,
+    Doctor, ScheduleSlot, Appointment, MedicalRecord, TreatmentEntry, EncryptedDocument, EmailOutbox,
+    Task, WaitlistEntry,
+)
+
+# Списки: связи подтягиваются JOIN-ом (list_select_related), без полного
+# COUNT по таблице (show_full_result_count), фильтры и date_hierarchy - по
+# индексированным полям (см. Meta.indexes в models.py). Так страница из
+# 100 строк стоит постоянное число запросов независимо от размера таблицы.
+
+
+class OptimizedAdmin(admin.ModelAdmin):
+    list_per_page = 100
+    show_full_result_count = False
+
 
 @admin.register(Room)
-class RoomAdmin(admin.ModelAdmin):
+class RoomAdmin(OptimizedAdmin):
     list_display = ['name', 'type', 'capacity', 'price_per_day', 'is_active']
     list_filter = ['type', 'is_active']
     search_fields = ['name', 'description']
 
-admin.site.register(GuestProfile)
-admin.site.register(Booking)
+
+@admin.register(GuestProfile)
+class GuestProfileAdmin(OptimizedAdmin):
+    list_display = ['last_name', 'first_name', 'user', 'phone', 'email', 'document_status',
+                    'is_profile_complete', 'created_at']
+    list_select_related = ['user']
+    list_filter = ['document_status']
+    date_hierarchy = 'created_at'
+    search_fields = ['last_name', 'first_name', 'email', 'phone', 'user__username']
+    autocomplete_fields = ['user', 'document_verified_by']
+    readonly_fields = ['passport_masked', 'snils_masked', 'created_at', 'updated_at']
+
+
+@admin.register(Booking)
+class BookingAdmin(OptimizedAdmin):
+    list_display = ['id', 'user', 'room', 'room_type', 'check_in', 'check_out', 'guests',
+                    'total_price', 'status', 'created_at']
+    list_select_related = ['user', 'room']
+    list_filter = ['status', 'room_type']
+    date_hierarchy = 'created_at'
+    search_fields = ['=id', 'user__username', 'room__name']
+    autocomplete_fields = ['user', 'room']
+    readonly_fields = ['total_price', 'room_auto_assigned', 'created_at']
+    actions = ['assign_rooms']
+
+    @admin.action(description='Подобрать номера (брони без номера)')
+    def assign_rooms(self, request, queryset):
+        result = assignment.assign_rooms(booking_ids=list(queryset.filter(room__isnull=True).values_list('pk', flat=True)))
+        self.message_user(request, f'Назначено номеров: {result.assigned}')
+        if result.unplaced:
+            self.message_user(request, f'Нет свободного номера для броней: '
+                                       f'{", ".join(map(str, result.unplaced))}', messages.WARNING)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(OptimizedAdmin):
+    list_display = ['id', 'user', 'room', 'room_type', 'check_in', 'check_out', 'guests', 'status',
+                    'offer_expires_at', 'created_at']
+    list_select_related = ['user', 'room']
+    list_filter = ['status', 'room_type']
+    search_fields = ['=id', 'user__username', 'room__name']
+    autocomplete_fields = ['user', 'room', 'offer']
+    readonly_fields = ['created_at']
+
+
+@admin.register(DailyRoomTypeStats)
+class DailyRoomTypeStatsAdmin(OptimizedAdmin):
+    list_display = ['date', 'room_type', 'rooms_total', 'booked_nights', 'arrivals', 'revenue']
+    list_filter = ['room_type']
+    date_hierarchy = 'date'
+
+
+@admin.register(DailyRoomTypeInventory)
+class DailyRoomTypeInventoryAdmin(OptimizedAdmin):
+    list_display = ['date', 'room_type', 'reserved']
+    list_filter = ['room_type']
+    date_hierarchy = 'date'
+
+
+@admin.register(ProcedureCategory)
+class ProcedureCategoryAdmin(OptimizedAdmin):
+    list_display = ['name', 'icon']
+    search_fields = ['name']
+
+
+@admin.register(Procedure)
+class ProcedureAdmin(OptimizedAdmin):
+    list_display = ['name', 'category', 'duration', 'price', 'is_active']
+    list_select_related = ['category']
+    list_filter = ['is_active', 'category']
+    search_fields = ['name']
+    autocomplete_fields = ['category']
+
+
+@admin.register(Doctor)
+class DoctorAdmin(OptimizedAdmin):
+    list_display = ['__str__', 'specialization', 'qualification', 'experience']
+    list_select_related = ['user']
+    search_fields = ['user__last_name', 'user__first_name', 'user__username', 'specialization']
+    autocomplete_fields = ['user', 'procedures']
+    readonly_fields = ['photo_hash']
+
+
+@admin.register(ScheduleSlot)
+class ScheduleSlotAdmin(OptimizedAdmin):
+    list_display = ['doctor', 'day_of_week', 'start_time', 'end_time', 'max_appointments']
+    list_select_related = ['doctor__user']
+    list_filter = ['day_of_week']
+    search_fields = ['doctor__user__last_name', 'doctor__user__username']
+    autocomplete_fields = ['doctor']
+
+
+@admin.register(Appointment)
+class AppointmentAdmin(OptimizedAdmin):
+    list_display = ['id', 'patient', 'procedure', 'doctor', 'appointment_date', 'appointment_time', 'status',
+                    'reminded_at']
+    list_select_related = ['patient', 'procedure', 'doctor__user']
+    list_filter = ['status']
+    date_hierarchy = 'appointment_date'
+    search_fields = ['=id', 'patient__last_name', 'procedure__name']
+    autocomplete_fields = ['patient', 'procedure', 'doctor', 'schedule_slot']
+
+
+@admin.register(MedicalRecord)
+class MedicalRecordAdmin(OptimizedAdmin):
+    list_display = ['patient', 'booking', 'admission_date', 'discharge_date', 'attending_doctor', 'is_active']
+    list_select_related = ['patient', 'booking__user', 'booking__room', 'attending_doctor__user']
+    list_filter = ['is_active']
+    date_hierarchy = 'admission_date'
+    ordering = ['-admission_date']
+    search_fields = ['patient__last_name', 'patient__first_name']
+    autocomplete_fields = ['patient', 'booking', 'attending_doctor']
+
+
+@admin.register(TreatmentEntry)
+class TreatmentEntryAdmin(OptimizedAdmin):
+    list_display = ['__str__', 'medical_record', 'performed_at', 'next_date']
+    list_select_related = ['appointment__procedure', 'medical_record__patient']
+    date_hierarchy = 'performed_at'
+    autocomplete_fields = ['medical_record', 'appointment']
+
+
+@admin.register(EncryptedDocument)
+class EncryptedDocumentAdmin(OptimizedAdmin):
+    """Только метаданные: зашифрованные данные и файл в админке не показываются"""
+    list_display = ['profile', 'document_type', 'masked_data', 'verified', 'uploaded_at', 'verified_by']
+    list_select_related = ['profile', 'verified_by']
+    list_filter = ['document_type', 'verified']
+    date_hierarchy = 'uploaded_at'
+    search_fields = ['profile__last_name', 'masked_data']
+    autocomplete_fields = ['profile', 'uploaded_by', 'verified_by']
+    exclude = ['encrypted_data', 'file_name']
+    readonly_fields = ['masked_data', 'original_name', 'content_type', 'file_size', 'file_sha256',
+                      'uploaded_at', 'verified_at']
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(OptimizedAdmin):
+    list_display = ['to', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to', 'dedup_key']
+    readonly_fields = ['dedup_key', 'attempts', 'last_error', 'created_at', 'sent_at']
+
+
+@admin.register(Task)
+class TaskAdmin(OptimizedAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'run_at', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['=id', 'name']
+    readonly_fields = ['attempts', 'locked_by', 'locked_until', 'last_error', 'created_at', 'finished_at']
@@ -0,0 +1,207 @@
+# accounts/assignment.py
+"""
+Автоматический подбор номера для броней без номера (room=NULL): старые
+брони, где был только тип (миграция 0004), и заявки "любой номер типа".
+
+Занятость номеров типа загружается одним запросом и держится в памяти:
+по каждому номеру - отсортированный список занятых периодов
+(availability.BusyIntervals). Брони раскладываются по дате заезда по
+принципу best-fit: из номеров, где период свободен и хватает мест,
+выбирается тот, где свободный промежуток вокруг брони самый короткий.
+Так брони закрывают "дыры" между другими бронями, а длинные свободные
+периоды остаются для длинных заездов. Результат пишется UPDATE-ами по
+группам броней, поэтому тысячи броней раскладываются за секунды.
+
+reoptimize=True раскладывает заново и будущие брони, номер которых уже
+был подобран автоматически (room_auto_assigned), - только между номерами
+с той же ценой: подтвержденная гостю сумма не меняется. Брони, номер
+которых выбрал гость или администратор, не двигаются.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from . import cache, events, rollups
+from .availability import ACTIVE_BOOKING_STATUSES, BusyIntervals
+from .models import Booking, Room
+
+# Промежуток, открытый с одной стороны, считается "бесконечно" длинным
+OPEN_GAP = 10 ** 6
+BATCH_SIZE = 500
+# Повторы, если между чтением и записью кто-то занял выбранный номер
+MAX_RETRIES = 3
+
+BOOKING_FIELDS = ('id', 'user_id', 'room_id', 'room_type', 'check_in', 'check_out', 'guests', 'status',
+                  'total_price', 'room_auto_assigned')
+
+
+class AssignmentConflict(Exception):
+    """Номер заняли другой бронью, пока шел подбор"""
+
+
+@dataclass
+class AssignmentResult:
+    assigned: int = 0       # получили номер впервые
+    moved: int = 0          # переложены в другой номер (reoptimize)
+    unplaced: list = field(default_factory=list)  # id броней, для которых номера нет
+    dry_run: bool = False
+
+
+def fit_score(gap, start, end):
+    """Чем меньше, тем плотнее бронь встает в свободный промежуток"""
+    previous_end, next_start = gap
+    left = (start - previous_end).days if previous_end else OPEN_GAP
+    right = (next_start - end).days if next_start else OPEN_GAP
+    return left + right, min(left, right)
+
+
+class RoomTimeline:
+    """Занятость номеров одного типа в памяти"""
+
+    def __init__(self, rooms, periods):
+        by_room = defaultdict(list)
+        for room_id, check_in, check_out in periods:
+            by_room[room_id].append((check_in, check_out))
+        # При равной плотности - меньший и более дешевый номер
+        self.rooms = sorted(rooms, key=lambda room: (room.capacity, room.price_per_day, room.name))
+        self.busy = {room.pk: BusyIntervals(by_room[room.pk]) for room in rooms}
+
+    def best_room(self, start, end, guests, total_price=None):
+        """total_price - только номера, где проживание стоит ровно столько же"""
+        best, best_score = None, None
+        for room in self.rooms:
+            if room.capacity < guests:
+                continue
+            if total_price is not None and room.price_per_day * (end - start).days != total_price:
+                continue
+            gap = self.busy[room.pk].gap(start, end)
+            if gap is None:
+                continue
+            score = fit_score(gap, start, end)
+            if best is None or score < best_score:
+                best, best_score = room, score
+        return best
+
+    def place(self, room, start, end):
+        self.busy[room.pk].add(start, end)
+
+
+def plan_room_type(room_type, today, reoptimize=False, booking_ids=None):
+    """
+    Раскладка броней одного типа: (список пар (бронь, номер), неразмещенные брони).
+    Ничего не пишет в базу.
+    """
+    rooms = list(Room.objects.filter(type=room_type, is_active=True))
+    active = Booking.objects.filter(status__in=ACTIVE_BOOKING_STATUSES, check_out__gt=today)
+
+    movable = Q(room__isnull=True)
+    if reoptimize:
+        movable |= Q(room_auto_assigned=True, check_in__gt=today)
+    pending = active.filter(movable, room_type=room_type)
+    if booking_ids is not None:
+        pending = pending.filter(pk__in=booking_ids)
+    pending = list(pending.only(*BOOKING_FIELDS))
+    if not pending:
+        return [], []
+
+    # Занятость номеров, кроме броней, которые раскладываем заново
+    pending_ids = {booking.pk for booking in pending}
+    periods = active.filter(room__in=rooms).values_list('pk', 'room_id', 'check_in', 'check_out')
+    timeline = RoomTimeline(rooms, [row[1:] for row in periods if row[0] not in pending_ids])
+
+    changes, unplaced = [], []
+    # По дате заезда, при равной - сначала длинные
+    for booking in sorted(pending, key=lambda b: (b.check_in, -b.days, b.pk)):
+        # Уже размещенную бронь - только в номер с той же ценой
+        total_price = booking.total_price if booking.room_id else None
+        room = timeline.best_room(booking.check_in, booking.check_out, booking.guests, total_price)
+        if room is None:
+            unplaced.append(booking)
+            continue
+        timeline.place(room, booking.check_in, booking.check_out)
+        if room.pk != booking.room_id:
+            changes.append((booking, room))
+    return changes, unplaced
+
+
+def apply_changes(changes):
+    """Записывает номера одной транзакцией; проверяет, что их не заняли за время подбора"""
+    previous = [rollups.booking_stay(booking) for booking, _ in changes]
+    previous_states = [events.booking_state(booking) for booking, _ in changes]
+    room_ids = set()
+    bookings = []
+    for booking, room in changes:
+        room_ids.update((booking.room_id, room.pk))
+        if booking.room_id is None:
+            # Как в Booking.save: цена по номеру, а не по запасной цене типа.
+            # Перенесенная бронь (reoptimize) уже стоит столько же (plan_room_type)
+            booking.total_price = room.price_per_day * booking.days
+        booking.room = room
+        booking.room_auto_assigned = True
+        bookings.append(booking)
+    room_ids.discard(None)
+
+    # Транзакция начинается с записи (в SQLite транзакция, начатая с SELECT,
+    # при конкурентной записи получает "database is locked")
+    # Брони с одинаковым номером и ценой - одним UPDATE: это быстрее
+    # bulk_update, который строит CASE на каждую строку
+    groups = defaultdict(list)
+    for booking in bookings:
+        groups[(booking.room_id, booking.total_price)].append(booking.pk)
+
+    with transaction.atomic():
+        for (room_id, total_price), ids in groups.items():
+            for index in range(0, len(ids), BATCH_SIZE):
+                Booking.objects.filter(pk__in=ids[index:index + BATCH_SIZE]).update(
+                    room_id=room_id, room_auto_assigned=True, total_price=total_price,
+                )
+        overlapping = Booking.objects.filter(
+            room=OuterRef('room'), status__in=ACTIVE_BOOKING_STATUSES,
+            check_in__lt=OuterRef('check_out'), check_out__gt=OuterRef('check_in'),
+        ).exclude(pk=OuterRef('pk'))
+        for index in range(0, len(bookings), BATCH_SIZE):
+            batch = [booking.pk for booking in bookings[index:index + BATCH_SIZE]]
+            if Booking.objects.filter(pk__in=batch).filter(Exists(overlapping)).exists():
+                raise AssignmentConflict()
+
+        rollups.apply_booking_changes(
+            [(stay, rollups.booking_stay(booking)) for stay, booking in zip(previous, bookings)]
+        )
+        cache.bump_on_commit(*(cache.room_bookings(room_id) for room_id in room_ids))
+        # UPDATE не вызывает сигналы: подписчики SSE узнают о переносах отсюда
+        events.publish_changes_on_commit(
+            [(state, events.booking_state(booking)) for state, booking in zip(previous_states, bookings)]
+        )
+
+
+def assign_rooms(room_type=None, reoptimize=False, dry_run=False, booking_ids=None):
+    """
+    Подбирает номера броням без номера (и, при reoptimize, перекладывает
+    автоматически подобранные будущие брони). booking_ids - только эти брони.
+    """
+    room_types = [room_type] if room_type else [value for value, _ in Room.TYPE_CHOICES]
+    for attempt in range(MAX_RETRIES):
+        today = date.today()
+        result = AssignmentResult(dry_run=dry_run)
+        changes = []
+        for current_type in room_types:
+            type_changes, unplaced = plan_room_type(current_type, today, reoptimize, booking_ids)
+            if any(booking.room_id for booking in unplaced):
+                # Новая раскладка потеряла бы уже размещенную бронь - оставляем старую
+                type_changes, unplaced = plan_room_type(current_type, today, False, booking_ids)
+            changes += type_changes
+            result.unplaced += [booking.pk for booking in unplaced]
+            result.assigned += sum(1 for booking, _ in type_changes if booking.room_id is None)
+            result.moved += sum(1 for booking, _ in type_changes if booking.room_id is not None)
+
+        if dry_run or not changes:
+            return result
+        try:
+            apply_changes(changes)
+            return result
+        except AssignmentConflict:
+            if attempt == MAX_RETRIES - 1:
+                raise
@@ -0,0 +1,193 @@
+# accounts/availability.py
+"""
+Общая логика API доступности номеров.
+
+Используется и синхронными представлениями (views.py), и асинхронными
+(views_async.py): здесь только разбор параметров, построение запросов и
+формирование ответа, а выполнение запросов остается за представлением.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from .models import Booking
+
+# Статусы, при которых номер считается занятым
+ACTIVE_BOOKING_STATUSES = ['pending', 'confirmed']
+
+# На сколько дней вперед отдаем занятые даты
+BUSY_DATES_DAYS = 90
+
+
+class ApiError(Exception):
+    """Ошибка запроса к API: текст и HTTP-статус ответа"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def payload(self):
+        return {'success': False, 'error': self.message}
+
+
+def int_param(value, name, low, high):
+    """Целое из GET-параметра в [low, high], иначе ApiError (str.isdigit пропускает '²')"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    if number is None or not low <= number <= high:
+        raise ApiError(f'{name} - число от {low} до {high}')
+    return number
+
+
+class BusyIntervals:
+    """Занятые периоды номера: слитые полуинтервалы [начало, конец), по возрастанию"""
+
+    def __init__(self, periods):
+        self.starts, self.ends = [], []
+        for start, end in sorted(periods):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def is_free(self, start, end):
+        # Первый период, который заканчивается позже start
+        index = bisect_right(self.ends, start)
+        return index == len(self.starts) or self.starts[index] >= end
+
+    def gap(self, start, end):
+        """
+        Свободный промежуток, в который попадает [start, end): (конец
+        предыдущего периода, начало следующего), None - с этой стороны
+        свободно без ограничений. Если период занят - None.
+        """
+        index = bisect_right(self.ends, start)
+        if index < len(self.starts) and self.starts[index] < end:
+            return None
+        return (self.ends[index - 1] if index else None,
+                self.starts[index] if index < len(self.starts) else None)
+
+    def add(self, start, end):
+        """Добавляет свободный (проверенный is_free) период"""
+        index = bisect_right(self.ends, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+
+
+def parse_availability_params(params):
+    """Разбирает room_id, check_in, check_out из GET-параметров"""
+    room_id = params.get('room_id')
+    check_in_str = params.get('check_in')
+    check_out_str = params.get('check_out')
+
+    if not all([room_id, check_in_str, check_out_str]):
+        raise ApiError('Необходимы параметры: room_id, check_in, check_out')
+
+    if not str(room_id).isdecimal():
+        raise ApiError('Неверный параметр room_id')
+
+    try:
+        check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
+        check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+    except ValueError as e:
+        raise ApiError(f'Неверный формат даты: {str(e)}')
+
+    return room_id, check_in, check_out
+
+
+def validate_stay(check_in, check_out):
+    """Проверка корректности дат (ответ с кодом 200, как и раньше)"""
+    if check_in >= check_out:
+        raise ApiError('Дата выезда должна быть позже даты заезда', status=200)
+
+    if check_in < datetime.now().date():
+        raise ApiError('Нельзя бронировать на прошедшую дату', status=200)
+
+
+def availability_request(params):
+    """
+    Параметры проверки доступности для sync и async представлений: разбор,
+    затем проверка дат, и только потом представление ищет номер. Порядок
+    один, поэтому одинаковый запрос получает одинаковый ответ под WSGI и ASGI.
+    """
+    room_id, check_in, check_out = parse_availability_params(params)
+    validate_stay(check_in, check_out)
+    return room_id, check_in, check_out
+
+
+def overlapping_bookings(room_id, check_in, check_out):
+    """Активные брони номера, пересекающиеся с периодом"""
+    return Booking.objects.filter(
+        room_id=room_id,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        check_in__lt=check_out,
+        check_out__gt=check_in
+    )
+
+
+def availability_payload(room, check_in, check_out, is_available):
+    days = (check_out - check_in).days
+    total_price = room.price_per_day * days
+
+    return {
+        'success': True,
+        'room': {
+            'id': room.id,
+            'name': room.name,
+            'type': room.get_type_display(),
+            'capacity': room.capacity
+        },
+        'check_in': check_in.isoformat(),
+        'check_out': check_out.isoformat(),
+        'days': days,
+        'price_per_day': float(room.price_per_day),
+        'total_price': float(total_price),
+        'available': is_available,
+        'message': 'Номер доступен' if is_available else 'Номер занят на выбранные даты'
+    }
+
+
+def busy_dates_window():
+    """Период, за который отдаем занятые даты"""
+    today = datetime.now().date()
+    return today, today + timedelta(days=BUSY_DATES_DAYS)
+
+
+def busy_periods_queryset(room_id, date_from, date_to):
+    """Занятые периоды номера (только нужные поля, без экземпляров моделей)"""
+    return Booking.objects.filter(
+        room_id=room_id,
+        status__in=ACTIVE_BOOKING_STATUSES,
+        check_out__gte=date_from,
+        check_in__lte=date_to
+    ).order_by('check_in').values_list('check_in', 'check_out', 'status', 'guests')
+
+
+def busy_period(row):
+    check_in, check_out, status, guests = row
+    return {
+        'start': check_in.isoformat(),
+        'end': check_out.isoformat(),
+        'status': status,
+        'guests': guests
+    }
+
+
+def busy_dates_payload(room, busy_periods, date_from, date_to):
+    return {
+        'success': True,
+        'room_id': room.id,
+        'room_name': room.name,
+        'busy_periods': busy_periods,
+        'period': {
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat()
+        }
+    }
+
+
+def room_not_found():
+    return ApiError('Номер не найден', status=404)
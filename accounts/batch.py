@@ -0,0 +1,111 @@
+# accounts/batch.py
+"""
+Пакетный запрос к API: несколько GET-запросов /accounts/api/* одним POST.
+
+Страница бронирования (и мобильное приложение) получает занятые даты,
+доступность и цену за один сетевой обмен вместо нескольких. Подзапросы
+выполняются по очереди в том же процессе теми же представлениями, что
+и отдельные запросы (с их проверками доступа и кешем), на одном
+соединении с базой и внутри одной транзакции, поэтому все ответы видят
+один и тот же снимок данных.
+
+Тело запроса: {"requests": [{"id": "busy", "path": "/accounts/api/..."}, ...]}
+Ответ: {"success": true, "responses": [{"id": ..., "status": 200, "body": {...}}, ...]}
+"""
+import copy
+import json
+from inspect import iscoroutinefunction
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404, QueryDict
+from django.urls import Resolver404, get_script_prefix, resolve
+from django.utils.datastructures import MultiValueDict
+
+from .availability import ApiError
+
+MAX_REQUESTS = 10
+BATCH_URL_NAME = 'api_batch'
+
+
+def parse_batch(body):
+    """Подзапросы из JSON-тела: список пар (id, путь)"""
+    try:
+        data = json.loads(body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError('Тело запроса - не JSON')
+
+    requests = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(requests, list) or not requests:
+        raise ApiError('Необходим непустой список requests')
+    if len(requests) > MAX_REQUESTS:
+        raise ApiError(f'Не больше {MAX_REQUESTS} подзапросов')
+
+    items = []
+    for index, item in enumerate(requests):
+        path = item.get('path') if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise ApiError(f'Подзапрос {index}: необходим path от корня сайта')
+        items.append((item.get('id', index), path))
+    return items
+
+
+def sub_request(request, path):
+    """Копия запроса для GET path: тот же пользователь, сессия и заголовки"""
+    url = urlsplit(path)
+    prefix = get_script_prefix()
+    sub = copy.copy(request)
+    sub.method = 'GET'
+    sub.path = url.path
+    sub.path_info = '/' + url.path[len(prefix):] if url.path.startswith(prefix) else url.path
+    sub.META = {**request.META, 'REQUEST_METHOD': 'GET', 'PATH_INFO': sub.path_info,
+                'QUERY_STRING': url.query}
+    sub.GET = QueryDict(url.query)
+    sub._post, sub._files = QueryDict(), MultiValueDict()
+    return sub
+
+
+def run_one(request, path):
+    """Выполняет подзапрос: (статус, ответ или None)"""
+    sub = sub_request(request, path)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return 404, None
+    if not (match.url_name or '').startswith('api_') or match.url_name == BATCH_URL_NAME:
+        return 400, None
+
+    sub.resolver_match = match
+    view = match.func
+    # Под ASGI API обслуживается async-представлениями (views_async.py)
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(sub, *match.args, **match.kwargs)
+    except Http404:
+        return 404, None
+    except PermissionDenied:
+        return 403, None
+    return response.status_code, response
+
+
+def entry(item_id, status, response):
+    """Элемент списка responses; JSON подответа вставляется без повторного разбора"""
+    head = {'id': item_id, 'status': status}
+    if response is not None and 300 <= status < 400 and response.has_header('Location'):
+        # Например, перенаправление на вход для API, которому нужна авторизация
+        head['location'] = response['Location']
+    body = b'null'
+    if (response is not None and not response.streaming and response.content
+            and response.get('Content-Type', '').startswith('application/json')):
+        body = response.content
+    return json.dumps(head, ensure_ascii=False)[:-1].encode() + b',"body":' + body + b'}'
+
+
+def run_batch(request, items):
+    """Выполняет подзапросы в одной транзакции; готовый JSON ответа в байтах"""
+    with transaction.atomic():
+        entries = [entry(item_id, *run_one(request, path)) for item_id, path in items]
+    return b'{"success":true,"responses":[' + b','.join(entries) + b']}'
@@ -0,0 +1,159 @@
+# accounts/benchmarking.py
+"""
+Простой нагрузочный клиент для команд бенчмарков.
+
+Каждый поток держит свое keep-alive соединение (http.client) и
+выполняет запросы из общей очереди; результат - задержки и ошибки.
+"""
+import http.client
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+
+
+@dataclass
+class LoadResult:
+    """Результат прогона одного сценария"""
+    name: str
+    concurrency: int
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def requests(self):
+        return len(self.latencies) + self.errors
+
+    @property
+    def rps(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rps': round(self.rps, 1),
+            'p50_ms': round(self.percentile(50), 2),
+            'p95_ms': round(self.percentile(95), 2),
+            'p99_ms': round(self.percentile(99), 2),
+            **self.extra,
+        }
+
+
+def run_load(base_url, requests, concurrency, name='', headers=None, method='GET', body=None):
+    """
+    Выполняет запросы в concurrency потоков.
+    Элемент requests - путь или словарь {'path', 'method', 'body', 'headers'}
+    (заголовки дополняют общие). Ответ с кодом >= 400 считается ошибкой.
+    """
+    parts = urlsplit(base_url)
+    headers = headers or {}
+    jobs = queue.Queue()
+    for item in requests:
+        if isinstance(item, str):
+            jobs.put((method, item, body, headers))
+        else:
+            jobs.put((item.get('method', method), item['path'], item.get('body', body),
+                      {**headers, **item.get('headers', {})}))
+
+    result = LoadResult(name=name or base_url, concurrency=concurrency)
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        latencies, errors = [], 0
+        while True:
+            try:
+                request_method, path, request_body, request_headers = jobs.get_nowait()
+            except queue.Empty:
+                break
+            started = time.perf_counter()
+            try:
+                conn.request(request_method, path, body=request_body, headers=request_headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        conn.close()
+        with lock:
+            result.latencies.extend(latencies)
+            result.errors += errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def create_session(user):
+    """Сессия пользователя без пароля - для запросов к закрытым страницам"""
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def start_server(args, port, env=None):
+    """Запускает сервер (uvicorn/gunicorn/runserver) и ждет открытия порта"""
+    process = subprocess.Popen([sys.executable, *args], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if not wait_for_port(port):
+        process.kill()
+        error = process.stderr.read().decode(errors='replace')[-2000:]
+        raise RuntimeError(f'Сервер не запустился: {" ".join(args)}\n{error}')
+    return process
+
+
+def format_table(rows, columns):
+    """Текстовая таблица для вывода в консоль"""
+    widths = [max(len(str(col)), *(len(str(row.get(col, ''))) for row in rows)) for col in columns]
+    lines = ['  '.join(str(col).ljust(w) for col, w in zip(columns, widths))]
+    lines.append('  '.join('-' * w for w in widths))
+    for row in rows:
+        lines.append('  '.join(str(row.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
+    return '\n'.join(lines)
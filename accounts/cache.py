@@ -0,0 +1,145 @@
+# accounts/cache.py
+"""
+Кеш с версиями по пространствам имен.
+
+Ключ кеша включает версию пространства имен ("rooms", "room:5:bookings",
+"procedure_catalog", "doctors", "inventory"). Версии хранятся
+в общем SQLite-файле (settings.CACHE_VERSION_DB), поэтому увеличение версии
+в одном процессе gunicorn сразу делает недоступными старые записи во всех
+остальных, даже если сам кеш локальный (LocMemCache). Версии увеличиваются сигналами
+post_save/post_delete (см. signals.py).
+"""
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+DEFAULT_TIMEOUT = 300
+
+
+# Пространства имен
+
+ROOMS = 'rooms'
+PROCEDURE_CATALOG = 'procedure_catalog'
+INVENTORY = 'inventory'
+DOCTORS = 'doctors'
+
+
+def room_bookings(room_id):
+    return f'room:{room_id}:bookings'
+
+
+# Хранилище версий
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(str(settings.CACHE_VERSION_DB), timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_versions '
+            '(namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+        )
+        _local.conn = conn
+    return conn
+
+
+def get_versions(namespaces):
+    """Текущие версии пространств имен (отсутствующие - 1)"""
+    namespaces = list(namespaces)
+    placeholders = ','.join('?' * len(namespaces))
+    rows = _connection().execute(
+        f'SELECT namespace, version FROM cache_versions WHERE namespace IN ({placeholders})',
+        namespaces
+    ).fetchall()
+    found = dict(rows)
+    return [found.get(namespace, 1) for namespace in namespaces]
+
+
+def bump(*namespaces):
+    """
+    Инвалидирует все записи пространств имен во всех процессах.
+    Внутри транзакции вызывайте через bump_on_commit().
+    """
+    conn = _connection()
+    with _stats_lock:
+        _stats['bumps'] += len(namespaces)
+    for namespace in namespaces:
+        conn.execute(
+            'INSERT INTO cache_versions (namespace, version) VALUES (?, 2) '
+            'ON CONFLICT(namespace) DO UPDATE SET version = version + 1',
+            (namespace,)
+        )
+
+
+def bump_on_commit(*namespaces):
+    """Увеличивает версии после коммита, чтобы кеш не заполнился старыми данными"""
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+# Чтение через кеш
+
+def make_key(namespaces, key):
+    if isinstance(namespaces, str):
+        namespaces = [namespaces]
+    versions = get_versions(namespaces)
+    tag = '|'.join(f'{ns}@{v}' for ns, v in zip(namespaces, versions))
+    return f'{tag}:{key}'
+
+
+def _record(namespaces, hit):
+    # Счетчики по виду пространства имен ("room:bookings"), а не по каждому id
+    namespace = namespaces if isinstance(namespaces, str) else namespaces[0]
+    label = re.sub(r':\d+', '', namespace)
+    with _stats_lock:
+        _stats[(label, 'hit' if hit else 'miss')] += 1
+
+
+def cached(namespaces, key, builder, timeout=DEFAULT_TIMEOUT):
+    """Возвращает значение из кеша или строит его через builder()"""
+    cache = caches['default']
+    full_key = make_key(namespaces, key)
+    value = cache.get(full_key)
+    _record(namespaces, value is not None)
+    if value is None:
+        value = builder()
+        cache.set(full_key, value, timeout)
+    return value
+
+
+async def acached(namespaces, key, builder, timeout=DEFAULT_TIMEOUT):
+    """То же для async-представлений; builder - корутина"""
+    cache = caches['default']
+    # Версии читаются из sqlite3 синхронно - не в цикле событий
+    full_key = await sync_to_async(make_key)(namespaces, key)
+    value = await cache.aget(full_key)
+    _record(namespaces, value is not None)
+    if value is None:
+        value = await builder()
+        await cache.aset(full_key, value, timeout)
+    return value
+
+
+def cache_stats():
+    """Счетчики текущего процесса: попадания/промахи по пространствам имен"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    namespaces = {}
+    for item, count in snapshot.items():
+        if isinstance(item, tuple):
+            namespace, kind = item
+            namespaces.setdefault(namespace, {'hit': 0, 'miss': 0})[kind] = count
+    for counts in namespaces.values():
+        total = counts['hit'] + counts['miss']
+        counts['hit_rate'] = round(counts['hit'] / total, 3) if total else 0.0
+    return {'namespaces': namespaces, 'bumps': snapshot.get('bumps', 0)}
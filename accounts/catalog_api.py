@@ -0,0 +1,255 @@
+# accounts/catalog_api.py
+"""
+JSON API справочников для мобильного приложения: /accounts/api/v1/<ресурс>/.
+
+Ресурсы - номера, категории процедур, процедуры и врачи. Строки читаются
+через values_list (без экземпляров моделей), и только столбцы выбранных
+полей (?fields=name,price): join к связанной таблице делается, только если
+запрошено поле из нее. Преобразователи Decimal/date выбираются один раз
+по типу поля модели, а не проверкой каждого значения при сериализации.
+
+Страницы - по курсору (id последней записи), а не по OFFSET: следующая
+страница - это WHERE id > курсор, и ее стоимость не растет с номером.
+Готовый JSON кешируется в пространствах имен ресурса, поэтому после
+изменения справочника все процессы отдают новую версию.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import models
+
+from . import cache
+from .availability import ApiError, int_param
+from .images import variant_url, variant_widths
+from .models import Doctor, Procedure, ProcedureCategory, Room
+
+VERSION = 'v1'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+# Преобразование значений
+
+def decimal_value(value):
+    return None if value is None else float(value)
+
+
+def isoformat(value):
+    return None if value is None else value.isoformat()
+
+
+def media_url(value):
+    return f'{settings.MEDIA_URL}{value}' if value else None
+
+
+def variant_urls(content_hash):
+    """Уменьшенные копии фото (images.py): {ширина: url}"""
+    if not content_hash:
+        return None
+    return {width: variant_url(content_hash, width) for width in variant_widths()}
+
+
+def choice_label(choices):
+    labels = dict(choices)
+    return labels.get
+
+
+def full_name(first_name, last_name):
+    return f'{first_name} {last_name}'.strip()
+
+
+def model_field(model, lookup):
+    """Поле модели по пути values_list ("category__name")"""
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def converter_for(field):
+    """Преобразователь для JSON по типу поля модели (None - значение как есть)"""
+    if isinstance(field, models.DecimalField):
+        return decimal_value
+    if isinstance(field, (models.DateField, models.TimeField)):
+        # DateTimeField - подкласс DateField
+        return isoformat
+    if isinstance(field, models.FileField):
+        return media_url
+    return None
+
+
+# Описание ресурсов
+
+@dataclass(frozen=True)
+class Field:
+    lookups: tuple = ()        # столбцы values_list; пусто - поле по имени
+    convert: object = None     # функция от значений lookups; None - по типу поля модели
+    related: object = None     # функция (ids) -> {id: значение}: отдельный запрос на страницу
+
+
+class Resource:
+    def __init__(self, queryset, namespaces, fields):
+        self.queryset = queryset
+        self.namespaces = namespaces
+        self.model = queryset.model
+        self.fields = {}
+        for name, spec in fields.items():
+            spec = spec or Field()
+            lookups = spec.lookups or (name,)
+            convert = spec.convert
+            if convert is None and not spec.related and len(lookups) == 1:
+                convert = converter_for(model_field(self.model, lookups[0]))
+            self.fields[name] = Field(lookups=() if spec.related else lookups, convert=convert,
+                                      related=spec.related)
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(self.fields)}')
+        # Порядок и повторы не влияют на ответ и ключ кеша
+        return [name for name in self.fields if name in names]
+
+    def page(self, names, after, limit):
+        """Строки страницы и id последней, если есть следующая"""
+        lookups = ['pk']
+        plan = []
+        for name in names:
+            spec = self.fields[name]
+            if spec.related:
+                plan.append((name, None, spec))
+                continue
+            start = len(lookups)
+            lookups.extend(spec.lookups)
+            plan.append((name, slice(start, len(lookups)), spec))
+
+        queryset = self.queryset.order_by('pk')
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+        rows = list(queryset.values_list(*lookups)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        ids = [row[0] for row in rows]
+        related = {name: spec.related(ids) for name, _, spec in plan if spec.related}
+        data = []
+        for row in rows:
+            item = {}
+            for name, columns, spec in plan:
+                if columns is None:
+                    item[name] = related[name].get(row[0], [])
+                    continue
+                values = row[columns]
+                item[name] = spec.convert(*values) if spec.convert else values[0]
+            data.append(item)
+        return data, (ids[-1] if has_more else None)
+
+
+def doctor_procedures(doctor_ids):
+    through = Doctor.procedures.through
+    result = {}
+    rows = through.objects.filter(doctor_id__in=doctor_ids).order_by('procedure_id') \
+        .values_list('doctor_id', 'procedure_id')
+    for doctor_id, procedure_id in rows:
+        result.setdefault(doctor_id, []).append(procedure_id)
+    return result
+
+
+RESOURCES = {
+    'rooms': Resource(Room.objects.filter(is_active=True), [cache.ROOMS], {
+        'id': None,
+        'name': None,
+        'type': None,
+        'type_name': Field(('type',), choice_label(Room.TYPE_CHOICES)),
+        'capacity': None,
+        'price_per_day': None,
+        'description': None,
+        'image': None,
+        'image_variants': Field(('image_hash',), variant_urls),
+    }),
+    'categories': Resource(ProcedureCategory.objects.all(), [cache.PROCEDURE_CATALOG], {
+        'id': None,
+        'name': None,
+        'description': None,
+        'icon': None,
+    }),
+    'procedures': Resource(Procedure.objects.filter(is_active=True), [cache.PROCEDURE_CATALOG], {
+        'id': None,
+        'name': None,
+        'category': Field(('category_id',)),
+        'category_name': Field(('category__name',)),
+        'description': None,
+        'duration': None,
+        'price': None,
+        'contraindications': None,
+        'preparation': None,
+    }),
+    'doctors': Resource(Doctor.objects.all(), [cache.DOCTORS, cache.PROCEDURE_CATALOG], {
+        'id': None,
+        'name': Field(('user__first_name', 'user__last_name'), full_name),
+        'specialization': None,
+        'qualification': None,
+        'experience': None,
+        'bio': None,
+        'photo': None,
+        'photo_variants': Field(('photo_hash',), variant_urls),
+        'procedures': Field(related=doctor_procedures),
+    }),
+}
+
+
+# Параметры и ответ
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        pk = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        pk = ''
+    if not pk.isdecimal():
+        raise ApiError('Неверный cursor')
+    return int(pk)
+
+
+def get_resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise ApiError(f'Неизвестный ресурс. Доступны: {", ".join(RESOURCES)}', status=404)
+
+
+def parse_catalog_params(resource, params):
+    """Поля, курсор и размер страницы из GET-параметров"""
+    names = resource.parse_fields(params.get('fields'))
+    after = decode_cursor(params['cursor']) if params.get('cursor') else None
+    limit = int_param(params.get('limit') or DEFAULT_LIMIT, 'limit', 1, MAX_LIMIT)
+    return names, after, limit
+
+
+def render_page(resource_name, names, after, limit):
+    """Готовый ответ: (JSON в байтах, ETag); кешируется до изменения справочника"""
+    resource = get_resource(resource_name)
+
+    def build():
+        data, last = resource.page(names, after, limit)
+        body = json.dumps({
+            'success': True,
+            'version': VERSION,
+            'resource': resource_name,
+            'fields': names,
+            'data': data,
+            'next_cursor': encode_cursor(last) if last is not None else None,
+        }, ensure_ascii=False, separators=(',', ':')).encode()
+        return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+    key = f'catalog_api:{VERSION}:{resource_name}:{",".join(names)}:{after}:{limit}'
+    return cache.cached(resource.namespaces, key, build)
@@ -1,15 +1,223 @@
 # accounts/encryption.py
+import base64
+import hashlib
+import hmac
+import os
+
+from django.conf import settings
+
+
+class EncryptionError(ValueError):
+    """Шифротекст поврежден или зашифрован неизвестным ключом"""
+
+
 class EncryptionService:
-    """Простой сервис шифрования для тестирования"""
+    """
+    Сервис шифрования с версионированием ключей.
+
+    Формат шифротекста: ``ENCRYPTED:v<версия>:<base64(nonce | данные | тег)>``.
+    Ключи берутся из settings.ENCRYPTION_KEYS (версия -> секрет), новые данные
+    шифруются версией settings.ENCRYPTION_KEY_VERSION. Старый формат
+    ``ENCRYPTED:<открытый текст>`` читается как версия 0.
+    """
+
+    PREFIX = 'ENCRYPTED:'
+    NONCE_SIZE = 16
+    TAG_SIZE = 16
+    BLOCK_SIZE = 32  # Размер блока SHA-256
 
     @staticmethod
-    def encrypt(data):
-        """Заглушка для шифрования"""
-        return f"ENCRYPTED:{data}" if data else None
+    def get_keys():
+        return getattr(settings, 'ENCRYPTION_KEYS', {})
 
     @staticmethod
-    def decrypt(encrypted_data):
-        """Заглушка для дешифрования"""
-        if encrypted_data and encrypted_data.startswith("ENCRYPTED:"):
-            return encrypted_data[10:]
-        return encrypted_data
\ No newline at end of file
+    def current_version():
+        return getattr(settings, 'ENCRYPTION_KEY_VERSION', 1)
+
+    @classmethod
+    def _derive(cls, version, keys):
+        """Ключи шифрования и подписи для версии"""
+        try:
+            secret = keys[version]
+        except KeyError:
+            raise EncryptionError(f'Неизвестная версия ключа: {version}')
+        secret = secret.encode() if isinstance(secret, str) else secret
+        return (hashlib.sha256(b'enc:' + secret).digest(),
+                hashlib.sha256(b'mac:' + secret).digest())
+
+    @classmethod
+    def _keystream_xor(cls, enc_key, nonce, data, offset=0):
+        """XOR данных с потоком HMAC-SHA256(nonce | счетчик), начиная с байта offset"""
+        if not data:
+            return b''
+        first = offset // cls.BLOCK_SIZE
+        skip = offset % cls.BLOCK_SIZE
+        last = (offset + len(data) - 1) // cls.BLOCK_SIZE
+        stream = bytearray()
+        for i in range(first, last + 1):
+            stream += hmac.new(enc_key, nonce + i.to_bytes(8, 'big'), hashlib.sha256).digest()
+        size = len(data)
+        mixed = int.from_bytes(data, 'big') ^ int.from_bytes(stream[skip:skip + size], 'big')
+        return mixed.to_bytes(size, 'big')
+
+    @classmethod
+    def _tag(cls, mac_key, version, nonce, ciphertext):
+        header = f'v{version}:'.encode()
+        return hmac.new(mac_key, header + nonce + ciphertext, hashlib.sha256).digest()[:cls.TAG_SIZE]
+
+    @classmethod
+    def key_version(cls, encrypted_data):
+        """Версия ключа, которым зашифрованы данные (0 - старый формат)"""
+        if not encrypted_data or not encrypted_data.startswith(cls.PREFIX):
+            return None
+        body = encrypted_data[len(cls.PREFIX):]
+        version, sep, _ = body.partition(':')
+        if sep and version.startswith('v') and version[1:].isdigit():
+            return int(version[1:])
+        return 0
+
+    @classmethod
+    def encrypt(cls, data, version=None, keys=None):
+        """Шифрует строку текущим (или указанным) ключом"""
+        if not data:
+            return None
+        keys = cls.get_keys() if keys is None else keys
+        version = cls.current_version() if version is None else version
+        enc_key, mac_key = cls._derive(version, keys)
+
+        nonce = os.urandom(cls.NONCE_SIZE)
+        ciphertext = cls._keystream_xor(enc_key, nonce, data.encode('utf-8'))
+        tag = cls._tag(mac_key, version, nonce, ciphertext)
+        payload = base64.b64encode(nonce + ciphertext + tag).decode('ascii')
+        return f"{cls.PREFIX}v{version}:{payload}"
+
+    @classmethod
+    def decrypt(cls, encrypted_data, keys=None):
+        """Дешифрует строку ключом той версии, которой она зашифрована"""
+        version = cls.key_version(encrypted_data)
+        if version is None:
+            return encrypted_data
+        if version == 0:
+            return encrypted_data[len(cls.PREFIX):]
+
+        keys = cls.get_keys() if keys is None else keys
+        enc_key, mac_key = cls._derive(version, keys)
+        raw = base64.b64decode(encrypted_data.split(':', 2)[2])
+        nonce = raw[:cls.NONCE_SIZE]
+        ciphertext = raw[cls.NONCE_SIZE:-cls.TAG_SIZE]
+        tag = raw[-cls.TAG_SIZE:]
+
+        if not hmac.compare_digest(tag, cls._tag(mac_key, version, nonce, ciphertext)):
+            raise EncryptionError('Шифротекст поврежден')
+        return cls._keystream_xor(enc_key, nonce, ciphertext).decode('utf-8')
+
+    @classmethod
+    def reencrypt(cls, encrypted_data, version, keys):
+        """Перешифровывает данные ключом указанной версии"""
+        if cls.key_version(encrypted_data) == version:
+            return encrypted_data
+        return cls.encrypt(cls.decrypt(encrypted_data, keys=keys), version=version, keys=keys)
+
+    @classmethod
+    def stream_encryptor(cls, version=None, keys=None):
+        """Потоковый шифратор для файлов (память не зависит от размера)"""
+        keys = cls.get_keys() if keys is None else keys
+        version = cls.current_version() if version is None else version
+        return StreamEncryptor(version, *cls._derive(version, keys))
+
+    @classmethod
+    def stream_decryptor(cls, f, keys=None):
+        """Потоковый дешифратор для файла, записанного stream_encryptor"""
+        f.seek(0)
+        parts = f.read(len(cls.PREFIX) + 12).split(b':', 2)
+        version = parts[1][1:] if len(parts) == 3 and parts[1].startswith(b'v') else b''
+        if parts[0] + b':' != cls.PREFIX.encode() or not version.isdigit():
+            raise EncryptionError('Неизвестный формат файла')
+        keys = cls.get_keys() if keys is None else keys
+        version = int(version)
+        return StreamDecryptor(version, *cls._derive(version, keys))
+
+
+class StreamEncryptor:
+    """
+    Шифрует файл по частям. Формат файла:
+    ``ENCRYPTED:v<версия>:`` | nonce | данные | тег.
+    """
+
+    def __init__(self, version, enc_key, mac_key):
+        self.version = version
+        self.enc_key = enc_key
+        self.nonce = os.urandom(EncryptionService.NONCE_SIZE)
+        self.offset = 0
+        self.mac = hmac.new(mac_key, f'v{version}:'.encode() + self.nonce, hashlib.sha256)
+
+    @property
+    def header(self):
+        return f'{EncryptionService.PREFIX}v{self.version}:'.encode('ascii')
+
+    def start(self):
+        """Заголовок и nonce - пишутся в начало файла"""
+        return self.header + self.nonce
+
+    def update(self, chunk):
+        ciphertext = EncryptionService._keystream_xor(self.enc_key, self.nonce, chunk, self.offset)
+        self.offset += len(chunk)
+        self.mac.update(ciphertext)
+        return ciphertext
+
+    def finalize(self):
+        """Тег целостности - пишется в конец файла"""
+        return self.mac.digest()[:EncryptionService.TAG_SIZE]
+
+
+class StreamDecryptor:
+    """Дешифрует файл, записанный StreamEncryptor"""
+
+    def __init__(self, version, enc_key, mac_key):
+        self.version = version
+        self.enc_key = enc_key
+        self.mac_key = mac_key
+
+    def header_size(self):
+        return len(f'{EncryptionService.PREFIX}v{self.version}:') + EncryptionService.NONCE_SIZE
+
+    def read_chunks(self, f, chunk_size=64 * 1024):
+        """
+        Проверяет тег сразу, при вызове (EncryptionError, если файл изменен),
+        и возвращает генератор открытых данных.
+        """
+        f.seek(0, os.SEEK_END)
+        total = f.tell()
+        tag_size = EncryptionService.TAG_SIZE
+        start = self.header_size()
+        end = total - tag_size
+        if end < start:
+            raise EncryptionError('Файл поврежден')
+
+        f.seek(start - EncryptionService.NONCE_SIZE)
+        nonce = f.read(EncryptionService.NONCE_SIZE)
+        f.seek(end)
+        tag = f.read(tag_size)
+
+        # Первый проход - проверка целостности
+        mac = hmac.new(self.mac_key, f'v{self.version}:'.encode() + nonce, hashlib.sha256)
+        f.seek(start)
+        remaining = end - start
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            mac.update(chunk)
+            remaining -= len(chunk)
+        if not hmac.compare_digest(tag, mac.digest()[:tag_size]):
+            raise EncryptionError('Файл поврежден')
+        return self._decrypt_chunks(f, nonce, start, end, chunk_size)
+
+    def _decrypt_chunks(self, f, nonce, start, end, chunk_size):
+        # Второй проход - дешифрование
+        f.seek(start)
+        offset = 0
+        remaining = end - start
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            yield EncryptionService._keystream_xor(self.enc_key, nonce, chunk, offset)
+            offset += len(chunk)
+            remaining -= len(chunk)
@@ -0,0 +1,198 @@
+# accounts/events.py
+"""
+Изменения занятости номеров в реальном времени (server-sent events).
+
+Сигналы Booking (и подбор номеров assignment.py, который пишет
+UPDATE-ами без сигналов) после коммита публикуют изменения занятых
+периодов номера в брокер процесса, а SSE-представление
+(views_async.api_room_events) держит подписку на выбранные номера и
+пересылает их клиенту. Страница
+бронирования больше не перечитывает занятые даты: она получает то, что
+добавилось и освободилось.
+
+Простаивающее соединение - это очередь asyncio и ожидание на ней: ни
+потока, ни запросов к базе; раз в HEARTBEAT секунд уходит комментарий,
+чтобы прокси не закрыл соединение.
+
+Брокер живет в памяти одного процесса: подписчик получает изменения,
+сделанные через этот же процесс (ASGI-сервер обслуживает и страницы,
+и админку). Клиент, который не успевает читать, получает событие resync
+и перечитывает занятые даты сам.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .availability import ACTIVE_BOOKING_STATUSES, ApiError
+
+HEARTBEAT = 15
+# Через сколько миллисекунд браузер переподключается после обрыва
+RETRY_MS = 3000
+QUEUE_SIZE = 100
+MAX_ROOMS = 20
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """Номера, на которые подписан клиент, и очередь его событий"""
+
+    def __init__(self, room_ids, loop):
+        self.room_ids = frozenset(room_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        # Выполняется в цикле событий подписчика (call_soon_threadsafe)
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    """Подписки процесса по номерам; publish можно вызывать из любого потока"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_room = defaultdict(set)
+        self.ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self, room_ids):
+        subscription = Subscription(room_ids, asyncio.get_running_loop())
+        with self.lock:
+            for room_id in subscription.room_ids:
+                self.by_room[room_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for room_id in subscription.room_ids:
+                subscribers = self.by_room.get(room_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.by_room[room_id]
+
+    def has_subscribers(self, room_ids):
+        with self.lock:
+            return any(room_id in self.by_room for room_id in room_ids)
+
+    def publish(self, room_id, event):
+        with self.lock:
+            subscribers = list(self.by_room.get(room_id, ()))
+            event = {**event, 'id': next(self.ids)}
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт (сервер останавливается)
+                pass
+
+    def stats(self):
+        with self.lock:
+            subscriptions = set().union(*self.by_room.values()) if self.by_room else set()
+            return {'connections': len(subscriptions), 'rooms': len(self.by_room),
+                    'published': self.published}
+
+
+broker = Broker()
+
+
+# Изменения броней
+
+def booking_state(booking):
+    return {'room_id': booking.room_id, 'status': booking.status,
+            'check_in': booking.check_in, 'check_out': booking.check_out}
+
+
+def busy_period(state):
+    return {'start': state['check_in'].isoformat(), 'end': state['check_out'].isoformat(),
+            'status': state['status']}
+
+
+def availability_changes(previous, current):
+    """Изменение занятости от замены брони previous на current: {номер: событие}"""
+    changes = {}
+    for state, kind in ((previous, 'removed'), (current, 'added')):
+        if state and state['room_id'] and state['status'] in ACTIVE_BOOKING_STATUSES:
+            event = changes.setdefault(state['room_id'], {'type': 'availability', 'room_id': state['room_id'],
+                                                         'added': [], 'removed': []})
+            event[kind].append(busy_period(state))
+    # Сохранение без изменения периода (например, заметки) - не событие
+    return {room_id: event for room_id, event in changes.items() if event['added'] != event['removed']}
+
+
+def merged_changes(transitions):
+    """События нескольких замен (previous, current), сведенные по номерам"""
+    changes = {}
+    for previous, current in transitions:
+        for room_id, event in availability_changes(previous, current).items():
+            merged = changes.setdefault(room_id, {'type': 'availability', 'room_id': room_id,
+                                                  'added': [], 'removed': []})
+            merged['added'] += event['added']
+            merged['removed'] += event['removed']
+    return changes
+
+
+def publish_on_commit(previous, current):
+    publish_changes_on_commit([(previous, current)])
+
+
+def publish_changes_on_commit(transitions):
+    """Публикует изменения занятости после коммита; для массовых UPDATE (assignment.py) - одним вызовом"""
+    changes = merged_changes(transitions)
+    if not changes or not broker.has_subscribers(changes):
+        return
+
+    def publish():
+        for room_id, event in changes.items():
+            broker.publish(room_id, event)
+
+    transaction.on_commit(publish)
+
+
+# Поток для клиента
+
+def parse_room_ids(params):
+    """Номера из ?room_id=1&room_id=2 (или room_id=1,2)"""
+    values = [value for item in params.getlist('room_id') for value in item.split(',') if value]
+    if not values:
+        raise ApiError('Необходим параметр room_id')
+    if not all(value.isdecimal() for value in values):
+        raise ApiError('Неверный параметр room_id')
+    room_ids = {int(value) for value in values}
+    if len(room_ids) > MAX_ROOMS:
+        raise ApiError(f'Не больше {MAX_ROOMS} номеров')
+    return room_ids
+
+
+def format_event(event):
+    data = {key: value for key, value in event.items() if key not in ('id', 'type')}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream(room_ids):
+    """Строки SSE для клиента до его отключения"""
+    subscription = broker.subscribe(room_ids)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event is RESYNC:
+                yield 'event: resync\ndata: {}\n\n'
+            else:
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,129 @@
+# accounts/exports.py
+"""
+Потоковые CSV-выгрузки для админки.
+
+Строки читаются через values_list().iterator(chunk_size) и сразу уходят
+клиенту через StreamingHttpResponse: память не растет с размером выгрузки,
+а первый байт (заголовок) отдается до выполнения основного запроса.
+Колонки задаются явно - чувствительные поля (медицинские данные, документы,
+адреса, заметки) в выгрузки не попадают.
+"""
+import csv
+from datetime import datetime
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Appointment, Booking, GuestProfile, Room
+
+CHUNK_SIZE = 2000
+# Сколько строк CSV склеивается в один кусок ответа
+ROWS_PER_WRITE = 500
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: write возвращает строку, а не пишет ее"""
+
+    def write(self, value):
+        return value
+
+
+def choice_label(choices):
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+def yes_no(value):
+    return 'да' if value else 'нет'
+
+
+# С этих символов Excel начинает формулу (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+    # Строки вводят гости (имена, логин, email, заметки): формулу превращаем в текст
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# Колонки: (заголовок, поле для values_list, форматтер или None)
+BOOKING_COLUMNS = [
+    ('ID', 'id', None),
+    ('Создано', 'created_at', None),
+    ('Статус', 'status', choice_label(Booking.STATUS_CHOICES)),
+    ('Заезд', 'check_in', None),
+    ('Выезд', 'check_out', None),
+    ('Гостей', 'guests', None),
+    ('Номер', 'room__name', None),
+    ('Тип номера', 'room_type', choice_label(Room.TYPE_CHOICES)),
+    ('Стоимость', 'total_price', None),
+    ('Логин', 'user__username', None),
+    ('Фамилия', 'user__last_name', None),
+    ('Имя', 'user__first_name', None),
+    ('Email', 'user__email', None),
+]
+
+APPOINTMENT_COLUMNS = [
+    ('ID', 'id', None),
+    ('Дата', 'appointment_date', None),
+    ('Время', 'appointment_time', lambda value: value.strftime('%H:%M')),
+    ('Статус', 'status', choice_label(Appointment.STATUS_CHOICES)),
+    ('Процедура', 'procedure__name', None),
+    ('Стоимость', 'procedure__price', None),
+    ('Врач: фамилия', 'doctor__user__last_name', None),
+    ('Врач: имя', 'doctor__user__first_name', None),
+    ('ID пациента', 'patient_id', None),
+    ('Пациент: фамилия', 'patient__last_name', None),
+    ('Пациент: имя', 'patient__first_name', None),
+    ('Создано', 'created_at', None),
+]
+
+GUEST_COLUMNS = [
+    ('ID', 'id', None),
+    ('Логин', 'user__username', None),
+    ('Фамилия', 'last_name', None),
+    ('Имя', 'first_name', None),
+    ('Отчество', 'middle_name', None),
+    ('Телефон', 'phone', None),
+    ('Email', 'email', None),
+    ('Питание', 'preferred_diet', choice_label(GuestProfile.DIET_CHOICES)),
+    ('Трансфер', 'need_transfer', yes_no),
+    ('Документы', 'document_status', choice_label(GuestProfile.DOCUMENT_STATUS)),
+    ('Профиль заполнен', 'is_profile_complete', yes_no),
+    ('Дата регистрации', 'created_at', None),
+    ('Активен', 'user__is_active', yes_no),
+]
+
+
+def csv_rows(columns, queryset, chunk_size=CHUNK_SIZE):
+    """Генератор кусков CSV: BOM и заголовок, затем строки пачками"""
+    writer = csv.writer(Echo(), delimiter=';')
+    formatters = [formatter for _, _, formatter in columns]
+    # BOM, чтобы Excel распознал UTF-8
+    yield '\ufeff' + writer.writerow([label for label, _, _ in columns])
+
+    rows = queryset.values_list(*[field for _, field, _ in columns]).iterator(chunk_size=chunk_size)
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([
+            cell(formatter(value) if formatter and value is not None else value)
+            for formatter, value in zip(formatters, row)
+        ]))
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_response(filename, columns, queryset, chunk_size=CHUNK_SIZE):
+    response = StreamingHttpResponse(csv_rows(columns, queryset, chunk_size),
+                                     content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,81 @@
+# accounts/filters.py
+"""
+Фильтры админских списков по GET-параметрам. Общие для страниц и
+CSV-выгрузок (exports.py), чтобы выгрузка совпадала с тем, что видно в списке.
+"""
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def parse_date(value):
+    """Дата в формате YYYY-MM-DD или None (неверные значения игнорируются)"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def filter_bookings(queryset, params):
+    """status, room_type, date_from (заезд не раньше), date_to (выезд не позже)"""
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    room_type = params.get('room_type')
+    if room_type:
+        queryset = queryset.filter(room__type=room_type)
+
+    date_from = parse_date(params.get('date_from'))
+    if date_from:
+        queryset = queryset.filter(check_in__gte=date_from)
+
+    date_to = parse_date(params.get('date_to'))
+    if date_to:
+        queryset = queryset.filter(check_out__lte=date_to)
+
+    return queryset
+
+
+def filter_appointments(queryset, params):
+    """status, doctor, date_from/date_to по дате приема"""
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    doctor_id = params.get('doctor')
+    if doctor_id and doctor_id.isdecimal():
+        queryset = queryset.filter(doctor_id=doctor_id)
+
+    date_from = parse_date(params.get('date_from'))
+    if date_from:
+        queryset = queryset.filter(appointment_date__gte=date_from)
+
+    date_to = parse_date(params.get('date_to'))
+    if date_to:
+        queryset = queryset.filter(appointment_date__lte=date_to)
+
+    return queryset
+
+
+def filter_guests(queryset, params):
+    """Профили гостей: search (ФИО, email, username), active (true/false)"""
+    search = params.get('search', '')
+    if search:
+        queryset = queryset.filter(
+            Q(user__username__icontains=search) |
+            Q(user__email__icontains=search) |
+            Q(email__icontains=search) |
+            Q(first_name__icontains=search) |
+            Q(last_name__icontains=search)
+        )
+
+    active = params.get('active', '')
+    if active == 'false':
+        queryset = queryset.filter(user__is_active=False)
+    elif active == 'true':
+        queryset = queryset.filter(user__is_active=True)
+
+    return queryset
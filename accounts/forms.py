@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from .models import GuestProfile, Booking, Room
+from .models import GuestProfile, Booking, Room, WaitlistEntry
+from .imports import IMPORT_CHOICES
 from django.core.exceptions import ValidationError
 from datetime import date
 import re
@@ -206,6 +207,67 @@ class BookingForm(forms.ModelForm):
         return booking
 
 
+class WaitlistForm(forms.ModelForm):
+    """Запись в лист ожидания: конкретный номер или любой номер выбранного типа"""
+    room = forms.ModelChoiceField(
+        queryset=Room.objects.filter(is_active=True),
+        required=False,
+        label='Номер',
+        empty_label='-- Любой номер выбранного типа --',
+        widget=forms.Select(attrs={'class': 'form-control form-input'})
+    )
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['room_type', 'room', 'check_in', 'check_out', 'guests']
+        widgets = {
+            'room_type': forms.Select(attrs={'class': 'form-control form-input'}),
+            'check_in': forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-input'}),
+            'check_out': forms.DateInput(attrs={'type': 'date', 'class': 'form-control form-input'}),
+            'guests': forms.NumberInput(attrs={'class': 'form-control form-input', 'min': 1, 'max': 4}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        self.fields['room_type'].required = False
+        today = date.today().isoformat()
+        self.fields['check_in'].widget.attrs['min'] = today
+        self.fields['check_out'].widget.attrs['min'] = today
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in = cleaned_data.get('check_in')
+        check_out = cleaned_data.get('check_out')
+        room = cleaned_data.get('room')
+        guests = cleaned_data.get('guests')
+
+        if check_in and check_out:
+            if check_in >= check_out:
+                raise ValidationError('Дата выезда должна быть позже даты заезда')
+            if check_in < date.today():
+                raise ValidationError('Нельзя бронировать на прошедшую дату')
+
+        if room:
+            cleaned_data['room_type'] = room.type
+            if guests and guests > room.capacity:
+                raise ValidationError(
+                    f'В номере "{room.name}" максимальная вместимость: {room.capacity} человека(ей)'
+                )
+        elif not cleaned_data.get('room_type'):
+            raise ValidationError('Выберите номер или тип номера')
+
+        return cleaned_data
+
+    def save(self, commit=True):
+        entry = super().save(commit=False)
+        entry.user = self.user
+        entry.room_type = self.cleaned_data['room_type']
+        if commit:
+            entry.save()
+        return entry
+
+
 # Добавьте эти формы в конец forms.py
 
 class AdminCreateUserForm(UserCreationForm):
@@ -235,4 +297,21 @@ class AdminCreateUserForm(UserCreationForm):
                 phone=self.cleaned_data['phone'],
                 email=user.email
             )
-        return user
\ No newline at end of file
+        return user
+
+class CsvImportForm(forms.Form):
+    """Загрузка CSV для импорта справочников (см. imports.py)"""
+    kind = forms.ChoiceField(
+        choices=IMPORT_CHOICES,
+        label='Что импортируем',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    file = forms.FileField(
+        label='CSV-файл',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label='Только проверить, ничего не записывая',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
@@ -51,6 +51,25 @@ class DocumentUploadForm(forms.Form):
         })
     )
 
+    # Для полиса ОМС
+    oms_number = forms.CharField(
+        max_length=19,
+        required=False,
+        label='Полис ОМС',
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': '1234 5678 9012 3456'
+        })
+    )
+
+    # Скан документа (шифруется при загрузке, см. EncryptedFileUploadHandler)
+    scan = forms.FileField(
+        required=False,
+        label='Скан документа',
+        help_text='PDF, JPG или PNG',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control'})
+    )
+
     def clean(self):
         cleaned_data = super().clean()
         doc_type = cleaned_data.get('document_type')
@@ -74,4 +93,27 @@ class DocumentUploadForm(forms.Form):
                 raise forms.ValidationError('СНИЛС должен содержать 11 цифр')
             cleaned_data['snils_number'] = snils
 
-        return cleaned_data
\ No newline at end of file
+        elif doc_type == 'medical' and not cleaned_data.get('scan'):
+            raise forms.ValidationError('Для медицинской книжки необходимо приложить скан')
+
+        elif doc_type == 'oms':
+            oms = re.sub(r'\D', '', cleaned_data.get('oms_number', ''))
+            if oms and len(oms) != 16:
+                raise forms.ValidationError('Полис ОМС должен содержать 16 цифр')
+            cleaned_data['oms_number'] = oms
+
+        return cleaned_data
+
+    def get_document_data(self):
+        """Открытые данные документа для шифрования"""
+        doc_type = self.cleaned_data['document_type']
+        if doc_type == 'passport':
+            return {
+                'series': self.cleaned_data['passport_series'].strip(),
+                'number': self.cleaned_data['passport_number'].strip(),
+            }
+        if doc_type == 'snils':
+            return {'number': self.cleaned_data.get('snils_number', '')}
+        if doc_type == 'oms':
+            return {'number': self.cleaned_data.get('oms_number', '')}
+        return {}
\ No newline at end of file
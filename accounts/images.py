@@ -0,0 +1,145 @@
+# accounts/images.py
+"""
+Уменьшенные копии фотографий номеров и врачей.
+
+Для каждого исходника строятся варианты фиксированной ширины в WebP и JPEG.
+Файлы лежат в MEDIA_ROOT/variants/ и называются по SHA-256 содержимого,
+поэтому одинаковые фото обрабатываются один раз, а повторная генерация
+пропускает уже готовые файлы.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+# Пространство имен кеша, в котором отдаются варианты фото модели
+CACHE_NAMESPACES = {
+    'accounts.Room': cache.ROOMS,
+    'accounts.Doctor': cache.DOCTORS,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def variant_widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', [320, 640, 1024])
+
+
+def variants_root():
+    return os.path.join(settings.MEDIA_ROOT, 'variants')
+
+
+def variant_name(content_hash, width, ext):
+    return f'{content_hash[:2]}/{content_hash}-{width}.{ext}'
+
+
+def variant_url(content_hash, width, ext='webp'):
+    return f'{settings.MEDIA_URL}variants/{variant_name(content_hash, width, ext)}'
+
+
+def srcset(content_hash, ext='webp'):
+    """Строка для атрибута srcset"""
+    return ', '.join(f'{variant_url(content_hash, width, ext)} {width}w'
+                     for width in variant_widths())
+
+
+def file_hash(path, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_variants(source_path, root, widths, quality=80):
+    """
+    Строит все варианты одного изображения. Выполняется в дочернем процессе,
+    поэтому получает пути и настройки аргументами. Возвращает хеш содержимого.
+    """
+    from PIL import Image, ImageOps
+
+    content_hash = file_hash(source_path)
+    missing = [
+        (width, ext) for width in widths for ext in VARIANT_FORMATS
+        if not os.path.exists(os.path.join(root, variant_name(content_hash, width, ext)))
+    ]
+    if not missing:
+        return content_hash
+
+    os.makedirs(os.path.join(root, content_hash[:2]), exist_ok=True)
+    with Image.open(source_path) as original:
+        original = ImageOps.exif_transpose(original).convert('RGB')
+        for width, ext in missing:
+            image = original
+            if original.width > width:
+                height = round(original.height * width / original.width)
+                image = original.resize((width, height), Image.LANCZOS)
+
+            path = os.path.join(root, variant_name(content_hash, width, ext))
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            image.save(tmp_path, VARIANT_FORMATS[ext][0], quality=quality)
+            os.replace(tmp_path, path)
+    return content_hash
+
+
+def get_pool():
+    """Общий пул процессов для генерации вариантов"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2))
+        return _pool
+
+
+def image_sources(model):
+    """Поле изображения и поле хеша для моделей с фото"""
+    return model.IMAGE_FIELD, f'{model.IMAGE_FIELD}_hash'
+
+
+def schedule_variants(instance):
+    """Ставит генерацию вариантов в фон после коммита транзакции"""
+    image_field, hash_field = image_sources(type(instance))
+    image = getattr(instance, image_field)
+    if not image:
+        return
+
+    model = type(instance)
+    pk = instance.pk
+    name = image.name
+    path = image.path
+
+    def submit():
+        future = get_pool().submit(build_variants, path, variants_root(), variant_widths())
+        future.add_done_callback(lambda f: _store_hash(model, pk, image_field, hash_field, name, f))
+
+    transaction.on_commit(submit)
+
+
+def _store_hash(model, pk, image_field, hash_field, name, future):
+    """Записывает хеш, если за это время фото не заменили"""
+    if future.exception() is not None:
+        logger.error('Не удалось построить варианты %s: %s', name, future.exception())
+        return
+    try:
+        updated = model.objects.filter(pk=pk, **{image_field: name}).update(**{hash_field: future.result()})
+        # update() не вызывает сигналы - кеш каталога сбрасываем сами
+        namespace = CACHE_NAMESPACES.get(model._meta.label)
+        if updated and namespace:
+            cache.bump(namespace)
+    finally:
+        # Колбэк выполняется в служебном потоке пула - соединение не держим
+        connection.close()
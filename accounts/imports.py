@@ -0,0 +1,386 @@
+# accounts/imports.py
+"""
+Импорт справочников из CSV: номера, категории процедур, процедуры, врачи и
+слоты расписания (команда import_csv и страница admin_import).
+
+Файл читается построчно, каждая строка проверяется моделью (full_clean),
+внешние ключи ищутся по картам, загруженным один раз в начале импорта.
+Запись идет пачками через bulk_create/bulk_update: строка с уже существующим
+ключом (Room.name, имя категории/процедуры, логин врача, врач+день+начало
+слота) обновляет запись. Ошибочные строки пропускаются и попадают в отчет,
+остальные импортируются.
+"""
+import codecs
+import csv
+from dataclasses import dataclass, field
+from itertools import chain
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import cache, rollups
+from .models import Doctor, Procedure, ProcedureCategory, Room, ScheduleSlot
+
+BATCH_SIZE = 500
+# Больше ошибок в отчет не попадает, считаются все
+MAX_ERRORS = 1000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'да', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'нет', 'n', 'f'}
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # (номер строки, сообщение)
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def read_csv(file):
+    """
+    Строки файла (байты, UTF-8, можно с BOM) как (номер строки, словарь).
+    Разделитель - ';' или ',' - определяется по заголовку.
+    """
+    lines = codecs.iterdecode(iter(file), 'utf-8-sig')
+    try:
+        first = next(lines, '')
+    except UnicodeDecodeError:
+        raise ValueError('Файл должен быть в кодировке UTF-8')
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    reader = csv.reader(chain([first], lines), delimiter=delimiter)
+    header = [column.strip().lower() for column in next(reader, [])]
+    if not any(header):
+        raise ValueError('Пустой файл')
+    yield header
+
+    try:
+        for row in reader:
+            if not any(value.strip() for value in row):
+                continue
+            yield reader.line_num, dict(zip(header, (value.strip() for value in row)))
+    except UnicodeDecodeError:
+        raise ValueError(f'Файл должен быть в кодировке UTF-8 (строка {reader.line_num + 1})')
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError('Ожидается да/нет (1/0, true/false)')
+
+
+def _messages(error):
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f"{name}: {' '.join(messages)}" if name != '__all__' else ' '.join(messages)
+                         for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+class Importer:
+    """
+    Базовый импорт. Колонки fields - поля модели, присваиваются как есть и
+    проверяются full_clean; связи разрешает resolve по предзагруженным картам.
+    """
+    model = None
+    title = ''
+    fields = ()          # колонки - поля модели
+    extra_columns = ()   # колонки, которые разбирает resolve
+    required = ()        # колонки, без которых файл не принимается
+    key_column = 'name'
+    cache_namespaces = ()
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.result = ImportResult()
+        self.existing = self.load_existing()
+        self.to_create = {}
+        self.to_update = {}
+
+    # Переопределяется в наследниках
+
+    def load_existing(self):
+        """Ключ -> pk существующих записей"""
+        return dict(self.model.objects.values_list(self.key_column, 'pk'))
+
+    def resolve(self, instance, row):
+        """Связи и прочие колонки extra_columns"""
+
+    def instance_key(self, instance, row):
+        return getattr(instance, self.key_column)
+
+    def before_write(self, creates, updates):
+        pass
+
+    def after_write(self, instances):
+        pass
+
+    def after_import(self):
+        if self.cache_namespaces:
+            cache.bump_on_commit(*self.cache_namespaces)
+
+    # Общая часть
+
+    def check_header(self, header):
+        missing = [column for column in self.required if column not in header]
+        if missing:
+            raise ValueError(f'Нет обязательных колонок: {", ".join(missing)}')
+        known = set(self.fields) | set(self.extra_columns)
+        self.columns = [column for column in header if column in known]
+        self.update_fields = [column for column in self.columns
+                              if column in self.fields and column != self.key_column]
+
+    def build(self, row):
+        """Экземпляр модели из строки; ValidationError - со всеми ошибками строки"""
+        instance = self.model()
+        errors = {}
+        for column in self.columns:
+            model_field = self.model._meta.get_field(column) if column in self.fields else None
+            if model_field is None or model_field.is_relation:
+                continue
+            value = row.get(column, '')
+            if value == '' and model_field.has_default():
+                value = model_field.get_default()
+            elif model_field.get_internal_type() == 'BooleanField':
+                try:
+                    value = parse_bool(value)
+                except ValidationError as e:
+                    errors[column] = e.messages
+                    continue
+            setattr(instance, column, value)
+
+        try:
+            self.resolve(instance, row)
+        except ValidationError as e:
+            errors.update(e.message_dict)
+        # Связи проверены по картам, full_clean делал бы по запросу на строку
+        exclude = [model_field.name for model_field in self.model._meta.concrete_fields if model_field.is_relation]
+        try:
+            instance.full_clean(exclude=exclude + list(errors), validate_unique=False, validate_constraints=False)
+        except ValidationError as e:
+            errors.update(e.message_dict)
+        if errors:
+            raise ValidationError(errors)
+        return instance
+
+    def add(self, line, row):
+        self.result.rows += 1
+        try:
+            instance = self.build(row)
+        except ValidationError as e:
+            self.result.add_error(line, _messages(e))
+            return
+        key = self.instance_key(instance, row)
+        if key in self.existing:
+            instance.pk = self.existing[key]
+            self.to_update[key] = instance
+        else:
+            self.to_create[key] = instance
+        if len(self.to_create) + len(self.to_update) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        creates, updates = list(self.to_create.values()), list(self.to_update.values())
+        self.to_create, self.to_update = {}, {}
+        if not creates and not updates:
+            return
+        self.before_write(creates, updates)
+        if creates:
+            self.model.objects.bulk_create(creates, batch_size=self.batch_size)
+            for instance in creates:
+                self.existing[self.instance_key(instance, None)] = instance.pk
+        if updates and self.update_fields:
+            self.model.objects.bulk_update(updates, self.update_fields, batch_size=self.batch_size)
+        self.after_write(creates + updates)
+        self.result.created += len(creates)
+        self.result.updated += len(updates)
+
+    def run(self, file, dry_run=False):
+        """Импорт файла целиком в одной транзакции; dry_run - только проверка"""
+        rows = read_csv(file)
+        self.check_header(next(rows))
+        with transaction.atomic():
+            for line, row in rows:
+                self.add(line, row)
+            self.flush()
+            self.after_import()
+            if dry_run:
+                transaction.set_rollback(True)
+        return self.result
+
+
+class RoomImporter(Importer):
+    model = Room
+    title = 'Номера'
+    fields = ('name', 'type', 'capacity', 'price_per_day', 'description', 'is_active')
+    required = ('name', 'type', 'price_per_day', 'description')
+    # Свободные номера по типам (inventory.py) считаются от фонда номеров
+    cache_namespaces = (cache.ROOMS, cache.INVENTORY)
+
+    def after_import(self):
+        # bulk-операции не вызывают сигналы: фонд номеров в сводках обновляем сами
+        rollups.refresh_rooms_total()
+        super().after_import()
+
+
+class CategoryImporter(Importer):
+    model = ProcedureCategory
+    title = 'Категории процедур'
+    fields = ('name', 'description', 'icon')
+    required = ('name', 'description')
+    cache_namespaces = (cache.PROCEDURE_CATALOG,)
+
+
+class ProcedureImporter(Importer):
+    model = Procedure
+    title = 'Процедуры'
+    fields = ('name', 'category', 'description', 'duration', 'price', 'is_active',
+              'contraindications', 'preparation')
+    required = ('name', 'category', 'description', 'duration', 'price')
+    cache_namespaces = (cache.PROCEDURE_CATALOG,)
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.categories = dict(ProcedureCategory.objects.values_list('name', 'pk'))
+
+    def resolve(self, instance, row):
+        category_id = self.categories.get(row.get('category', ''))
+        if not category_id:
+            raise ValidationError({'category': f"Категория не найдена: {row.get('category', '')}"})
+        instance.category_id = category_id
+
+
+class DoctorImporter(Importer):
+    """
+    Врачи по логину: недостающие пользователи создаются (без пароля),
+    procedures - названия процедур через '|', заменяют список процедур врача.
+    """
+    model = Doctor
+    title = 'Врачи'
+    fields = ('specialization', 'qualification', 'experience', 'bio')
+    extra_columns = ('username', 'first_name', 'last_name', 'email', 'procedures')
+    required = ('username', 'specialization', 'qualification', 'experience')
+    key_column = 'username'
+    cache_namespaces = (cache.PROCEDURE_CATALOG,)
+    user_fields = ('first_name', 'last_name', 'email')
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.procedures = dict(Procedure.objects.values_list('name', 'pk'))
+
+    def load_existing(self):
+        return dict(Doctor.objects.values_list('user__username', 'pk'))
+
+    def instance_key(self, instance, row):
+        return instance._username
+
+    def resolve(self, instance, row):
+        username = row.get('username', '')
+        if not username:
+            raise ValidationError({'username': 'Обязательное поле'})
+        instance._username = username
+        instance._user_data = {name: row[name] for name in self.user_fields if name in self.columns}
+
+        instance._procedure_ids = None
+        if 'procedures' in self.columns:
+            names = [name.strip() for name in row.get('procedures', '').split('|') if name.strip()]
+            unknown = [name for name in names if name not in self.procedures]
+            if unknown:
+                raise ValidationError({'procedures': f'Процедуры не найдены: {", ".join(unknown)}'})
+            instance._procedure_ids = {self.procedures[name] for name in names}
+
+    def before_write(self, creates, updates):
+        # Пользователи одной выборкой на пачку: таблица пользователей может быть большой
+        instances = creates + updates
+        users = {user.username: user for user in
+                 User.objects.filter(username__in=[instance._username for instance in instances])}
+        new_users = [User(username=instance._username, password=make_password(None), **instance._user_data)
+                     for instance in instances if instance._username not in users]
+        User.objects.bulk_create(new_users, batch_size=self.batch_size)
+        users.update((user.username, user) for user in new_users)
+
+        changed_users = []
+        for instance in instances:
+            user = users[instance._username]
+            instance.user_id = user.pk
+            if any(getattr(user, name) != value for name, value in instance._user_data.items()):
+                for name, value in instance._user_data.items():
+                    setattr(user, name, value)
+                changed_users.append(user)
+        fields = [name for name in self.user_fields if name in self.columns]
+        if changed_users and fields:
+            User.objects.bulk_update(changed_users, fields, batch_size=self.batch_size)
+
+    def after_write(self, instances):
+        instances = [instance for instance in instances if instance._procedure_ids is not None]
+        if not instances:
+            return
+        through = Doctor.procedures.through
+        through.objects.filter(doctor_id__in=[instance.pk for instance in instances]).delete()
+        through.objects.bulk_create([
+            through(doctor_id=instance.pk, procedure_id=procedure_id)
+            for instance in instances for procedure_id in instance._procedure_ids
+        ], batch_size=self.batch_size)
+
+
+class ScheduleImporter(Importer):
+    """Слоты по ключу врач (логин) + день недели + время начала"""
+    model = ScheduleSlot
+    title = 'Расписание врачей'
+    fields = ('day_of_week', 'start_time', 'end_time', 'max_appointments')
+    extra_columns = ('doctor',)
+    required = ('doctor', 'day_of_week', 'start_time', 'end_time')
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.doctors = dict(Doctor.objects.values_list('user__username', 'pk'))
+
+    def load_existing(self):
+        return {(doctor_id, day, start): pk for doctor_id, day, start, pk in
+                ScheduleSlot.objects.values_list('doctor_id', 'day_of_week', 'start_time', 'pk')}
+
+    def check_header(self, header):
+        super().check_header(header)
+        # Поля ключа не обновляются
+        self.update_fields = [name for name in self.update_fields if name not in ('day_of_week', 'start_time')]
+
+    def instance_key(self, instance, row):
+        return instance.doctor_id, instance.day_of_week, instance.start_time
+
+    def resolve(self, instance, row):
+        doctor_id = self.doctors.get(row.get('doctor', ''))
+        if not doctor_id:
+            raise ValidationError({'doctor': f"Врач не найден: {row.get('doctor', '')}"})
+        instance.doctor_id = doctor_id
+
+    def build(self, row):
+        instance = super().build(row)
+        if instance.end_time <= instance.start_time:
+            raise ValidationError({'end_time': 'Время окончания должно быть позже начала'})
+        return instance
+
+
+IMPORTERS = {
+    'rooms': RoomImporter,
+    'categories': CategoryImporter,
+    'procedures': ProcedureImporter,
+    'doctors': DoctorImporter,
+    'schedule': ScheduleImporter,
+}
+
+IMPORT_CHOICES = [(kind, importer.title) for kind, importer in IMPORTERS.items()]
+
+
+def import_csv(kind, file, dry_run=False, batch_size=BATCH_SIZE):
+    """Импорт файла; ValueError - если файл не принимается целиком"""
+    return IMPORTERS[kind](batch_size=batch_size).run(file, dry_run=dry_run)
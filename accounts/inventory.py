@@ -0,0 +1,167 @@
+# accounts/inventory.py
+"""
+Свободные номера по типам на каждую ночь (DailyRoomTypeInventory).
+
+Вместо проверки пересечений по каждому номеру занятость считается
+разностным массивом: бронь дает +1 в день заезда и -1 в день выезда, а
+префиксная сумма превращает это в число занятых номеров на каждую ночь.
+rebuild так пересчитывает всю таблицу за один проход по броням.
+Изменение брони (signals.py) раскладывается тем же способом в отрезки
+дней с одинаковым изменением, и каждый отрезок обновляется одним UPDATE
+по диапазону дат. Чтение - одна выборка строк за период, результат
+кешируется в пространстве имен cache.INVENTORY.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from . import cache
+from .availability import ACTIVE_BOOKING_STATUSES, ApiError, int_param
+from .models import Booking, DailyRoomTypeInventory, Room
+from .rollups import rooms_by_type
+
+# По умолчанию - на полгода вперед
+DEFAULT_DAYS = 183
+MAX_DAYS = 366
+
+
+def booking_stay(booking):
+    return {'room_type': booking.room_type, 'status': booking.status,
+            'check_in': booking.check_in, 'check_out': booking.check_out}
+
+
+def reserved_counts(stays, date_from, days):
+    """
+    Занятые номера по типам на каждую из days ночей начиная с date_from.
+    stays - кортежи (тип, заезд, выезд) активных броней.
+    """
+    diffs = defaultdict(lambda: [0] * (days + 1))
+    for room_type, check_in, check_out in stays:
+        start = max((check_in - date_from).days, 0)
+        end = min((check_out - date_from).days, days)
+        if start < end:
+            diff = diffs[room_type]
+            diff[start] += 1
+            diff[end] -= 1
+    return {room_type: list(accumulate(diff[:days])) for room_type, diff in diffs.items()}
+
+
+def stay_changes(previous, current, since):
+    """
+    Изменение занятости от замены брони previous на current (None - ее
+    нет): отрезки (тип, с, по (не включая), изменение) начиная с since.
+    """
+    boundaries = defaultdict(lambda: defaultdict(int))
+    for stay, sign in ((previous, -1), (current, 1)):
+        if not stay or stay['status'] not in ACTIVE_BOOKING_STATUSES:
+            continue
+        start = max(stay['check_in'], since)
+        if start < stay['check_out']:
+            boundaries[stay['room_type']][start] += sign
+            boundaries[stay['room_type']][stay['check_out']] -= sign
+
+    changes = []
+    for room_type, diff in boundaries.items():
+        days = sorted(diff)
+        for start, end, delta in zip(days, days[1:], accumulate(diff[day] for day in days)):
+            if delta:
+                changes.append((room_type, start, end, delta))
+    return changes
+
+
+def apply_booking_change(previous, current):
+    """Переносит изменение брони в таблицу (previous/current - словари booking_stay)"""
+    changes = stay_changes(previous, current, date.today())
+    if not changes:
+        return
+    with transaction.atomic():
+        DailyRoomTypeInventory.objects.bulk_create([
+            DailyRoomTypeInventory(date=start + timedelta(days=offset), room_type=room_type)
+            for room_type, start, end, _ in changes for offset in range((end - start).days)
+        ], ignore_conflicts=True)
+        for room_type, start, end, delta in changes:
+            DailyRoomTypeInventory.objects.filter(room_type=room_type, date__gte=start, date__lt=end).update(
+                reserved=F('reserved') + delta
+            )
+    cache.bump_on_commit(cache.INVENTORY)
+
+
+def rebuild(chunk_size=5000):
+    """Пересчитывает таблицу с сегодняшнего дня по активным броням; возвращает (по дату, строк)"""
+    today = date.today()
+    active = Booking.objects.filter(status__in=ACTIVE_BOOKING_STATUSES, check_out__gt=today)
+    last = active.aggregate(last=Max('check_out'))['last'] or today
+    days = (last - today).days
+    counts = reserved_counts(
+        active.values_list('room_type', 'check_in', 'check_out').iterator(chunk_size=chunk_size), today, days
+    )
+    rows = [
+        DailyRoomTypeInventory(date=today + timedelta(days=offset), room_type=room_type, reserved=reserved)
+        for room_type, per_day in counts.items() for offset, reserved in enumerate(per_day) if reserved
+    ]
+    with transaction.atomic():
+        DailyRoomTypeInventory.objects.filter(date__gte=today).delete()
+        DailyRoomTypeInventory.objects.bulk_create(rows, batch_size=1000)
+    cache.bump_on_commit(cache.INVENTORY)
+    return last, len(rows)
+
+
+# Чтение
+
+def parse_inventory_params(params):
+    """date_from, days, room_type из GET-параметров"""
+    try:
+        date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') \
+            else date.today()
+    except ValueError as e:
+        raise ApiError(f'Неверный формат даты: {str(e)}')
+
+    days = int_param(params.get('days') or DEFAULT_DAYS, 'days', 1, MAX_DAYS)
+
+    room_type = params.get('room_type') or None
+    if room_type and room_type not in dict(Room.TYPE_CHOICES):
+        raise ApiError('Неверный room_type')
+    return date_from, days, room_type
+
+
+def free_rooms(date_from, days=DEFAULT_DAYS):
+    """Свободные номера по типам: {тип: (номеров всего, [свободно на каждую ночь])}"""
+
+    def build():
+        rooms = rooms_by_type()
+        reserved = {room_type: [0] * days for room_type, _ in Room.TYPE_CHOICES}
+        rows = DailyRoomTypeInventory.objects.filter(
+            date__gte=date_from, date__lt=date_from + timedelta(days=days)
+        ).values_list('room_type', 'date', 'reserved')
+        for room_type, day, count in rows:
+            if room_type in reserved:
+                reserved[room_type][(day - date_from).days] = count
+        return {
+            room_type: (rooms.get(room_type, 0), [max(rooms.get(room_type, 0) - count, 0) for count in per_day])
+            for room_type, per_day in reserved.items()
+        }
+
+    return cache.cached(cache.INVENTORY, f'free_rooms:{date_from}:{days}', build)
+
+
+def rooms_left_tonight():
+    """Свободно номеров каждого типа на сегодняшнюю ночь (бейдж каталога)"""
+    return {room_type: free[0] for room_type, (_, free) in free_rooms(date.today()).items()}
+
+
+def inventory_payload(date_from, days, room_type=None):
+    labels = dict(Room.TYPE_CHOICES)
+    return {
+        'success': True,
+        'date_from': date_from.isoformat(),
+        'date_to': (date_from + timedelta(days=days - 1)).isoformat(),
+        'days': days,
+        'room_types': [
+            {'room_type': current, 'name': labels[current], 'rooms_total': total, 'free': free}
+            for current, (total, free) in free_rooms(date_from, days).items()
+            if not room_type or current == room_type
+        ],
+    }
@@ -0,0 +1,438 @@
+# accounts/loadtest.py
+"""
+Сценарии нагрузочного теста (manage.py loadtest).
+
+Каждый сценарий - набор запросов к одному маршруту accounts/urls.py от
+имени анонима, гостя или администратора. Сервер поднимается в том же
+процессе (ThreadedWSGIServer) и считает SQL-запросы по сценариям.
+"""
+import json
+import os
+import random
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .benchmarking import create_session
+from .encryption import EncryptionService
+from .models import Booking, Room, EncryptedDocument, GuestProfile, Procedure, WaitlistEntry
+from .seeding import GUEST_USERNAME, STAFF_USERNAME
+from .uploads import document_path
+
+SCENARIO_HEADER = 'X-Loadtest-Scenario'
+# Бесконечные потоки (SSE) не меряются временем ответа, а под WSGI не работают
+UNMEASURED_ROUTES = {'api_room_events'}
+# Сценарии с записью используют даты далеко в будущем, чтобы не пересекаться с данными
+FAR_FUTURE = 400
+
+
+@dataclass
+class Scenario:
+    name: str
+    url_name: str
+    role: str
+    method: str = 'GET'
+    requests: list = field(default_factory=list)
+
+
+class QueryCountingApplication:
+    """WSGI-обертка: число SQL-запросов по сценарию из заголовка X-Loadtest-Scenario"""
+
+    def __init__(self, application):
+        self.application = application
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'requests': 0, 'queries': 0})
+
+    def __call__(self, environ, start_response):
+        scenario = environ.get('HTTP_' + SCENARIO_HEADER.upper().replace('-', '_'), '')
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            response = self.application(environ, start_response)
+
+        with self.lock:
+            self.stats[scenario]['requests'] += 1
+            self.stats[scenario]['queries'] += count
+        return response
+
+    def queries_per_request(self, scenario):
+        with self.lock:
+            stats = self.stats.get(scenario)
+            return round(stats['queries'] / stats['requests'], 1) if stats else 0.0
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def setup(self):
+        super().setup()
+        # wsgiref пишет заголовки и тело отдельно: без TCP_NODELAY каждый ответ ждет delayed ACK (~40 мс)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestServer:
+    """Многопоточный WSGI-сервер приложения в фоновом потоке"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.application = QueryCountingApplication(get_wsgi_application())
+        self.httpd = ThreadedWSGIServer((host, port), QuietRequestHandler, allow_reuse_address=False)
+        self.httpd.set_app(self.application)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+
+class ScenarioBuilder:
+    """Готовит данные и запросы для сценариев по всем маршрутам"""
+
+    def __init__(self, requests, seed=42):
+        self.count = requests
+        self.rnd = random.Random(seed)
+        self.today = date.today()
+        self.guest = User.objects.get(username=GUEST_USERNAME)
+        self.staff = User.objects.get(username=STAFF_USERNAME)
+        self.rooms = list(Room.objects.filter(is_active=True).order_by('id'))
+        self.procedure_ids = list(Procedure.objects.filter(is_active=True).order_by('id')
+                                  .values_list('id', flat=True)[:5])
+        self.csrf_token = get_random_string(CSRF_SECRET_LENGTH, CSRF_ALLOWED_CHARS)
+        self.sessions = {
+            'anon': None,
+            'guest': create_session(self.guest),
+            'staff': create_session(self.staff),
+        }
+
+    def headers(self, role, session_key=None, post=False):
+        cookies = [f'{settings.CSRF_COOKIE_NAME}={self.csrf_token}']
+        session_key = session_key or self.sessions[role]
+        if session_key:
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session_key}')
+        headers = {'Cookie': '; '.join(cookies)}
+        if post:
+            headers['X-CSRFToken'] = self.csrf_token
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        return headers
+
+    def get(self, name, url_name, role, paths):
+        paths = list(paths)
+        requests = [{'path': paths[i % len(paths)], 'headers': self.headers(role)} for i in range(self.count)]
+        return Scenario(name, url_name, role, 'GET', requests)
+
+    def post(self, name, url_name, role, items):
+        """items - тройки (путь, данные формы, ключ сессии или None), по одной на запрос"""
+        requests = [
+            {'path': path, 'method': 'POST', 'body': urlencode(data),
+             'headers': self.headers(role, session_key, post=True)}
+            for path, data, session_key in items
+        ]
+        return Scenario(name, url_name, role, 'POST', requests)
+
+    def build(self):
+        return [
+            *self.public(),
+            *self.guest_pages(),
+            *self.booking(),
+            *self.api(),
+            *self.staff_pages(),
+            *self.staff_actions(),
+            *self.documents(),
+        ]
+
+    def public(self):
+        filters = ['', '?type=lux', '?capacity=2', '?max_price=9000', '?type=comfort&capacity=3']
+        return [
+            self.get('home', 'home', 'anon', [reverse('home')]),
+            self.get('rooms', 'rooms', 'anon', [reverse('rooms') + query for query in filters]),
+            self.get('signup_form', 'signup', 'anon', [reverse('signup')]),
+            self.get('login_form', 'login', 'anon', [reverse('login')]),
+        ]
+
+    def guest_pages(self):
+        sessions = [create_session(self.guest) for _ in range(self.count)]
+        return [
+            self.get('dashboard', 'dashboard', 'guest', [reverse('dashboard')]),
+            self.get('user_dashboard', 'user_dashboard', 'guest', [reverse('user_dashboard')]),
+            self.get('user_booking_list', 'user_booking_list', 'guest', [reverse('user_booking_list')]),
+            self.get('profile', 'profile', 'guest', [reverse('profile')]),
+            self.get('profile_edit', 'profile_edit', 'guest', [reverse('profile_edit')]),
+            self.post('logout', 'logout', 'guest',
+                      [(reverse('logout'), {}, session) for session in sessions]),
+        ]
+
+    def booking(self):
+        room = Room.objects.create(type='comfort', name='Нагрузочный тест', capacity=4,
+                                   price_per_day=Decimal('6000'), description='Номер для сценариев с записью')
+        create_start = self.today + timedelta(days=FAR_FUTURE)
+        creates = [
+            (reverse('booking_create'), {
+                'room': room.id,
+                'check_in': create_start + timedelta(days=2 * i),
+                'check_out': create_start + timedelta(days=2 * i + 1),
+                'guests': 2,
+            }, None)
+            for i in range(self.count)
+        ]
+
+        # Брони для отмены гостем и смены статуса администратором
+        cancel_start = create_start + timedelta(days=2 * self.count + 30)
+        pending = Booking.objects.bulk_create([
+            Booking(user=self.guest, room=room, room_type=room.type, guests=1,
+                    check_in=cancel_start + timedelta(days=2 * i),
+                    check_out=cancel_start + timedelta(days=2 * i + 1),
+                    total_price=room.price_per_day, status='pending')
+            for i in range(2 * self.count)
+        ])
+        to_cancel, to_confirm = pending[:self.count], pending[self.count:]
+
+        # Лист ожидания на даты отменяемых броней: отмена делает предложение другому гостю
+        other = User.objects.filter(is_staff=False).exclude(pk=self.guest.pk).first() or self.guest
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(user=other, room=room, room_type=room.type, guests=1,
+                          check_in=booking.check_in, check_out=booking.check_out)
+            for booking in to_cancel
+        ])
+        waitlist_start = cancel_start + timedelta(days=4 * self.count + 30)
+        joins = [
+            (reverse('waitlist'), {
+                'room_type': room.type,
+                'check_in': waitlist_start + timedelta(days=2 * i),
+                'check_out': waitlist_start + timedelta(days=2 * i + 1),
+                'guests': 1,
+            }, None)
+            for i in range(self.count)
+        ]
+        to_leave = WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(user=self.guest, room_type=room.type, guests=1,
+                          check_in=waitlist_start, check_out=waitlist_start + timedelta(days=3))
+            for _ in range(self.count)
+        ])
+
+        return [
+            self.get('booking_form', 'booking_create', 'guest',
+                     [f"{reverse('booking_create')}?room_id={r.id}" for r in self.rooms]),
+            self.post('booking_create', 'booking_create', 'guest', creates),
+            self.post('booking_cancel', 'booking_cancel', 'guest', [
+                (reverse('booking_cancel'), {'booking_id': booking.id, 'reason': 'Нагрузочный тест'}, None)
+                for booking in to_cancel
+            ]),
+            self.get('waitlist_page', 'waitlist', 'guest', [reverse('waitlist')]),
+            self.post('waitlist_join', 'waitlist', 'guest', joins),
+            self.post('waitlist_respond', 'waitlist_respond', 'guest', [
+                (reverse('waitlist_respond', args=[entry.id]), {'action': 'leave'}, None) for entry in to_leave
+            ]),
+            self.post('admin_change_booking_status', 'admin_change_booking_status', 'staff', [
+                (reverse('admin_change_booking_status'), {'booking_id': booking.id, 'status': 'confirmed'}, None)
+                for booking in to_confirm
+            ]),
+        ]
+
+    def api(self):
+        availability = []
+        for room in self.rooms:
+            check_in = self.today + timedelta(days=self.rnd.randint(1, 150))
+            check_out = check_in + timedelta(days=self.rnd.randint(3, 14))
+            availability.append(f"{reverse('api_room_availability')}?"
+                                + urlencode({'room_id': room.id, 'check_in': check_in, 'check_out': check_out}))
+        return [
+            self.get('api_room_availability', 'api_room_availability', 'guest', availability),
+            self.get('api_room_busy_dates', 'api_room_busy_dates', 'anon',
+                     [reverse('api_room_busy_dates', args=[room.id]) for room in self.rooms]),
+            self.get('api_room_inventory', 'api_room_inventory', 'anon',
+                     [reverse('api_room_inventory') + query
+                      for query in ['', '?room_type=comfort', f'?date_from={self.today + timedelta(days=30)}&days=90']]),
+            self.batch(availability),
+            self.get('api_earliest_slots', 'api_earliest_slots', 'guest',
+                     [reverse('api_earliest_slots', args=[procedure_id]) + query
+                      for procedure_id in self.procedure_ids for query in ['', '?days=30&limit=20']]),
+            self.get('api_catalog', 'api_catalog', 'anon',
+                     [reverse('api_catalog', args=[resource]) + query
+                      for resource in ['rooms', 'categories', 'procedures', 'doctors']
+                      for query in ['', '?fields=id,name&limit=10']]),
+        ]
+
+    def batch(self, availability):
+        """Как страница бронирования: занятые даты и доступность номера одним POST"""
+        headers = {**self.headers('guest', post=True), 'Content-Type': 'application/json'}
+        requests = []
+        for index in range(self.count):
+            room = self.rooms[index % len(self.rooms)]
+            body = json.dumps({'requests': [
+                {'id': 'busy', 'path': reverse('api_room_busy_dates', args=[room.id])},
+                {'id': 'availability', 'path': availability[index % len(availability)]},
+            ]})
+            requests.append({'path': reverse('api_batch'), 'method': 'POST', 'body': body, 'headers': headers})
+        return Scenario('api_batch', 'api_batch', 'guest', 'POST', requests)
+
+    def staff_pages(self):
+        booking_filters = ['', '?status=pending', '?status=confirmed&room_type=lux',
+                           f'?date_from={self.today - timedelta(days=30)}&date_to={self.today + timedelta(days=30)}',
+                           '?page=3']
+        user_filters = ['', '?search=user00001', '?role=guest', '?active=active', '?page=2']
+        report_filters = ['', '?period=week', '?period=month&room_type=lux',
+                          f'?date_from={self.today - timedelta(days=365)}&period=month']
+        appointment_filters = ['', '?status=scheduled',
+                               f'?date_from={self.today - timedelta(days=30)}&date_to={self.today}']
+        profiles = GuestProfile.objects.order_by('?').values_list('user_id', flat=True)[:20]
+        return [
+            self.get('admin_dashboard', 'admin_dashboard', 'staff', [reverse('admin_dashboard')]),
+            self.get('admin_booking_list', 'admin_booking_list', 'staff',
+                     [reverse('admin_booking_list') + query for query in booking_filters]),
+            self.get('admin_room_list', 'admin_room_list', 'staff', [reverse('admin_room_list')]),
+            self.get('admin_user_list', 'admin_user_list', 'staff',
+                     [reverse('admin_user_list') + query for query in user_filters]),
+            self.get('admin_user_profile', 'admin_user_profile', 'staff',
+                     [reverse('admin_user_profile', args=[user_id]) for user_id in profiles]),
+            self.get('admin_user_create', 'admin_user_create', 'staff', [reverse('admin_user_create')]),
+            self.get('admin_cache_stats', 'admin_cache_stats', 'staff', [reverse('admin_cache_stats')]),
+            self.get('admin_rate_limit_stats', 'admin_rate_limit_stats', 'staff',
+                     [reverse('admin_rate_limit_stats')]),
+            self.get('admin_query_report', 'admin_query_report', 'staff', [reverse('admin_query_report')]),
+            self.get('admin_revenue_report', 'admin_revenue_report', 'staff',
+                     [reverse('admin_revenue_report') + query for query in report_filters]),
+            self.get('api_revenue_report', 'api_revenue_report', 'staff',
+                     [reverse('api_revenue_report') + query for query in report_filters]),
+            self.get('admin_import', 'admin_import', 'staff', [reverse('admin_import')]),
+            self.get('admin_export_bookings', 'admin_export_bookings', 'staff',
+                     [reverse('admin_export_bookings') + query for query in booking_filters[:4]]),
+            self.get('admin_export_appointments', 'admin_export_appointments', 'staff',
+                     [reverse('admin_export_appointments') + query for query in appointment_filters]),
+            self.get('admin_export_guests', 'admin_export_guests', 'staff',
+                     [reverse('admin_export_guests') + query for query in user_filters[:2]]),
+        ]
+
+    def staff_actions(self):
+        # Отдельные пользователи без броней: каждый запрос меняет или удаляет своего
+        User.objects.bulk_create([
+            User(username=f'loadtest_tmp_{i:05d}', password='!') for i in range(2 * self.count)
+        ])
+        ids = list(User.objects.filter(username__startswith='loadtest_tmp_')
+                   .order_by('id').values_list('id', flat=True))
+        to_toggle, to_delete = ids[:self.count], ids[self.count:]
+        return [
+            self.post('admin_toggle_user_active', 'admin_toggle_user_active', 'staff', [
+                (reverse('admin_toggle_user_active', args=[user_id]), {}, None) for user_id in to_toggle
+            ]),
+            self.post('admin_delete_user', 'admin_delete_user', 'staff', [
+                (reverse('admin_delete_user', args=[user_id]), {}, None) for user_id in to_delete
+            ]),
+        ]
+
+    def documents(self):
+        document = EncryptedDocument.objects.filter(profile__user=self.guest).first()
+        write_document_file(document, os.urandom(256 * 1024), 'scan.pdf', 'application/pdf')
+        return [
+            self.get('upload_documents', 'upload_documents', 'guest', [reverse('upload_documents')]),
+            self.get('verify_documents', 'verify_documents', 'staff',
+                     [reverse('verify_documents', args=[self.guest.id])]),
+            self.get('download_document', 'download_document', 'staff',
+                     [reverse('download_document', args=[document.id])]),
+        ]
+
+
+def write_document_file(document, content, name, content_type, chunk_size=64 * 1024):
+    """Шифрует content в хранилище документов и привязывает файл к документу"""
+    token = uuid.uuid4().hex
+    storage_name = os.path.join(token[:2], f'{token}.enc')
+    path = document_path(storage_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    encryptor = EncryptionService.stream_encryptor()
+    with open(path, 'wb') as f:
+        f.write(encryptor.start())
+        for start in range(0, len(content), chunk_size):
+            f.write(encryptor.update(content[start:start + chunk_size]))
+        f.write(encryptor.finalize())
+
+    document.file_name = storage_name
+    document.original_name = name
+    document.content_type = content_type
+    document.file_size = len(content)
+    document.save(update_fields=['file_name', 'original_name', 'content_type', 'file_size'])
+
+
+def uncovered_routes(scenarios):
+    """Маршруты accounts/urls.py без сценария"""
+    from . import urls
+    covered = {scenario.url_name for scenario in scenarios} | UNMEASURED_ROUTES
+    return sorted(p.name for p in urls.urlpatterns if p.name and p.name not in covered)
+
+
+# Сравнение с baseline
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, rows, meta):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        'meta': meta,
+        'scenarios': {
+            row['scenario']: {key: row[key] for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries')}
+            for row in rows
+        },
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare_with_baseline(rows, baseline, tolerance, min_delta_ms=5.0):
+    """
+    Отмечает в строках отклонение от baseline. Регрессия: медиана задержки
+    выросла больше чем на tolerance (и на min_delta_ms), либо стало больше
+    SQL-запросов. p95/p99 при малом числе запросов слишком шумные для проверки.
+    """
+    regressions = []
+    for row in rows:
+        base = baseline['scenarios'].get(row['scenario'])
+        if base is None:
+            row['vs_baseline'] = 'new'
+            continue
+
+        problems = []
+        delta = row['p50_ms'] - base['p50_ms']
+        if delta > base['p50_ms'] * tolerance and delta > min_delta_ms:
+            problems.append(f"p50 {base['p50_ms']}→{row['p50_ms']} ms")
+        if row['queries'] > base['queries'] + 0.5:
+            problems.append(f"queries {base['queries']}→{row['queries']}")
+
+        change = (delta / base['p50_ms'] * 100) if base['p50_ms'] else 0.0
+        row['vs_baseline'] = f'p50 {change:+.0f}%' + (' REGRESSION' if problems else '')
+        if problems:
+            regressions.append(f"{row['scenario']}: {', '.join(problems)}")
+    return regressions
@@ -0,0 +1,38 @@
+# accounts/management/commands/assign_rooms.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.assignment import assign_rooms
+from accounts.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        'Подбор номеров для броней без номера (только тип) по принципу best-fit; '
+        'с --reoptimize заново раскладываются и автоматически подобранные будущие брони'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-type', choices=[value for value, _ in Room.TYPE_CHOICES],
+                            help='Только брони этого типа')
+        parser.add_argument('--reoptimize', action='store_true',
+                            help='Переложить и брони, номер которых уже подобран автоматически')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не записывая')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = assign_rooms(options['room_type'], reoptimize=options['reoptimize'],
+                              dry_run=options['dry_run'])
+
+        if result.unplaced:
+            shown = ', '.join(str(pk) for pk in result.unplaced[:20])
+            more = f' и еще {len(result.unplaced) - 20}' if len(result.unplaced) > 20 else ''
+            self.stdout.write(self.style.WARNING(f'Нет свободного номера для броней: {shown}{more}'))
+
+        prefix = 'Проверка (без записи)' if options['dry_run'] else 'Подбор'
+        style = self.style.SUCCESS if not result.unplaced else self.style.WARNING
+        self.stdout.write(style(
+            f'{prefix} за {time.monotonic() - started:.1f} с: назначено {result.assigned}, '
+            f'переложено {result.moved}, без номера {len(result.unplaced)}'
+        ))
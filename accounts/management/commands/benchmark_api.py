@@ -0,0 +1,116 @@
+# accounts/management/commands/benchmark_api.py
+import importlib.util
+import os
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from accounts.benchmarking import create_session, free_port, format_table, run_load, start_server
+from accounts.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает JSON API под ASGI (uvicorn, async-представления) и WSGI '
+        '(gunicorn, синхронные представления) при разной конкурентности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', default=[],
+                            help='Уже запущенный сервер: имя=http://host:port (можно несколько)')
+        parser.add_argument('--spawn', action='store_true',
+                            help='Запустить uvicorn и gunicorn самостоятельно')
+        parser.add_argument('--server-workers', type=int, default=1,
+                            help='Процессов на сервер при --spawn')
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help='Потоков gunicorn при --spawn')
+        parser.add_argument('--concurrency', default='1,10,50',
+                            help='Уровни конкурентности через запятую')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов на каждый уровень')
+        parser.add_argument('--room-id', type=int, help='Номер для запросов (по умолчанию первый активный)')
+        parser.add_argument('--username', help='Пользователь для api_room_availability (требует входа)')
+
+    def handle(self, *args, **options):
+        room = self.get_room(options['room_id'])
+        levels = [int(level) for level in options['concurrency'].split(',') if level]
+        endpoints = self.build_endpoints(room, options['username'])
+
+        processes = []
+        targets = [target.split('=', 1) for target in options['target']]
+        try:
+            if options['spawn']:
+                targets += self.spawn_servers(processes, options)
+            if not targets:
+                raise CommandError('Укажите --target имя=URL или --spawn')
+
+            rows = []
+            for name, base_url in targets:
+                for endpoint, (path, headers) in endpoints.items():
+                    for concurrency in levels:
+                        result = run_load(base_url, [path] * options['requests'], concurrency,
+                                          name=name, headers=headers)
+                        rows.append({'server': name, 'endpoint': endpoint,
+                                     'concurrency': concurrency, **result.as_dict()})
+                        self.stdout.write(f'{name} {endpoint} c={concurrency}: {result.rps:.0f} rps')
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+        self.stdout.write('')
+        self.stdout.write(format_table(rows, ['server', 'endpoint', 'concurrency', 'requests',
+                                              'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms']))
+
+    def get_room(self, room_id):
+        rooms = Room.objects.filter(is_active=True)
+        room = rooms.filter(id=room_id).first() if room_id else rooms.first()
+        if room is None:
+            raise CommandError('Нет активных номеров для бенчмарка')
+        return room
+
+    def build_endpoints(self, room, username):
+        endpoints = {
+            'busy-dates': (reverse('api_room_busy_dates', args=[room.id]), {}),
+        }
+        if username:
+            check_in = date.today() + timedelta(days=30)
+            path = (f"{reverse('api_room_availability')}?room_id={room.id}"
+                    f"&check_in={check_in}&check_out={check_in + timedelta(days=7)}")
+            cookie = f'{settings.SESSION_COOKIE_NAME}={self.create_session(username)}'
+            endpoints['availability'] = (path, {'Cookie': cookie})
+        return endpoints
+
+    def create_session(self, username):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {username} не найден')
+        return create_session(user)
+
+    def spawn_servers(self, processes, options):
+        missing = [module for module in ('uvicorn', 'gunicorn') if importlib.util.find_spec(module) is None]
+        if missing:
+            raise CommandError(f'Для --spawn не установлены {", ".join(missing)}: '
+                               f'pip install -r requirements-dev.txt')
+
+        workers = str(options['server_workers'])
+        # Без ограничения частоты: нагрузка идет с одного адреса
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'sanatorium.settings', 'DJANGO_RATE_LIMIT': '0'}
+
+        asgi_port = free_port()
+        processes.append(start_server(
+            ['-m', 'uvicorn', 'sanatorium.asgi:application', '--port', str(asgi_port),
+             '--workers', workers, '--log-level', 'warning', '--no-access-log'],
+            asgi_port, env))
+
+        wsgi_port = free_port()
+        processes.append(start_server(
+            ['-m', 'gunicorn', 'sanatorium.wsgi:application', '--bind', f'127.0.0.1:{wsgi_port}',
+             '--workers', workers, '--threads', str(options['wsgi_threads']), '--log-level', 'warning'],
+            wsgi_port, env))
+
+        return [('asgi', f'http://127.0.0.1:{asgi_port}'), ('wsgi', f'http://127.0.0.1:{wsgi_port}')]
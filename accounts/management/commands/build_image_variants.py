@@ -0,0 +1,58 @@
+# accounts/management/commands/build_image_variants.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from accounts.images import build_variants, image_sources, variant_widths, variants_root
+from accounts.models import Room, Doctor
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии (WebP/JPEG) для всех фото номеров и врачей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Количество процессов')
+        parser.add_argument('--force', action='store_true',
+                            help='Проверить и все фото, для которых варианты уже есть')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for model in (Room, Doctor):
+                total += self.process_model(model, pool, options['force'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: обработано {total} фото за {time.monotonic() - started:.1f} с'
+        ))
+
+    def process_model(self, model, pool, force):
+        image_field, hash_field = image_sources(model)
+        queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+        if not force:
+            queryset = queryset.filter(**{hash_field: ''})
+
+        objects = []
+        futures = []
+        for obj in queryset.only('pk', image_field, hash_field).iterator():
+            image = getattr(obj, image_field)
+            if not os.path.exists(image.path):
+                self.stderr.write(f'{model.__name__} #{obj.pk}: файл {image.name} не найден')
+                continue
+            objects.append(obj)
+            futures.append(pool.submit(build_variants, image.path, variants_root(), variant_widths()))
+
+        updated = []
+        for obj, future in zip(objects, futures):
+            try:
+                setattr(obj, hash_field, future.result())
+                updated.append(obj)
+            except Exception as e:
+                self.stderr.write(f'{model.__name__} #{obj.pk}: {e}')
+
+        model.objects.bulk_update(updated, [hash_field], batch_size=500)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {len(updated)}')
+        return len(updated)
@@ -0,0 +1,50 @@
+# accounts/management/commands/generate_data.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.seeding import DataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические данные для проверки на объемах, близких к '
+        'боевым: гости, номера, брони за несколько лет, врачи, расписание, '
+        'записи на процедуры, медицинские карты'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Количество гостей')
+        parser.add_argument('--rooms', type=int, default=100, help='Количество номеров')
+        parser.add_argument('--years', type=float, default=2, help='За сколько лет генерировать брони')
+        parser.add_argument('--bookings', type=int,
+                            help='Точное количество броней (по умолчанию одна на ~12 дней на номер)')
+        parser.add_argument('--doctors', type=int, default=20, help='Количество врачей')
+        parser.add_argument('--procedures', type=int, default=30, help='Количество процедур')
+        parser.add_argument('--medical-share', type=float, default=0.3,
+                            help='Доля завершенных броней с медицинской картой')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора')
+        parser.add_argument('--prefix', default='gen', help='Префикс имен пользователей и номеров')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Размер пачки bulk_create')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Данные с префиксом "{prefix}" уже есть, укажите другой --prefix')
+
+        generator = DataGenerator(seed=options['seed'], prefix=prefix, batch_size=options['batch_size'],
+                                  log=self.stdout.write)
+        try:
+            counts = generator.run(
+                users=options['users'], rooms=options['rooms'], years=options['years'],
+                bookings=options['bookings'], doctors=options['doctors'],
+                procedures=options['procedures'], medical_share=options['medical_share'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rate = counts['bookings'] / counts['seconds'] if counts['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {counts['seconds']:.1f} с: {counts['bookings']} броней ({rate:.0f}/с), "
+            f"{counts['users']} гостей, {counts['rooms']} номеров, "
+            f"{counts['medical_records']} медицинских карт, {counts['appointments']} записей"
+        ))
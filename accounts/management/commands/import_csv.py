@@ -0,0 +1,43 @@
+# accounts/management/commands/import_csv.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.imports import BATCH_SIZE, IMPORTERS, import_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт справочников из CSV (UTF-8, разделитель ; или ,): номера, '
+        'категории процедур, процедуры, врачи, расписание. Существующие записи '
+        'обновляются по ключу (у номеров - по названию), ошибочные строки пропускаются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS), help='Что импортируем')
+        parser.add_argument('path', help='Путь к CSV-файлу')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить файл, ничего не записывая')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Строк в одной пачке записи')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_csv(options['kind'], file, dry_run=options['dry_run'],
+                                    batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть файл: {e}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'Строка {line}: {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'... и еще {result.error_count - len(result.errors)} ошибок'))
+
+        prefix = 'Проверка (без записи)' if options['dry_run'] else 'Импорт'
+        style = self.style.SUCCESS if not result.error_count else self.style.WARNING
+        self.stdout.write(style(
+            f"{prefix} за {time.monotonic() - started:.1f} с: строк {result.rows}, "
+            f"создано {result.created}, обновлено {result.updated}, ошибок {result.error_count}"
+        ))
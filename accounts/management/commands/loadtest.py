@@ -0,0 +1,142 @@
+# accounts/management/commands/loadtest.py
+import os
+import platform
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts.benchmarking import format_table, run_load
+from accounts.loadtest import (
+    SCENARIO_HEADER, LoadTestServer, ScenarioBuilder, compare_with_baseline, load_baseline,
+    save_baseline, uncovered_routes,
+)
+from accounts.seeding import seed_dataset
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'loadtest_baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест всех маршрутов accounts: отдельная временная база с '
+        'тестовыми данными, локальный сервер, p50/p95/p99, RPS и SQL-запросы '
+        'на запрос, сравнение с сохраненным baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных клиентов')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора данных')
+        parser.add_argument('--users', type=int, default=200, help='Гостей в тестовых данных')
+        parser.add_argument('--rooms', type=int, default=30, help='Номеров в тестовых данных')
+        parser.add_argument('--years', type=float, default=1, help='За сколько лет генерировать брони')
+        parser.add_argument('--scenario', action='append', default=[],
+                            help='Запустить только указанные сценарии (можно несколько)')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Файл baseline (JSON)')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Сохранить результаты как новый baseline')
+        parser.add_argument('--no-baseline', action='store_true',
+                            help='Не сравнивать с baseline (пробный прогон)')
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='Допустимый рост p50 относительно baseline (0.5 = 50%%)')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory(prefix='loadtest-') as tmp, override_settings(
+            CACHE_VERSION_DB=os.path.join(tmp, 'cache_versions.sqlite3'),
+            # Лимитер работает (его стоимость входит в замер), но нагрузку с одного адреса не режет
+            RATE_LIMIT_DB=os.path.join(tmp, 'rate_limit.sqlite3'),
+            RATE_LIMIT_BURST=10 ** 9,
+            DOCUMENT_STORAGE_ROOT=os.path.join(tmp, 'documents'),
+        ):
+            old_name = self.create_database(tmp)
+            try:
+                rows = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write('')
+        compare = not options['save_baseline'] and not options['no_baseline']
+        baseline = load_baseline(options['baseline']) if compare else None
+        regressions = []
+        columns = ['scenario', 'role', 'method', 'requests', 'errors', 'rps',
+                   'p50_ms', 'p95_ms', 'p99_ms', 'queries']
+        if baseline:
+            regressions = compare_with_baseline(rows, baseline, options['tolerance'])
+            columns.append('vs_baseline')
+        self.stdout.write(format_table(rows, columns))
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], rows, {
+                **self.data_options(options),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+            })
+            self.stdout.write(self.style.SUCCESS(f"Baseline сохранен: {options['baseline']}"))
+
+        failed = [row['scenario'] for row in rows if row['errors']]
+        if failed:
+            raise CommandError(f'Ошибки в сценариях: {", ".join(failed)}')
+        if compare and baseline is None:
+            # Без baseline все сценарии "new" и регрессия не видна - это ошибка, а не успех
+            raise CommandError(f"Baseline не найден ({options['baseline']}): сохраните его на этой машине "
+                               f"через --save-baseline или запустите с --no-baseline")
+        if compare:
+            mismatched = [f'{key}={value} (в baseline {baseline["meta"].get(key)})'
+                          for key, value in self.data_options(options).items()
+                          if baseline['meta'].get(key) != value]
+            if mismatched:
+                raise CommandError('Параметры прогона не совпадают с baseline: ' + ', '.join(mismatched))
+        if regressions:
+            raise CommandError('Регрессии относительно baseline:\n' + '\n'.join(regressions))
+
+    def data_options(self, options):
+        """Параметры, от которых зависят цифры: сравнивать можно только прогоны с одинаковыми"""
+        return {key: options[key] for key in ('requests', 'users', 'rooms', 'years', 'concurrency', 'seed')}
+
+    def create_database(self, tmp):
+        """Временная база в файле (не в памяти), чтобы ее видели потоки сервера"""
+        old_name = connection.settings_dict['NAME']
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, 'loadtest.sqlite3')
+        self.stdout.write('Создание временной базы...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name
+
+    def run(self, options):
+        caches['default'].clear()
+        summary = seed_dataset(seed=options['seed'], users=options['users'], rooms=options['rooms'],
+                               years=options['years'])
+        self.stdout.write(
+            f"Данные: {summary['users']} гостей, {summary['rooms']} номеров, "
+            f"{summary['bookings']} броней, {summary['appointments']} записей на процедуры"
+        )
+
+        scenarios = ScenarioBuilder(options['requests'], seed=options['seed']).build()
+        for url_name in uncovered_routes(scenarios):
+            self.stdout.write(self.style.WARNING(f'Маршрут без сценария: {url_name}'))
+        if options['scenario']:
+            scenarios = [s for s in scenarios if s.name in options['scenario']]
+            if not scenarios:
+                raise CommandError('Не найдено ни одного сценария из --scenario')
+
+        server = LoadTestServer()
+        server.start()
+        try:
+            rows = []
+            for scenario in scenarios:
+                headers = {SCENARIO_HEADER: scenario.name}
+                if scenario.method == 'GET':
+                    # Прогрев: шаблоны, кеш и соединения не должны попадать в замер
+                    run_load(server.base_url, scenario.requests[:options['concurrency']],
+                             options['concurrency'], headers={SCENARIO_HEADER: 'warmup'})
+                result = run_load(server.base_url, scenario.requests, options['concurrency'],
+                                  name=scenario.name, headers=headers)
+                result.extra['queries'] = server.application.queries_per_request(scenario.name)
+                rows.append({'scenario': scenario.name, 'role': scenario.role,
+                             'method': scenario.method, **result.as_dict()})
+                self.stdout.write(f'{scenario.name}: {result.rps:.0f} rps, {result.errors} ошибок')
+        finally:
+            server.stop()
+        return rows
@@ -0,0 +1,20 @@
+# accounts/management/commands/rebuild_inventory.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import inventory
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает занятость номеров по типам и дням (свободные номера) по активным броням'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Броней в одной пачке чтения')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        date_to, rows = inventory.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Занятость по {date_to} пересчитана: {rows} строк за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,195 @@
+# accounts/management/commands/rotate_encryption_key.py
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.encryption import EncryptionService, EncryptionError
+from accounts.models import EncryptedDocument
+from accounts.uploads import delete_document_file, reencrypt_document
+
+
+def reencrypt_rows(rows, version, keys):
+    """
+    Перешифровывает пачку (id, шифротекст, файл скана) в дочернем процессе.
+    Возвращает изменившиеся документы: (id, старый шифротекст, старый файл,
+    новый шифротекст, новый файл) - и id документов с ошибкой.
+    """
+    updated, failed = [], []
+    for doc_id, encrypted_data, file_name in rows:
+        try:
+            new_data = EncryptionService.reencrypt(encrypted_data, version, keys) if encrypted_data else ''
+            new_file = (reencrypt_document(file_name, version, keys) if file_name else None) or file_name
+        except FileNotFoundError:
+            # Файла нет - перешифровывать нечего (скачивание и так отдаст 404)
+            new_file = file_name
+        except (EncryptionError, ValueError, OSError):
+            failed.append(doc_id)
+            continue
+        if (new_data, new_file) != (encrypted_data, file_name):
+            updated.append((doc_id, encrypted_data, file_name, new_data, new_file))
+    return updated, failed
+
+
+class Command(BaseCommand):
+    help = 'Перешифровывает документы и сканы текущим ключом (ENCRYPTION_KEY_VERSION) с возобновлением'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Документов в одной пачке')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Количество процессов для шифрования')
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / '.key_rotation.json'),
+                            help='Файл с прогрессом ротации')
+        parser.add_argument('--restart', action='store_true',
+                            help='Игнорировать сохраненный прогресс и начать сначала')
+
+    def handle(self, *args, **options):
+        version = EncryptionService.current_version()
+        keys = EncryptionService.get_keys()
+        if version not in keys:
+            raise CommandError(f'Ключ версии {version} не найден в ENCRYPTION_KEYS')
+
+        self.checkpoint_path = options['checkpoint']
+        state = self.load_checkpoint(version, options['restart'])
+        if state['last_id']:
+            self.stdout.write(f"Продолжаем с id > {state['last_id']} (уже обработано: {state['processed']})")
+
+        chunk_size = options['chunk_size']
+        workers = max(1, options['workers'])
+        started = time.monotonic()
+        processed = failed = conflicts = 0
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Ошибки прошлых запусков повторяем первыми: продолжение идет с last_id
+            retry = state['failed']
+            state['failed'] = []
+            if retry:
+                self.stdout.write(f'Повторяем документы с ошибками: {len(retry)}')
+                rows = self.fetch_rows(retry, version)
+                done, errors, skipped = self.write_chunk(
+                    self.submit_chunk(pool, rows, version, keys, workers), state['last_id'], state
+                )
+                processed += done
+                failed += len(errors)
+                conflicts += skipped
+                self.report(state, processed, started, errors)
+
+            pending = None
+            last_id = state['last_id']
+            while True:
+                rows = self.fetch_chunk(last_id, version, chunk_size)
+                future = None
+                if rows:
+                    last_id = rows[-1][0]
+                    future = self.submit_chunk(pool, rows, version, keys, workers)
+
+                # Пока пул шифрует текущую пачку, записываем предыдущую
+                if pending is not None:
+                    done, errors, skipped = self.write_chunk(*pending, state)
+                    processed += done
+                    failed += len(errors)
+                    conflicts += skipped
+                    self.report(state, processed, started, errors)
+
+                if future is None:
+                    break
+                pending = (future, last_id)
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: перешифровано {processed} документов за {elapsed:.1f} с '
+            f'({rate:.0f} док/с), ошибок: {failed}, изменены во время ротации (пропущены): {conflicts}'
+        ))
+        # Пока есть непереведенные документы, прогресс нужен для повтора,
+        # а ротация не завершена: старым ключом еще что-то зашифровано
+        if state['failed']:
+            raise CommandError(f"Не перешифрованы документы {state['failed']}: они будут повторены "
+                               f"при следующем запуске, старый ключ удалять нельзя")
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def pending_documents(self, version):
+        """
+        Документы, данные которых еще не зашифрованы текущим ключом, и все
+        документы со сканом: версия ключа файла записана в нем самом, ее
+        проверяет дочерний процесс.
+        """
+        old_data = ~Q(encrypted_data='') & ~Q(encrypted_data__startswith=f'{EncryptionService.PREFIX}v{version}:')
+        return (EncryptedDocument.objects.filter(old_data | ~Q(file_name=''))
+                .order_by('id').values_list('id', 'encrypted_data', 'file_name'))
+
+    def fetch_chunk(self, last_id, version, chunk_size):
+        """Следующая пачка документов после last_id"""
+        return list(self.pending_documents(version).filter(id__gt=last_id)[:chunk_size])
+
+    def fetch_rows(self, ids, version):
+        """Документы из списка ids, которые все еще нужно перешифровать"""
+        return list(self.pending_documents(version).filter(id__in=ids))
+
+    def submit_chunk(self, pool, rows, version, keys, workers):
+        """Делит пачку между процессами"""
+        step = max(1, -(-len(rows) // workers))
+        return [pool.submit(reencrypt_rows, rows[i:i + step], version, keys)
+                for i in range(0, len(rows), step)]
+
+    def write_chunk(self, futures, last_id, state):
+        updated, errors = [], []
+        for future in futures:
+            done, failed = future.result()
+            updated.extend(done)
+            errors.extend(failed)
+
+        # Пишем только если шифротекст и файл не изменились с момента чтения: правку,
+        # сделанную во время ротации, не затираем (она уже зашифрована текущим ключом)
+        written = 0
+        unused_files = []
+        with transaction.atomic():
+            for doc_id, old_data, old_file, new_data, new_file in updated:
+                saved = EncryptedDocument.objects.filter(id=doc_id, encrypted_data=old_data, file_name=old_file) \
+                    .update(encrypted_data=new_data, file_name=new_file)
+                written += saved
+                if new_file != old_file:
+                    # Записан новый файл - старый не нужен; не записан - не нужен новый
+                    unused_files.append(old_file if saved else new_file)
+        for file_name in unused_files:
+            delete_document_file(file_name)
+        conflicts = len(updated) - written
+
+        state['last_id'] = last_id
+        state['processed'] += written
+        state['conflicts'] += conflicts
+        state['failed'].extend(errors)
+        self.save_checkpoint(state)
+        return written, errors, conflicts
+
+    def report(self, state, processed, started, errors):
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(f"id <= {state['last_id']}: {processed} документов, {rate:.0f} док/с")
+        if errors:
+            self.stderr.write(f'Не удалось расшифровать документы: {errors}')
+
+    def load_checkpoint(self, version, restart):
+        state = {'version': version, 'last_id': 0, 'processed': 0, 'conflicts': 0, 'failed': []}
+        if restart or not os.path.exists(self.checkpoint_path):
+            return state
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            saved = json.load(f)
+        # Прогресс ротации на другой ключ не используем
+        if saved.get('version') != version:
+            return state
+        state.update(saved)
+        return state
+
+    def save_checkpoint(self, state):
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,80 @@
+# accounts/management/commands/run_worker.py
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+
+from accounts import taskqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди фоновых задач (модель Task): забирает задачи по приоритету '
+        'и выполняет их в пуле потоков или процессов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Задач одновременно')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Пул потоков (по умолчанию) или процессов - для задач, нагружающих CPU')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза между опросами пустой очереди (секунд)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        taskqueue.autodiscover()
+        concurrency = max(1, options['concurrency'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        if options['pool'] == 'process':
+            # Процессы запускаются через spawn (fork не дружит с открытыми соединениями
+            # к БД); модуль задач импортируется до django.setup, поэтому инициализация -
+            # сам django.setup, а tasks.py подгружается при первой задаче
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=django.setup,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        self.stdout.write(f'Воркер {worker_id}: {concurrency} ({options["pool"]}), '
+                          f'задачи: {", ".join(sorted(taskqueue.registered_tasks())) or "нет"}')
+
+        counts = {}
+        running = set()
+        try:
+            while not self.stopping:
+                claimed = []
+                if len(running) < concurrency:
+                    claimed = taskqueue.claim(worker_id, concurrency - len(running))
+                    running.update(executor.submit(taskqueue.execute, pk, token) for pk, token in claimed)
+
+                if running:
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        status = future.result()
+                        counts[status] = counts.get(status, 0) + 1
+                elif options['burst']:
+                    break
+                elif not claimed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановка: ждем выполняющиеся задачи...')
+        finally:
+            # Взятые задачи доводим до конца, новые не берем
+            executor.shutdown(wait=True)
+            for future in running:
+                if not future.cancelled() and future.exception() is None:
+                    status = future.result()
+                    counts[status] = counts.get(status, 0) + 1
+
+        summary = ', '.join(f'{status}: {count}' for status, count in sorted(counts.items())) or 'задач не было'
+        self.stdout.write(self.style.SUCCESS(f'Воркер остановлен ({summary})'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
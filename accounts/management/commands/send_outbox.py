@@ -0,0 +1,32 @@
+# accounts/management/commands/send_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из EmailOutbox пачками через одно SMTP-соединение. '
+        'По умолчанию разбирает очередь и завершается, с --loop работает постоянно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Писем в одной пачке')
+        parser.add_argument('--loop', action='store_true', help='Не завершаться, ждать новые письма')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза при пустой очереди (секунд)')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = outbox.drain(options['batch_size'], log=self.stdout.write)
+                total_sent += sent
+                total_failed += failed
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Отправлено {total_sent}, ошибок {total_failed}'))
@@ -0,0 +1,33 @@
+# accounts/management/commands/send_reminders.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import reminders
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Неверная дата: {value} (нужно ГГГГ-ММ-ДД)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Ставит в очередь писем напоминания о записях на процедуры на завтра: '
+        'одно письмо на пациента. Запускать раз в день (cron); отправляет send_outbox'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=parse_date, help='Дата записей (ГГГГ-ММ-ДД), по умолчанию - завтра')
+        parser.add_argument('--batch-size', type=int, default=reminders.BATCH_SIZE, help='Пациентов в одной пачке')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        messages, marked = reminders.send_reminders(options['date'], batch_size=options['batch_size'],
+                                                    log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Писем в очереди: {messages}, записей отмечено: {marked} за {time.monotonic() - started:.1f} с'
+        ))
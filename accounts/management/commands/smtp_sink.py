@@ -0,0 +1,33 @@
+# accounts/management/commands/smtp_sink.py
+from django.core.management.base import BaseCommand
+
+from accounts.smtp_sink import SmtpSink
+
+
+class Command(BaseCommand):
+    help = (
+        'Локальная заглушка SMTP: принимает письма и печатает их заголовки. '
+        'Для проверки send_outbox: DJANGO_EMAIL_HOST=127.0.0.1 DJANGO_EMAIL_PORT=1025'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=1025, help='Порт (по умолчанию 1025)')
+        parser.add_argument('--reject', action='append', default=[],
+                            help='Отклонять письма на этот адрес (можно несколько)')
+        parser.add_argument('--body', action='store_true', help='Печатать текст писем')
+
+    def handle(self, *args, **options):
+        def on_message(sender, recipients, message):
+            self.stdout.write(f"{message['Date']} {sender} -> {', '.join(recipients)}: {message['Subject']}")
+            if options['body']:
+                body = message.get_body(preferencelist=('plain',))
+                self.stdout.write((body.get_content() if body else '') + '\n')
+
+        server = SmtpSink(port=options['port'], reject_recipients=options['reject'], on_message=on_message)
+        self.stdout.write(f'SMTP-заглушка слушает 127.0.0.1:{server.port}, Ctrl+C для остановки')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,124 @@
+# accounts/middleware.py
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+# Нормализация SQL: одинаковые по форме запросы дают один отпечаток
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def sql_fingerprint(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper: считает запросы, время и повторы одинаковых запросов"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[sql_fingerprint(sql)] += 1
+
+    def suspected_n_plus_one(self, threshold):
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > threshold]
+
+
+class QueryReport:
+    """Сводка по имени URL за время жизни процесса"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def add(self, url_name, recorder, threshold):
+        suspected = recorder.suspected_n_plus_one(threshold)
+        with self.lock:
+            route = self.routes.setdefault(url_name, {
+                'url_name': url_name,
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'sql_time': 0.0,
+                'n_plus_one': {},
+            })
+            route['requests'] += 1
+            route['queries'] += recorder.count
+            route['max_queries'] = max(route['max_queries'], recorder.count)
+            route['sql_time'] += recorder.duration
+            for sql, repeats in suspected:
+                item = route['n_plus_one'].setdefault(sql, {'sql': sql, 'requests': 0, 'max_repeats': 0})
+                item['requests'] += 1
+                item['max_repeats'] = max(item['max_repeats'], repeats)
+
+    def rows(self):
+        with self.lock:
+            rows = []
+            for route in self.routes.values():
+                requests = route['requests']
+                rows.append({
+                    **route,
+                    'avg_queries': round(route['queries'] / requests, 1),
+                    'avg_sql_ms': round(route['sql_time'] * 1000 / requests, 2),
+                    'n_plus_one': sorted(route['n_plus_one'].values(),
+                                         key=lambda item: -item['max_repeats']),
+                })
+        return sorted(rows, key=lambda row: (-len(row['n_plus_one']), -row['avg_queries']))
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+query_report = QueryReport()
+
+
+class QueryInspectorMiddleware:
+    """
+    Считает SQL-запросы каждого представления и ищет вероятные N+1
+    (один и тот же по форме запрос выполнен больше QUERY_INSPECTOR_N1_THRESHOLD раз).
+
+    Результат - в заголовке X-Query-Stats и на странице admin/queries/.
+    Включается настройкой QUERY_INSPECTOR_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_INSPECTOR_N1_THRESHOLD', 5)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        suspected = recorder.suspected_n_plus_one(self.threshold)
+        response['X-Query-Stats'] = (
+            f'count={recorder.count}; time_ms={recorder.duration * 1000:.1f}; '
+            f'n_plus_one={len(suspected)}'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            query_report.add(match.url_name, recorder, self.threshold)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_alter_guestprofile_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='masked_data',
+            field=models.CharField(blank=True, db_index=True, max_length=20, verbose_name='Маскированные данные'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_encrypteddocument_masked_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Тип файла'),
+        ),
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Файл в хранилище'),
+        ),
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='file_sha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256 файла'),
+        ),
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Размер файла'),
+        ),
+        migrations.AddField(
+            model_name='encrypteddocument',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Имя файла'),
+        ),
+    ]
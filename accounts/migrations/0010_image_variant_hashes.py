@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_encrypteddocument_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='photo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хеш фото (варианты готовы)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хеш фото (варианты готовы)'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_image_variant_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRoomTypeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('room_type', models.CharField(choices=[('standard', 'Стандартный'), ('comfort', 'Комфорт'), ('lux', 'Люкс')], max_length=20, verbose_name='Тип номера')),
+                ('rooms_total', models.PositiveIntegerField(default=0, verbose_name='Номеров в фонде')),
+                ('booked_nights', models.IntegerField(default=0, verbose_name='Проданных ночей')),
+                ('arrivals', models.IntegerField(default=0, verbose_name='Заездов')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Статистика по типу номера за день',
+                'verbose_name_plural': 'Статистика по типам номеров по дням',
+                'ordering': ['date', 'room_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyroomtypestats',
+            constraint=models.UniqueConstraint(fields=('date', 'room_type'), name='unique_daily_room_type_stats'),
+        ),
+    ]
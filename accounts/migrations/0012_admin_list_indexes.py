@@ -0,0 +1,67 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_daily_room_type_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_time'], name='appointment_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['created_at'], name='booking_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room_type', 'created_at'], name='booking_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encrypteddocument',
+            index=models.Index(fields=['uploaded_at'], name='document_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encrypteddocument',
+            index=models.Index(fields=['verified', 'uploaded_at'], name='document_verified_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guestprofile',
+            index=models.Index(fields=['document_status'], name='guest_document_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guestprofile',
+            index=models.Index(fields=['created_at'], name='guest_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['admission_date'], name='medical_admission_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['is_active', 'admission_date'], name='medical_active_admission_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduleslot',
+            index=models.Index(fields=['day_of_week', 'start_time'], name='slot_day_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatmententry',
+            index=models.Index(fields=['performed_at'], name='treatment_performed_idx'),
+        ),
+    ]
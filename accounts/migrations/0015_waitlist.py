@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:07
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_task_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('standard', 'Стандартный'), ('comfort', 'Комфорт'), ('lux', 'Люкс')], max_length=20, verbose_name='Тип номера')),
+                ('check_in', models.DateField(verbose_name='Дата заезда')),
+                ('check_out', models.DateField(verbose_name='Дата выезда')),
+                ('guests', models.IntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(4)], verbose_name='Гостей')),
+                ('status', models.CharField(choices=[('waiting', 'В ожидании'), ('offered', 'Предложено'), ('booked', 'Забронировано'), ('declined', 'Отказ'), ('expired', 'Предложение истекло'), ('cancelled', 'Отменено')], default='waiting', max_length=20, verbose_name='Статус')),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Предложение действует до')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('offer', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='accounts.booking', verbose_name='Удерживающая бронь')),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='accounts.room', verbose_name='Номер')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись в листе ожидания',
+                'verbose_name_plural': 'Лист ожидания',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'room_type', 'check_in'], name='waitlist_match_idx'), models.Index(fields=['status', 'offer_expires_at'], name='waitlist_offer_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='room_auto_assigned',
+            field=models.BooleanField(default=False, verbose_name='Номер подобран автоматически'),
+        ),
+    ]
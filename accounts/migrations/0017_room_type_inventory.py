@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-19 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_booking_room_auto_assigned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRoomTypeInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('room_type', models.CharField(choices=[('standard', 'Стандартный'), ('comfort', 'Комфорт'), ('lux', 'Люкс')], max_length=20, verbose_name='Тип номера')),
+                ('reserved', models.IntegerField(default=0, verbose_name='Занято номеров')),
+            ],
+            options={
+                'verbose_name': 'Занятость типа номера за день',
+                'verbose_name_plural': 'Занятость типов номеров по дням',
+                'ordering': ['date', 'room_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyroomtypeinventory',
+            constraint=models.UniqueConstraint(fields=('room_type', 'date'), name='unique_daily_room_type_inventory'),
+        ),
+    ]
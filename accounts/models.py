@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from datetime import date
+import json
+
+from .encryption import EncryptionService
 
 class GuestProfile(models.Model):
     GENDER_CHOICES = [
@@ -97,6 +101,10 @@ class GuestProfile(models.Model):
     class Meta:
         verbose_name = 'Профиль пациента'
         verbose_name_plural = 'Профили пациентов'
+        indexes = [
+            models.Index(fields=['document_status'], name='guest_document_status_idx'),
+            models.Index(fields=['created_at'], name='guest_created_idx'),
+        ]
         permissions = [
             ('can_view_sensitive_data', 'Может просматривать чувствительные данные'),
             ('can_verify_documents', 'Может проверять документы'),
@@ -158,8 +166,12 @@ class Room(models.Model):  # ПЕРЕМЕЩАЕМ Room ПЕРЕД Booking!
     price_per_day = models.DecimalField(max_digits=8, decimal_places=2)
     description = models.TextField(max_length=500)
     image = models.ImageField(upload_to='rooms/', blank=True, null=True)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                  verbose_name='Хеш фото (варианты готовы)')
     is_active = models.BooleanField(default=True)
 
+    IMAGE_FIELD = 'image'
+
     class Meta:
         verbose_name = 'Номер'
         verbose_name_plural = 'Номера'
@@ -195,11 +207,30 @@ class Booking(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(max_length=500, blank=True)
+    # Номер подобран assignment.py: такую будущую бронь можно переложить в другой номер
+    room_auto_assigned = models.BooleanField('Номер подобран автоматически', default=False)
+
+    # Поля, изменения которых отслеживают сигналы (кеш, сводки, уведомления)
+    TRACKED_FIELDS = ('room_id', 'room_type', 'status', 'check_in', 'check_out', 'total_price')
 
     class Meta:
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['-created_at']
+        # Списки бронирований: фильтр по статусу/типу, сортировка по дате создания
+        indexes = [
+            models.Index(fields=['created_at'], name='booking_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+            models.Index(fields=['room_type', 'created_at'], name='booking_type_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Состояние на момент загрузки: pre_save берет его вместо повторного чтения
+        if all(name in field_names for name in cls.TRACKED_FIELDS):
+            instance._loaded_state = {name: getattr(instance, name) for name in cls.TRACKED_FIELDS}
+        return instance
 
     def __str__(self):
         if self.room:
@@ -223,7 +254,14 @@ class Booking(models.Model):
 
     def save(self, *args, **kwargs):
         self.total_price = self.get_price_per_day() * self.days
-        super().save(*args, **kwargs)
+        # Номер, выбранный вручную, автоподбор больше не трогает
+        loaded = getattr(self, '_loaded_state', None)
+        if self.room_auto_assigned and loaded and loaded['room_id'] != self.room_id:
+            self.room_auto_assigned = False
+        # Бронь и то, что пишут сигналы post_save (сводки, письма в EmailOutbox), -
+        # одной транзакцией
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def can_change_status(self, new_status):
         """Проверка возможности изменения статуса"""
@@ -242,6 +280,102 @@ class Booking(models.Model):
         return True, ""
 
 
+class WaitlistEntry(models.Model):
+    """
+    Лист ожидания: гость хочет номер (конкретный или любой номер типа) на
+    даты, которые сейчас заняты. При отмене брони waitlist.py предлагает
+    освободившиеся ночи и держит их за гостем временной бронью (offer).
+    """
+    STATUS_CHOICES = [
+        ('waiting', 'В ожидании'),
+        ('offered', 'Предложено'),
+        ('booked', 'Забронировано'),
+        ('declined', 'Отказ'),
+        ('expired', 'Предложение истекло'),
+        ('cancelled', 'Отменено'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='waitlist_entries',
+                             null=True, blank=True, verbose_name='Номер')
+    # Для конкретного номера - его тип: поиск кандидатов идет по типу
+    room_type = models.CharField('Тип номера', max_length=20, choices=Room.TYPE_CHOICES)
+    check_in = models.DateField('Дата заезда')
+    check_out = models.DateField('Дата выезда')
+    guests = models.IntegerField('Гостей', default=1, validators=[MinValueValidator(1), MaxValueValidator(4)])
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='waiting')
+    offer = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='waitlist_entry', verbose_name='Удерживающая бронь')
+    offer_expires_at = models.DateTimeField('Предложение действует до', null=True, blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Запись в листе ожидания'
+        verbose_name_plural = 'Лист ожидания'
+        ordering = ['created_at']
+        indexes = [
+            # Подбор кандидатов: диапазон дат заезда по типу номера, без полного просмотра
+            models.Index(fields=['status', 'room_type', 'check_in'], name='waitlist_match_idx'),
+            models.Index(fields=['status', 'offer_expires_at'], name='waitlist_offer_expiry_idx'),
+        ]
+
+    def __str__(self):
+        place = self.room.name if self.room else self.get_room_type_display()
+        return f"{self.user.username}: {place}, {self.check_in:%d.%m.%Y}–{self.check_out:%d.%m.%Y}"
+
+    @property
+    def days(self):
+        return (self.check_out - self.check_in).days
+
+
+class DailyRoomTypeStats(models.Model):
+    """
+    Сводка по типу номера за день: проданные ночи, заезды и выручка.
+    Обновляется сигналами Booking (см. rollups.py), пересобирается
+    командой rebuild_rollups. Отчеты читают только эту таблицу.
+    """
+    date = models.DateField('Дата')
+    room_type = models.CharField('Тип номера', max_length=20, choices=Room.TYPE_CHOICES)
+    rooms_total = models.PositiveIntegerField('Номеров в фонде', default=0)
+    booked_nights = models.IntegerField('Проданных ночей', default=0)
+    arrivals = models.IntegerField('Заездов', default=0)
+    revenue = models.DecimalField('Выручка', max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Статистика по типу номера за день'
+        verbose_name_plural = 'Статистика по типам номеров по дням'
+        ordering = ['date', 'room_type']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'room_type'], name='unique_daily_room_type_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.get_room_type_display()}"
+
+
+class DailyRoomTypeInventory(models.Model):
+    """
+    Занятые ночи по типу номера за день: активные брони (ожидающие и
+    подтвержденные), в том числе без конкретного номера. Свободно =
+    номеров типа - reserved. Обновляется сигналами Booking (inventory.py),
+    пересобирается командой rebuild_inventory. Дня без строки - нет броней.
+    """
+    date = models.DateField('Дата')
+    room_type = models.CharField('Тип номера', max_length=20, choices=Room.TYPE_CHOICES)
+    reserved = models.IntegerField('Занято номеров', default=0)
+
+    class Meta:
+        verbose_name = 'Занятость типа номера за день'
+        verbose_name_plural = 'Занятость типов номеров по дням'
+        ordering = ['date', 'room_type']
+        constraints = [
+            models.UniqueConstraint(fields=['room_type', 'date'], name='unique_daily_room_type_inventory'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.get_room_type_display()}: {self.reserved}"
+
+
 class ProcedureCategory(models.Model):
     """Категория процедур"""
     name = models.CharField(max_length=100, verbose_name='Название категории')
@@ -287,8 +421,12 @@ class Doctor(models.Model):
     experience = models.PositiveIntegerField(verbose_name='Стаж (лет)')
     bio = models.TextField(max_length=1000, blank=True, verbose_name='Биография')
     photo = models.ImageField(upload_to='doctors/', blank=True, null=True, verbose_name='Фото')
+    photo_hash = models.CharField(max_length=64, blank=True, editable=False,
+                                  verbose_name='Хеш фото (варианты готовы)')
     procedures = models.ManyToManyField(Procedure, verbose_name='Проводимые процедуры')
 
+    IMAGE_FIELD = 'photo'
+
     class Meta:
         verbose_name = 'Врач'
         verbose_name_plural = 'Врачи'
@@ -320,6 +458,9 @@ class ScheduleSlot(models.Model):
         verbose_name = 'Слот расписания'
         verbose_name_plural = 'Слоты расписания'
         ordering = ['day_of_week', 'start_time']
+        indexes = [
+            models.Index(fields=['day_of_week', 'start_time'], name='slot_day_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.doctor} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
@@ -348,11 +489,18 @@ class Appointment(models.Model):
                               default='scheduled', verbose_name='Статус')
     notes = models.TextField(max_length=500, blank=True, verbose_name='Примечания')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    # Ставит reminders.send_reminders; выборка идет по appointment_status_date_idx
+    reminded_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                       verbose_name='Напоминание отправлено')
 
     class Meta:
         verbose_name = 'Запись на процедуру'
         verbose_name_plural = 'Записи на процедуры'
         ordering = ['appointment_date', 'appointment_time']
+        indexes = [
+            models.Index(fields=['appointment_date', 'appointment_time'], name='appointment_date_time_idx'),
+            models.Index(fields=['status', 'appointment_date'], name='appointment_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.patient} - {self.procedure} ({self.appointment_date})"
@@ -376,6 +524,10 @@ class MedicalRecord(models.Model):
     class Meta:
         verbose_name = 'Медицинская карта'
         verbose_name_plural = 'Медицинские карты'
+        indexes = [
+            models.Index(fields=['admission_date'], name='medical_admission_idx'),
+            models.Index(fields=['is_active', 'admission_date'], name='medical_active_admission_idx'),
+        ]
 
     def __str__(self):
         return f"Карта: {self.patient} ({self.admission_date})"
@@ -397,6 +549,9 @@ class TreatmentEntry(models.Model):
         verbose_name = 'Запись о лечении'
         verbose_name_plural = 'Записи о лечении'
         ordering = ['-performed_at']
+        indexes = [
+            models.Index(fields=['performed_at'], name='treatment_performed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.appointment.procedure} - {self.performed_at.date()}"
@@ -421,6 +576,17 @@ class EncryptedDocument(models.Model):
     # Зашифрованные данные
     encrypted_data = models.TextField(verbose_name='Зашифрованные данные', blank=True)
 
+    # Маскированное представление (считается один раз в set_data, без дешифрования при выводе)
+    masked_data = models.CharField(max_length=20, blank=True, db_index=True,
+                                   verbose_name='Маскированные данные')
+
+    # Скан документа: в базе только ссылка на зашифрованный файл в хранилище
+    file_name = models.CharField(max_length=255, blank=True, verbose_name='Файл в хранилище')
+    original_name = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
+    content_type = models.CharField(max_length=100, blank=True, verbose_name='Тип файла')
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='Размер файла')
+    file_sha256 = models.CharField(max_length=64, blank=True, verbose_name='SHA-256 файла')
+
     # Метаданные
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
@@ -432,18 +598,166 @@ class EncryptedDocument(models.Model):
                                     related_name='verified_document_files',  # ИЗМЕНЕНО
                                     verbose_name='Кем проверен')
 
+    # Заглушки на случай, если маска еще не посчитана
+    DEFAULT_MASKS = {
+        'passport': "** ** ******",
+        'snils': "***-***-*** **",
+        'oms': "************ ****",
+    }
+
+    # Какие маски дублируются в профиль пациента
+    PROFILE_MASK_FIELDS = {
+        'passport': 'passport_masked',
+        'snils': 'snils_masked',
+    }
+
     class Meta:
         verbose_name = 'Зашифрованный документ'
         verbose_name_plural = 'Зашифрованные документы'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['uploaded_at'], name='document_uploaded_idx'),
+            models.Index(fields=['verified', 'uploaded_at'], name='document_verified_uploaded_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_document_type_display()} для {self.profile}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.sync_profile_mask()
+
+    @staticmethod
+    def build_masked_value(document_type, data):
+        """Строит маскированное представление из открытых данных"""
+        if document_type == 'passport':
+            series = data.get('series', '')
+            number = data.get('number', '')
+            if series and number:
+                return f"{series[:2]}** ****{number[-2:]}"
+
+        elif document_type == 'snils':
+            snils = data.get('number', '')
+            if snils and len(snils) >= 4:
+                return f"***-***-*** {snils[-2:]}"
+
+        elif document_type == 'oms':
+            oms = data.get('number', '')
+            if oms and len(oms) >= 8:
+                return f"************ {oms[-4:]}"
+
+        return ''
+
+    def set_data(self, data_dict):
+        """Шифрует данные и сразу считает маску для отображения"""
+        json_data = json.dumps(data_dict, ensure_ascii=False)
+        self.encrypted_data = EncryptionService.encrypt(json_data) or ''
+        self.masked_data = self.build_masked_value(self.document_type, data_dict)
+
+    def get_data(self):
+        """Дешифрует и возвращает данные (только для проверки, не для списков)"""
+        if not self.encrypted_data:
+            return {}
+        try:
+            return json.loads(EncryptionService.decrypt(self.encrypted_data))
+        except (TypeError, ValueError):
+            return {}
+
     def get_masked_display(self):
-        """Возвращает маскированные данные для отображения"""
-        if self.document_type == 'passport':
-            return "** ** ******"
-        elif self.document_type == 'snils':
-            return "***-***-*** **"
-        return "***"
\ No newline at end of file
+        """Возвращает маскированные данные для отображения (без дешифрования)"""
+        return self.masked_data or self.DEFAULT_MASKS.get(self.document_type, "***")
+
+    def attach_file(self, uploaded):
+        """Сохраняет ссылку на файл, загруженный EncryptedFileUploadHandler"""
+        self.file_name = uploaded.storage_name
+        self.original_name = uploaded.name[:255]
+        self.content_type = (uploaded.content_type or '')[:100]
+        self.file_size = uploaded.size
+        self.file_sha256 = uploaded.sha256
+
+    def sync_profile_mask(self):
+        """Копирует маску паспорта/СНИЛС в профиль пациента"""
+        field = self.PROFILE_MASK_FIELDS.get(self.document_type)
+        if not field or not self.masked_data:
+            return
+        GuestProfile.objects.filter(pk=self.profile_id).update(**{field: self.masked_data})
+        # Держим в актуальном состоянии уже загруженный профиль
+        if 'profile' in self._state.fields_cache:
+            setattr(self.profile, field, self.masked_data)
+
+
+class EmailOutbox(models.Model):
+    """
+    Исходящее письмо. Пишется в той же транзакции, что и изменение, которое
+    его вызвало (см. outbox.py), отправляется командой send_outbox.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Не отправлено'),
+    ]
+
+    dedup_key = models.CharField('Ключ дедупликации', max_length=200, unique=True)
+    to = models.EmailField('Получатель')
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ['-created_at']
+        indexes = [
+            # Выборка очередной пачки: status + next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to}: {self.subject}"
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди на базе данных (см. taskqueue.py), выполняется
+    командой run_worker.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.JSONField('Аргументы', default=list, blank=True)
+    kwargs = models.JSONField('Именованные аргументы', default=dict, blank=True)
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField('Приоритет', default=0)
+    run_at = models.DateTimeField('Выполнить не раньше', default=timezone.now)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=3)
+    timeout = models.PositiveIntegerField('Тайм-аут видимости (секунд)', default=300)
+    locked_by = models.CharField('Воркер', max_length=64, blank=True)
+    locked_until = models.DateTimeField('Занята до', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создана', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['-created_at']
+        indexes = [
+            # Выборка воркером: очередь по приоритету и времени
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_queue_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
@@ -0,0 +1,179 @@
+# accounts/outbox.py
+"""
+Исходящая почта через таблицу EmailOutbox (transactional outbox).
+
+Запрос только пишет строку письма - в той же транзакции, что и изменение
+(бронь создана, сменился статус), поэтому письмо не теряется при сбое и
+не уходит для отмененной транзакции, а задержка SMTP не попадает в запрос.
+Команда send_outbox забирает письма пачками и отправляет их через одно
+SMTP-соединение; неудачные попытки повторяются с экспоненциальной
+задержкой. Повторная постановка письма с тем же dedup_key игнорируется.
+"""
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 60           # секунд до второй попытки, дальше - вдвое больше
+BACKOFF_MAX = 6 * 60 * 60
+# Сколько письмо считается занятым воркером: после падения воркера
+# письмо снова попадет в выборку
+LEASE_SECONDS = 5 * 60
+
+BOOKING_SUBJECTS = {
+    'pending': 'Заявка на бронирование №{id} принята',
+    'confirmed': 'Бронирование №{id} подтверждено',
+    'cancelled': 'Бронирование №{id} отменено',
+    'completed': 'Спасибо, что были у нас! Бронирование №{id} завершено',
+}
+
+
+def enqueue(to, subject, body, dedup_key):
+    """Ставит письмо в очередь в текущей транзакции; дубль по dedup_key игнорируется"""
+    # INSERT OR IGNORE без предварительного SELECT
+    EmailOutbox.objects.bulk_create(
+        [EmailOutbox(to=to, subject=subject, body=body, dedup_key=dedup_key)],
+        ignore_conflicts=True,
+    )
+
+
+def entries_into(booking_id, status):
+    """Сколько раз бронь переходила в статус status - по ключам писем о переходах"""
+    prefix = f'booking:{booking_id}:'
+    # Диапазон, а не startswith: LIKE в SQLite не использует уникальный индекс dedup_key
+    keys = EmailOutbox.objects.filter(dedup_key__gte=prefix, dedup_key__lt=f'{prefix}\uffff') \
+        .values_list('dedup_key', flat=True)
+    return sum(1 for key in keys if key[len(prefix):].split(':')[0].endswith(f'->{status}'))
+
+
+def booking_status_key(booking, previous_status):
+    """
+    Ключ письма о переходе: booking:<id>:<было>-><стало>:<n>, n - номер
+    захода брони в статус "было". Одновременные одинаковые переходы
+    (два администратора подтвердили одну заявку) получают один ключ и одно
+    письмо, а повторный переход (confirmed -> pending -> confirmed) - новый.
+    """
+    if previous_status is None:
+        return f'booking:{booking.pk}:new->{booking.status}:1'
+    number = entries_into(booking.pk, previous_status)
+    return f'booking:{booking.pk}:{previous_status}->{booking.status}:{number}'
+
+
+def notify_booking_status(booking, previous_status=None):
+    """Письмо гостю о новой брони (previous_status=None) или смене ее статуса"""
+    subject = BOOKING_SUBJECTS.get(booking.status)
+    email = booking.user.email
+    if not subject or not email:
+        return
+    body = render_to_string('emails/booking_status.txt', {'booking': booking, 'user': booking.user})
+    enqueue(email, subject.format(id=booking.pk), body, booking_status_key(booking, previous_status))
+
+
+def backoff(attempts):
+    """Задержка перед следующей попыткой после attempts неудачных"""
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def claim_batch(batch_size):
+    """
+    Забирает пачку писем, готовых к отправке: помечает их sending и
+    продлевает next_attempt_at на LEASE_SECONDS.
+    """
+    now = timezone.now()
+    ready = Q(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+    ids = list(EmailOutbox.objects.filter(ready).order_by('next_attempt_at')
+               .values_list('pk', flat=True)[:batch_size])
+    if not ids:
+        return []
+    lease = now + timedelta(seconds=LEASE_SECONDS)
+    EmailOutbox.objects.filter(ready, pk__in=ids).update(status='sending', next_attempt_at=lease,
+                                                         attempts=F('attempts') + 1)
+    # Письма, которые за это время забрал другой воркер, получили другой lease
+    return list(EmailOutbox.objects.filter(pk__in=ids, status='sending', next_attempt_at=lease)
+                .order_by('next_attempt_at', 'pk'))
+
+
+def record_failure(message, error, permanent=False):
+    message.last_error = f'{type(error).__name__}: {error}'[:1000]
+    if permanent or message.attempts >= MAX_ATTEMPTS:
+        message.status = 'failed'
+    else:
+        message.status = 'pending'
+        message.next_attempt_at = timezone.now() + backoff(message.attempts)
+    message.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def deliver(messages, connection):
+    """
+    Отправляет письма через открытое соединение. Отправленные помечаются
+    одним UPDATE. Возвращает (отправлено, с ошибкой).
+    """
+    sent, failed = [], 0
+    for index, message in enumerate(messages):
+        email = EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.to],
+                             headers={'X-Outbox-Key': message.dedup_key}, connection=connection)
+        try:
+            email.send()
+        except smtplib.SMTPRecipientsRefused as e:
+            # Адрес отклонен сервером: повтор не поможет
+            record_failure(message, e, permanent=True)
+            failed += 1
+        except (smtplib.SMTPException, OSError) as e:
+            record_failure(message, e)
+            failed += 1
+            # Соединение могло оборваться: следующее письмо - через новое
+            try:
+                connection.close()
+                connection.open()
+            except (smtplib.SMTPException, OSError) as e:
+                for rest in messages[index + 1:]:
+                    record_failure(rest, e)
+                failed += len(messages) - index - 1
+                break
+        else:
+            sent.append(message.pk)
+    if sent:
+        EmailOutbox.objects.filter(pk__in=sent).update(status='sent', sent_at=timezone.now(), last_error='')
+    return len(sent), failed
+
+
+def drain(batch_size=100, log=None):
+    """
+    Отправляет все готовые письма пачками через одно соединение, которое
+    открывается только при наличии писем. Возвращает (отправлено, с ошибкой).
+    """
+    total_sent = total_failed = 0
+    connection = None
+    try:
+        while True:
+            messages = claim_batch(batch_size)
+            if not messages:
+                break
+            if connection is None:
+                try:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                except (smtplib.SMTPException, OSError) as e:
+                    # Сервер недоступен: попытка засчитывается, письма уходят на повтор
+                    for message in messages:
+                        record_failure(message, e)
+                    total_failed += len(messages)
+                    if log:
+                        log(f'SMTP недоступен: {e}')
+                    break
+            sent, failed = deliver(messages, connection)
+            total_sent += sent
+            total_failed += failed
+            if log:
+                log(f'Пачка: отправлено {sent}, ошибок {failed}')
+    finally:
+        if connection is not None:
+            connection.close()
+    return total_sent, total_failed
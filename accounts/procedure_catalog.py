@@ -0,0 +1,61 @@
+# accounts/procedure_catalog.py
+"""
+Каталог процедур: категории с числом активных процедур, диапазонами цен
+и длительности и вложенными процедурами.
+
+Сводка по категориям считается одним запросом с GROUP BY, процедуры -
+вторым; результат кешируется в пространстве имен cache.PROCEDURE_CATALOG,
+версия которого растет при любой записи Procedure/ProcedureCategory
+(signals.py, импорт CSV). Списки процедур строятся из каталога без
+запросов к базе.
+"""
+from django.db.models import Count, Max, Min, Q
+
+from . import cache
+from .models import Procedure, ProcedureCategory
+
+PROCEDURE_FIELDS = ('id', 'name', 'category_id', 'description', 'duration', 'price', 'is_active',
+                    'contraindications', 'preparation')
+
+
+def build_catalog():
+    active = Q(procedures__is_active=True)
+    categories = list(
+        ProcedureCategory.objects.annotate(
+            procedure_count=Count('procedures', filter=active),
+            min_price=Min('procedures__price', filter=active),
+            max_price=Max('procedures__price', filter=active),
+            min_duration=Min('procedures__duration', filter=active),
+            max_duration=Max('procedures__duration', filter=active),
+        ).order_by('name').values(
+            'id', 'name', 'description', 'icon',
+            'procedure_count', 'min_price', 'max_price', 'min_duration', 'max_duration',
+        )
+    )
+    by_id = {}
+    for category in categories:
+        category['procedures'] = []
+        by_id[category['id']] = category
+
+    procedures = list(Procedure.objects.order_by('category_id', 'name').values(*PROCEDURE_FIELDS))
+    for procedure in procedures:
+        category = by_id[procedure['category_id']]
+        # Как procedure.category.name в шаблонах
+        procedure['category'] = {'id': category['id'], 'name': category['name']}
+        if procedure['is_active']:
+            category['procedures'].append(procedure)
+    return {'categories': categories, 'procedures': procedures}
+
+
+def get_catalog():
+    """{'categories': [...с процедурами], 'procedures': [все процедуры]} из кеша"""
+    return cache.cached(cache.PROCEDURE_CATALOG, 'catalog', build_catalog)
+
+
+def catalog_procedures(catalog, category_id=None, active_only=True):
+    """Процедуры каталога, при необходимости - одной категории"""
+    return [
+        procedure for procedure in catalog['procedures']
+        if (not active_only or procedure['is_active'])
+        and (category_id is None or procedure['category_id'] == category_id)
+    ]
@@ -0,0 +1,250 @@
+# accounts/ratelimit.py
+"""
+Ограничение частоты запросов к /accounts/api/* (token bucket).
+
+У каждого клиента (пользователь, а для анонима - IP) есть "ведро" на
+RATE_LIMIT_BURST запросов, которое пополняется на RATE_LIMIT_RATE
+запросов в секунду. Ведра хранятся в общем SQLite-файле
+(settings.RATE_LIMIT_DB), как и версии кеша, поэтому лимит общий для
+всех процессов gunicorn. Проверка - один UPSERT: пополнение, списание и
+решение считаются в самом запросе, без отдельного чтения.
+
+Клиент, превысивший лимит, до конца ожидания помечается в локальном
+кеше и дальше не доходит ни до хранилища, ни до базы: он получает свой
+последний успешный ответ на тот же URL (если тот еще в кеше) или 429.
+"""
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+# Раз в столько проверок процесс удаляет давно полные ведра
+PRUNE_EVERY = 1000
+
+_ID_RE = re.compile(r'/\d+(?=/|$)')
+
+
+# Хранилище ведер
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(str(settings.RATE_LIMIT_DB), timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+            '(client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL)'
+        )
+        _local.conn = conn
+    return conn
+
+
+def take(client, rate, burst, now=None, cost=1):
+    """Списывает cost токенов клиента: (разрешено, осталось токенов)"""
+    now = time.time() if now is None else now
+    # Все выражения SET в SQLite видят старые значения строки
+    refilled = 'MIN(:burst, tokens + MAX(excluded.updated - updated, 0) * :rate)'
+    tokens, allowed = _connection().execute(
+        'INSERT INTO rate_limit_buckets (client, tokens, updated, allowed) '
+        'VALUES (:client, :burst - :cost, :now, 1) '
+        'ON CONFLICT(client) DO UPDATE SET '
+        f'tokens = {refilled} - ({refilled} >= :cost) * :cost, '
+        f'allowed = {refilled} >= :cost, '
+        'updated = excluded.updated '
+        'RETURNING tokens, allowed',
+        {'client': client, 'rate': rate, 'burst': burst, 'now': now, 'cost': cost}
+    ).fetchone()
+
+    with _stats_lock:
+        _stats['checks'] += 1
+        prune = _stats['checks'] % PRUNE_EVERY == 0
+    if prune:
+        # Ведро, которое не трогали дольше полного пополнения, равно новому
+        _connection().execute('DELETE FROM rate_limit_buckets WHERE updated < ?', (now - burst / rate,))
+    return bool(allowed), tokens
+
+
+def bucket_count():
+    """Клиентов в хранилище и из них с пустым ведром"""
+    total, empty = _connection().execute(
+        'SELECT COUNT(*), COALESCE(SUM(tokens < 1), 0) FROM rate_limit_buckets'
+    ).fetchone()
+    return {'clients': total, 'empty': empty}
+
+
+def charge(request, cost):
+    """
+    Дополнительные токены за запрос, который стоит нескольких (пакетный
+    запрос batch.py - по токену на подзапрос). False - лимит исчерпан.
+    """
+    if (cost <= 0 or not getattr(settings, 'RATE_LIMIT_ENABLED', False)
+            or not request.path.startswith(settings.RATE_LIMIT_PATH_PREFIX)):
+        return True
+    allowed, _ = take(client_key(request), settings.RATE_LIMIT_RATE, settings.RATE_LIMIT_BURST, cost=cost)
+    if not allowed:
+        _record('throttled')
+    return allowed
+
+
+# Счетчики
+
+def _record(kind, route=None):
+    with _stats_lock:
+        _stats[kind] += 1
+        if route:
+            _stats[(route, kind)] += 1
+
+
+def rate_limit_stats():
+    """Счетчики текущего процесса и состояние общего хранилища"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    routes = {}
+    for item, count in snapshot.items():
+        if isinstance(item, tuple):
+            route, kind = item
+            routes.setdefault(route, {'allowed': 0, 'throttled': 0, 'served_cached': 0})[kind] = count
+    return {
+        'rate': settings.RATE_LIMIT_RATE,
+        'burst': settings.RATE_LIMIT_BURST,
+        'checks': snapshot.get('checks', 0),
+        'allowed': snapshot.get('allowed', 0),
+        'throttled': snapshot.get('throttled', 0),
+        'served_cached': snapshot.get('served_cached', 0),
+        # Отбиты по локальной отметке, без обращения к хранилищу
+        'short_circuited': snapshot.get('short_circuited', 0),
+        'routes': routes,
+        'store': bucket_count(),
+    }
+
+
+# Middleware
+
+def client_key(request):
+    """Пользователь, если есть сессия, иначе IP"""
+    # Без cookie сессии не трогаем request.user: это запрос к базе
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    ip = request.META.get('REMOTE_ADDR', '')
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        ip = forwarded.split(',')[0].strip() or ip
+    return f'ip:{ip}'
+
+
+class RateLimitMiddleware:
+    """
+    Token bucket для путей RATE_LIMIT_PATH_PREFIX (см. модуль).
+    Ответы получают заголовки X-RateLimit-Limit/X-RateLimit-Remaining,
+    отказ - 429 с Retry-After. Включается настройкой RATE_LIMIT_ENABLED.
+    Работает и в async-цепочке (ASGI): async-представления и SSE не
+    переводятся в поток ради проверки лимита.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RATE_LIMIT_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.prefix = settings.RATE_LIMIT_PATH_PREFIX
+        self.rate = settings.RATE_LIMIT_RATE
+        self.burst = settings.RATE_LIMIT_BURST
+        self.cached_timeout = settings.RATE_LIMIT_CACHED_TIMEOUT
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith(self.prefix):
+            return self.get_response(request)
+
+        cache = caches['default']
+        client = client_key(request)
+        route, last_key = self.route_keys(request, client)
+
+        blocked_until = cache.get(f'ratelimit:blocked:{client}')
+        if blocked_until is not None:
+            _record('short_circuited')
+            return self.throttled(cache.get(last_key), route, blocked_until - time.time())
+
+        allowed, tokens = take(client, self.rate, self.burst)
+        if not allowed:
+            retry_after = (1 - tokens) / self.rate
+            cache.set(f'ratelimit:blocked:{client}', time.time() + retry_after, math.ceil(retry_after))
+            return self.throttled(cache.get(last_key), route, retry_after)
+
+        _record('allowed', route)
+        response = self.get_response(request)
+        if self.remember(request, response, tokens):
+            cache.set(last_key, (response.content, response['Content-Type']), self.cached_timeout)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.prefix):
+            return await self.get_response(request)
+
+        cache = caches['default']
+        # client_key может прочитать сессию, take - SQLite: оба синхронные
+        client = await sync_to_async(client_key)(request)
+        route, last_key = self.route_keys(request, client)
+
+        blocked_until = await cache.aget(f'ratelimit:blocked:{client}')
+        if blocked_until is not None:
+            _record('short_circuited')
+            return self.throttled(await cache.aget(last_key), route, blocked_until - time.time())
+
+        allowed, tokens = await sync_to_async(take)(client, self.rate, self.burst)
+        if not allowed:
+            retry_after = (1 - tokens) / self.rate
+            await cache.aset(f'ratelimit:blocked:{client}', time.time() + retry_after, math.ceil(retry_after))
+            return self.throttled(await cache.aget(last_key), route, retry_after)
+
+        _record('allowed', route)
+        response = await self.get_response(request)
+        if self.remember(request, response, tokens):
+            await cache.aset(last_key, (response.content, response['Content-Type']), self.cached_timeout)
+        return response
+
+    def route_keys(self, request, client):
+        # Счетчики по виду пути ("room/<id>/busy-dates"), а не по каждому id
+        route = _ID_RE.sub('/<id>', request.path[len(self.prefix) - 1:]).strip('/') or '-'
+        return route, f'ratelimit:last:{client}:{request.get_full_path()}'
+
+    def remember(self, request, response, tokens):
+        """Ставит заголовки лимита; True - ответ нужно запомнить для отдачи сверх лимита"""
+        response['X-RateLimit-Limit'] = str(self.burst)
+        response['X-RateLimit-Remaining'] = str(int(tokens))
+        # Ответ запоминаем, только когда клиент израсходовал половину запаса
+        return (tokens < self.burst / 2 and request.method == 'GET' and response.status_code == 200
+                and not response.streaming)
+
+    def throttled(self, last, route, retry_after):
+        retry_after = str(max(math.ceil(retry_after), 1))
+        if last is not None:
+            _record('served_cached', route)
+            content, content_type = last
+            response = HttpResponse(content, content_type=content_type)
+            response['X-RateLimit-Cached'] = '1'
+        else:
+            _record('throttled', route)
+            response = JsonResponse({'success': False, 'error': 'Слишком много запросов, повторите позже'},
+                                    status=429)
+        response['Retry-After'] = retry_after
+        response['X-RateLimit-Limit'] = str(self.burst)
+        response['X-RateLimit-Remaining'] = '0'
+        return response
@@ -0,0 +1,96 @@
+# accounts/reminders.py
+"""
+Напоминания о записях на процедуры на завтра (одно письмо на пациента).
+
+Запускается периодически (задача send_appointment_reminders или команда
+send_reminders). Записи выбираются диапазоном по индексу
+appointment_status_date_idx (status + appointment_date) пачками
+пациентов: одним запросом - все нужные поля со связанными таблицами,
+затем письма пачки ставятся в EmailOutbox одним bulk_create, а записи
+помечаются reminded_at одним update(). Пачка пишется в своей транзакции:
+письма и отметка либо есть обе, либо нет ни одной. Помеченные записи
+в выборку больше не попадают, поэтому повторный запуск напоминает
+только о добавленных позже.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Appointment, EmailOutbox
+
+BATCH_SIZE = 1000       # пациентов в пачке
+SUBJECT = 'Напоминание: процедуры на {date}'
+
+# Поля письма: одним запросом со всеми связанными таблицами
+APPOINTMENT_FIELDS = {
+    'first_name': F('patient__first_name'),
+    'middle_name': F('patient__middle_name'),
+    'email': F('patient__email'),
+    'user_email': F('patient__user__email'),
+    'procedure_name': F('procedure__name'),
+    'duration': F('procedure__duration'),
+    'preparation': F('procedure__preparation'),
+    'doctor_first_name': F('doctor__user__first_name'),
+    'doctor_last_name': F('doctor__user__last_name'),
+}
+
+
+def due_appointments(day):
+    """Записи на день day, о которых еще не напоминали"""
+    return Appointment.objects.filter(
+        status='scheduled', appointment_date__gte=day, appointment_date__lt=day + timedelta(days=1),
+        reminded_at__isnull=True,
+    )
+
+
+def reminder_message(day, appointments):
+    """Письмо пациенту обо всех его записях на день"""
+    first = appointments[0]
+    email = first['email'] or first['user_email']
+    if not email:
+        return None
+    body = render_to_string('emails/appointment_reminder.txt', {
+        'day': day, 'appointments': appointments,
+        'name': ' '.join(filter(None, [first['first_name'], first['middle_name']])),
+    })
+    # Ключ по первой записи: повторный запуск после сбоя не задвоит письмо,
+    # а записи, добавленные позже, получат свое
+    return EmailOutbox(to=email, subject=SUBJECT.format(date=day.strftime('%d.%m.%Y')), body=body,
+                       dedup_key=f'appointment-reminder:{day}:{first["patient_id"]}:{first["pk"]}')
+
+
+def send_batch(day, patient_ids):
+    """Напоминания пачке пациентов; возвращает (писем, записей)"""
+    by_patient = defaultdict(list)
+    for row in (due_appointments(day).filter(patient_id__in=patient_ids)
+                .order_by('patient_id', 'appointment_time', 'pk')
+                .values('pk', 'patient_id', 'appointment_time', **APPOINTMENT_FIELDS)):
+        by_patient[row['patient_id']].append(row)
+    if not by_patient:
+        return 0, 0
+
+    messages = [message for message in (reminder_message(day, rows) for rows in by_patient.values()) if message]
+    ids = [row['pk'] for rows in by_patient.values() for row in rows]
+    with transaction.atomic():
+        EmailOutbox.objects.bulk_create(messages, ignore_conflicts=True)
+        # Помечаются и записи пациентов без email: иначе они попадали бы в каждый запуск
+        marked = Appointment.objects.filter(pk__in=ids, reminded_at__isnull=True).update(reminded_at=timezone.now())
+    return len(messages), marked
+
+
+def send_reminders(day=None, batch_size=BATCH_SIZE, log=None):
+    """Ставит в очередь напоминания о записях на day (по умолчанию - на завтра); возвращает (писем, записей)"""
+    day = day or date.today() + timedelta(days=1)
+    patient_ids = list(due_appointments(day).order_by('patient_id').values_list('patient_id', flat=True).distinct())
+    total_messages = total_marked = 0
+    for start in range(0, len(patient_ids), batch_size):
+        messages, marked = send_batch(day, patient_ids[start:start + batch_size])
+        total_messages += messages
+        total_marked += marked
+        if log:
+            log(f'Пачка: писем {messages}, записей {marked}')
+    return total_messages, total_marked
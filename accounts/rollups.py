@@ -0,0 +1,256 @@
+# accounts/rollups.py
+"""
+Дневные сводки выручки и загрузки по типам номеров (DailyRoomTypeStats).
+
+Бронь со статусом из REVENUE_STATUSES дает каждой своей ночи +1 проданную
+ночь и долю выручки (total_price / число ночей), дню заезда - +1 заезд.
+При изменении брони из сводки вычитается вклад старого состояния
+(Booking._previous_state, см. signals.py) и добавляется вклад нового.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_DOWN
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc
+
+from .availability import ApiError
+from .models import Booking, DailyRoomTypeStats, Room
+
+# Статусы, которые считаются проданными ночами
+REVENUE_STATUSES = ('confirmed', 'completed')
+
+PERIODS = ('day', 'week', 'month')
+STAY_FIELDS = ('room_type', 'status', 'check_in', 'check_out', 'total_price')
+CENT = Decimal('0.01')
+
+# По умолчанию rebuild заполняет сводку на год вперед
+REBUILD_DAYS_AHEAD = 365
+REPORT_DEFAULT_DAYS = 30
+REPORT_MAX_DAYS = 3 * 366
+
+
+def nightly_revenue(check_in, check_out, total_price):
+    """Выручка брони по ночам: поровну, остаток копеек - на последнюю ночь"""
+    nights = (check_out - check_in).days
+    if nights <= 0:
+        return []
+    total = Decimal(total_price or 0)
+    share = (total / nights).quantize(CENT, rounding=ROUND_DOWN)
+    last = total - share * (nights - 1)
+    return [(check_in + timedelta(days=i), share if i < nights - 1 else last) for i in range(nights)]
+
+
+def add_stay(totals, stay, sign=1, date_from=None, date_to=None):
+    """Добавляет (sign=-1 - вычитает) вклад брони в totals[(день, тип)] = [ночи, заезды, выручка]"""
+    if not stay or stay['status'] not in REVENUE_STATUSES:
+        return
+    room_type = stay['room_type']
+    for day, revenue in nightly_revenue(stay['check_in'], stay['check_out'], stay['total_price']):
+        if (date_from and day < date_from) or (date_to and day > date_to):
+            continue
+        item = totals[(day, room_type)]
+        item[0] += sign
+        item[1] += sign if day == stay['check_in'] else 0
+        item[2] += sign * revenue
+
+
+def _new_totals():
+    return defaultdict(lambda: [0, 0, Decimal(0)])
+
+
+def rooms_by_type():
+    """Текущий фонд активных номеров по типам"""
+    return dict(Room.objects.filter(is_active=True).values_list('type').annotate(total=Count('id')))
+
+
+def booking_stay(booking):
+    return {field: getattr(booking, field) for field in STAY_FIELDS}
+
+
+def apply_booking_change(previous, current):
+    """
+    Переносит в сводку изменение брони: previous/current - словари с
+    полями STAY_FIELDS (None для новой или удаленной брони).
+    """
+    apply_booking_changes([(previous, current)])
+
+
+def apply_booking_changes(changes):
+    """Несколько изменений (пары previous, current) - одной серией UPDATE"""
+    totals = _new_totals()
+    for previous, current in changes:
+        add_stay(totals, previous, sign=-1)
+        add_stay(totals, current, sign=1)
+    deltas = {key: value for key, value in totals.items() if any(value)}
+    if not deltas:
+        return
+
+    # Чтение до транзакции: в SQLite транзакция, начатая с SELECT, при
+    # конкурентной записи получает "database is locked" вместо ожидания
+    rooms = rooms_by_type()
+    with transaction.atomic():
+        DailyRoomTypeStats.objects.bulk_create([
+            DailyRoomTypeStats(date=day, room_type=room_type, rooms_total=rooms.get(room_type, 0))
+            for day, room_type in deltas
+        ], ignore_conflicts=True)
+
+        # Дни с одинаковым изменением обновляются одним UPDATE
+        grouped = defaultdict(list)
+        for (day, room_type), (nights, arrivals, revenue) in deltas.items():
+            grouped[(room_type, nights, arrivals, revenue)].append(day)
+        for (room_type, nights, arrivals, revenue), days in grouped.items():
+            DailyRoomTypeStats.objects.filter(room_type=room_type, date__in=days).update(
+                booked_nights=F('booked_nights') + nights,
+                arrivals=F('arrivals') + arrivals,
+                revenue=F('revenue') + revenue,
+            )
+
+
+def refresh_rooms_total(since=None):
+    """Обновляет фонд номеров в сводке с указанной даты (по умолчанию с сегодня)"""
+    since = since or date.today()
+    rooms = rooms_by_type()
+    for room_type, _ in Room.TYPE_CHOICES:
+        DailyRoomTypeStats.objects.filter(room_type=room_type, date__gte=since).update(
+            rooms_total=rooms.get(room_type, 0)
+        )
+
+
+def rebuild(date_from=None, date_to=None, chunk_size=5000):
+    """
+    Пересчитывает сводку за период по сырым броням (по умолчанию - за все
+    время и на REBUILD_DAYS_AHEAD дней вперед). Дни без броней тоже
+    попадают в сводку, чтобы учитывался фонд номеров.
+    """
+    bookings = Booking.objects.filter(status__in=REVENUE_STATUSES)
+    if date_from:
+        bookings = bookings.filter(check_out__gt=date_from)
+    if date_to:
+        bookings = bookings.filter(check_in__lte=date_to)
+
+    totals = _new_totals()
+    for stay in bookings.values(*STAY_FIELDS).iterator(chunk_size=chunk_size):
+        add_stay(totals, stay, date_from=date_from, date_to=date_to)
+
+    days = [day for day, _ in totals]
+    date_from = date_from or min(days, default=date.today())
+    date_to = date_to or max(days + [date.today() + timedelta(days=REBUILD_DAYS_AHEAD)])
+
+    rooms = rooms_by_type()
+    rows = []
+    day = date_from
+    while day <= date_to:
+        for room_type, _ in Room.TYPE_CHOICES:
+            nights, arrivals, revenue = totals.get((day, room_type), (0, 0, Decimal(0)))
+            rows.append(DailyRoomTypeStats(date=day, room_type=room_type, rooms_total=rooms.get(room_type, 0),
+                                           booked_nights=nights, arrivals=arrivals, revenue=revenue))
+        day += timedelta(days=1)
+
+    with transaction.atomic():
+        DailyRoomTypeStats.objects.filter(date__range=(date_from, date_to)).delete()
+        DailyRoomTypeStats.objects.bulk_create(rows, batch_size=1000)
+    return date_from, date_to, len(rows)
+
+
+# Отчет
+
+def parse_report_params(params):
+    """date_from, date_to, period, room_type из GET-параметров"""
+    try:
+        date_to = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') \
+            else date.today()
+        date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') \
+            else date_to - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    except ValueError as e:
+        raise ApiError(f'Неверный формат даты: {str(e)}')
+
+    if date_from > date_to:
+        raise ApiError('Дата начала должна быть не позже даты окончания')
+    if (date_to - date_from).days >= REPORT_MAX_DAYS:
+        raise ApiError(f'Период отчета не больше {REPORT_MAX_DAYS} дней')
+
+    period = params.get('period') or 'day'
+    if period not in PERIODS:
+        raise ApiError(f'Неверный period, допустимо: {", ".join(PERIODS)}')
+
+    room_type = params.get('room_type') or None
+    if room_type and room_type not in dict(Room.TYPE_CHOICES):
+        raise ApiError('Неверный room_type')
+    return date_from, date_to, period, room_type
+
+
+def _metrics(row):
+    nights, room_nights = row['booked_nights'], row['room_nights']
+    revenue = row['revenue'] = Decimal(row['revenue'] or 0).quantize(CENT)
+    row['adr'] = (revenue / nights).quantize(CENT) if nights else Decimal('0.00')
+    row['occupancy'] = round(nights / room_nights, 4) if room_nights else 0.0
+    return row
+
+
+def revenue_report(date_from, date_to, period='day', room_type=None):
+    """
+    Выручка, ADR (средняя цена проданной ночи) и загрузка по периодам и
+    типам номеров. Читает только DailyRoomTypeStats.
+    """
+    stats = DailyRoomTypeStats.objects.filter(date__range=(date_from, date_to))
+    if room_type:
+        stats = stats.filter(room_type=room_type)
+    if period == 'day':
+        stats = stats.annotate(period=F('date'))
+    else:
+        stats = stats.annotate(period=Trunc('date', period, output_field=DateField()))
+
+    sums = dict(revenue=Sum('revenue'), booked_nights=Sum('booked_nights'),
+                arrivals=Sum('arrivals'), room_nights=Sum('rooms_total'))
+    rows = [_metrics(row) for row in
+            stats.values('period', 'room_type').annotate(**sums).order_by('period', 'room_type')]
+
+    by_type = {}
+    for row in rows:
+        item = by_type.setdefault(row['room_type'], {'room_type': row['room_type'], 'revenue': Decimal(0),
+                                                     'booked_nights': 0, 'arrivals': 0, 'room_nights': 0})
+        for key in ('revenue', 'booked_nights', 'arrivals', 'room_nights'):
+            item[key] += row[key]
+    total = {'room_type': None, 'revenue': Decimal(0), 'booked_nights': 0, 'arrivals': 0, 'room_nights': 0}
+    for item in by_type.values():
+        for key in ('revenue', 'booked_nights', 'arrivals', 'room_nights'):
+            total[key] += item[key]
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'period': period,
+        'room_type': room_type,
+        'rows': rows,
+        'by_type': [_metrics(item) for item in sorted(by_type.values(), key=lambda item: item['room_type'])],
+        'total': _metrics(total),
+    }
+
+
+def report_payload(report):
+    """Отчет в виде, пригодном для JsonResponse"""
+
+    def row_payload(row):
+        return {
+            **({'period': row['period'].isoformat()} if 'period' in row else {}),
+            'room_type': row['room_type'],
+            'revenue': str(row['revenue']),
+            'booked_nights': row['booked_nights'],
+            'room_nights': row['room_nights'],
+            'arrivals': row['arrivals'],
+            'adr': str(row['adr']),
+            'occupancy': row['occupancy'],
+        }
+
+    return {
+        'success': True,
+        'date_from': report['date_from'].isoformat(),
+        'date_to': report['date_to'].isoformat(),
+        'period': report['period'],
+        'room_type': report['room_type'],
+        'rows': [row_payload(row) for row in report['rows']],
+        'by_type': [row_payload(row) for row in report['by_type']],
+        'total': row_payload(report['total']),
+    }
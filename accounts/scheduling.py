@@ -0,0 +1,175 @@
+# accounts/scheduling.py
+"""
+Поиск ближайших свободных слотов на процедуру у всех врачей, которые ее
+проводят.
+
+Индекс "процедура -> врачи" строится одним запросом к таблице связи
+Doctor.procedures и кешируется (пространства имен cache.DOCTORS и
+cache.PROCEDURE_CATALOG). Для врачей из индекса одним запросом читается
+недельное расписание и одним группирующим запросом - число записей на
+каждый слот в окне дат. Дальше базы нет: по каждому врачу строится
+ленивый поток свободных слотов по времени, потоки сливаются heapq.merge,
+и берутся первые limit. Всего не больше трех запросов при любом числе
+врачей и дней.
+"""
+import heapq
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.db.models import Count
+
+from . import cache
+from .availability import ApiError, int_param
+from .models import Appointment, Doctor, Procedure, ScheduleSlot
+
+# Записи, которые занимают место в слоте
+BUSY_APPOINTMENT_STATUSES = ['scheduled', 'completed']
+
+WEEKDAYS = [code for code, _ in ScheduleSlot.DAY_CHOICES]
+
+DEFAULT_DAYS = 14
+MAX_DAYS = 60
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+@dataclass(frozen=True)
+class FreeSlot:
+    start: datetime
+    end: datetime
+    doctor_id: int
+    doctor_name: str
+    slot_id: int
+    free: int       # свободных мест в слоте
+
+    def as_dict(self):
+        return {
+            'date': self.start.date().isoformat(),
+            'start_time': self.start.time().isoformat(timespec='minutes'),
+            'end_time': self.end.time().isoformat(timespec='minutes'),
+            'doctor_id': self.doctor_id,
+            'doctor_name': self.doctor_name,
+            'slot_id': self.slot_id,
+            'free': self.free,
+        }
+
+
+def busy_appointments():
+    return Appointment.objects.filter(status__in=BUSY_APPOINTMENT_STATUSES)
+
+
+def free_places(capacity, booked):
+    """Правило занятости - одно для поиска и для записи: место есть, пока записей меньше max_appointments"""
+    return max(capacity - booked, 0)
+
+
+def schedule_slot_for(doctor_id, day, start_time):
+    """Слот расписания врача, который начинается в start_time в день day, или None"""
+    return ScheduleSlot.objects.filter(doctor_id=doctor_id, day_of_week=WEEKDAYS[day.weekday()],
+                                       start_time=start_time).first()
+
+
+def slot_has_place(slot, day):
+    """Есть ли место в слоте на день (AppointmentCreateView.is_slot_available)"""
+    booked = busy_appointments().filter(schedule_slot=slot, appointment_date=day).count()
+    return free_places(slot.max_appointments, booked) > 0
+
+
+def build_capability_index():
+    """{'by_procedure': {процедура: [врачи]}, 'doctors': {врач: имя}} - активные процедуры и врачи"""
+    rows = Doctor.procedures.through.objects.filter(
+        procedure__is_active=True, doctor__user__is_active=True,
+    ).order_by('procedure_id', 'doctor_id').values_list(
+        'procedure_id', 'doctor_id', 'doctor__user__first_name', 'doctor__user__last_name',
+    )
+    by_procedure = defaultdict(list)
+    doctors = {}
+    for procedure_id, doctor_id, first_name, last_name in rows:
+        by_procedure[procedure_id].append(doctor_id)
+        doctors[doctor_id] = f'{first_name} {last_name}'.strip()
+    return {'by_procedure': dict(by_procedure), 'doctors': doctors}
+
+
+def capability_index():
+    return cache.cached([cache.DOCTORS, cache.PROCEDURE_CATALOG], 'capability_index', build_capability_index)
+
+
+def doctor_free_slots(doctor_id, doctor_name, weekly, booked, date_from, date_to, now):
+    """Свободные слоты врача по возрастанию времени (генератор, без запросов)"""
+    day = date_from
+    while day <= date_to:
+        for start_time, end_time, slot_id, capacity in weekly.get(day.weekday(), ()):
+            start = datetime.combine(day, start_time)
+            if start <= now:
+                continue
+            free = free_places(capacity, booked.get((slot_id, day), 0))
+            if free > 0:
+                yield FreeSlot(start, datetime.combine(day, end_time), doctor_id, doctor_name, slot_id, free)
+        day += timedelta(days=1)
+
+
+def earliest_slots(procedure_id, date_from, date_to, limit=DEFAULT_LIMIT, now=None):
+    """Первые limit свободных слотов на процедуру у всех ее врачей в окне дат"""
+    now = now or datetime.now()
+    index = capability_index()
+    doctor_ids = index['by_procedure'].get(procedure_id)
+    if not doctor_ids:
+        return []
+
+    weekly = defaultdict(lambda: defaultdict(list))
+    slots = ScheduleSlot.objects.filter(doctor_id__in=doctor_ids).order_by('start_time').values_list(
+        'doctor_id', 'day_of_week', 'start_time', 'end_time', 'pk', 'max_appointments',
+    )
+    for doctor_id, day_of_week, start_time, end_time, slot_id, capacity in slots:
+        weekly[doctor_id][WEEKDAYS.index(day_of_week)].append((start_time, end_time, slot_id, capacity))
+
+    booked = {
+        (slot_id, day): count for slot_id, day, count in
+        busy_appointments().filter(
+            doctor_id__in=doctor_ids, appointment_date__gte=date_from, appointment_date__lte=date_to,
+        ).values('schedule_slot_id', 'appointment_date').annotate(count=Count('pk')).order_by()
+        .values_list('schedule_slot_id', 'appointment_date', 'count')
+    }
+
+    streams = [
+        doctor_free_slots(doctor_id, index['doctors'][doctor_id], weekly[doctor_id], booked, date_from, date_to, now)
+        for doctor_id in doctor_ids if doctor_id in weekly
+    ]
+    # При одинаковом времени - врач с меньшим id
+    return list(islice(heapq.merge(*streams, key=lambda slot: (slot.start, slot.doctor_id)), limit))
+
+
+def parse_slot_params(params):
+    """date_from, days, limit из GET-параметров; возвращает (с, по, limit)"""
+    try:
+        date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') \
+            else datetime.now().date()
+    except ValueError as e:
+        raise ApiError(f'Неверный формат даты: {str(e)}')
+
+    days = int_param(params.get('days') or DEFAULT_DAYS, 'days', 1, MAX_DAYS)
+    limit = int_param(params.get('limit') or DEFAULT_LIMIT, 'limit', 1, MAX_LIMIT)
+    return date_from, date_from + timedelta(days=days - 1), limit
+
+
+def slots_payload(procedure, date_from, date_to, slots):
+    return {
+        'success': True,
+        'procedure': {'id': procedure.pk, 'name': procedure.name, 'duration': procedure.duration},
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'slots': [slot.as_dict() for slot in slots],
+    }
+
+
+def procedure_not_found():
+    return ApiError('Процедура не найдена', status=404)
+
+
+def get_procedure(procedure_id):
+    try:
+        return Procedure.objects.only('pk', 'name', 'duration').get(pk=procedure_id, is_active=True)
+    except Procedure.DoesNotExist:
+        raise procedure_not_found()
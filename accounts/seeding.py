@@ -0,0 +1,349 @@
+# accounts/seeding.py
+"""
+Генерация синтетических данных: manage.py generate_data и нагрузочный
+тест (manage.py loadtest).
+
+Генерация детерминирована: один и тот же seed дает одинаковые данные.
+Объекты пишутся через bulk_create пачками и не держатся в памяти целиком,
+Booking.save() (пересчет цены) не вызывается - цена считается здесь же.
+Сигналы post_save при bulk_create не срабатывают, поэтому сводки
+выручки и занятость по типам номеров пересобираются, а версии кеша
+увеличиваются вручную.
+"""
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache, inventory, rollups
+from .models import (
+    GuestProfile, Room, Booking, ProcedureCategory, Procedure, Doctor, ScheduleSlot,
+    Appointment, MedicalRecord, TreatmentEntry, EncryptedDocument,
+)
+
+ROOM_PRICES = {'standard': 5000, 'comfort': 8000, 'lux': 12000}
+CATEGORY_NAMES = ['Водолечение', 'Массаж', 'Физиотерапия', 'ЛФК', 'Грязелечение', 'Ингаляции']
+SPECIALIZATIONS = ['Физиотерапевт', 'Массажист', 'Терапевт', 'Кардиолог', 'Невролог', 'Врач ЛФК']
+WORK_DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+WEEKDAY_CODES = [code for code, _ in ScheduleSlot.DAY_CHOICES]
+SLOT_HOURS = (9, 11, 14, 16)
+DIAGNOSES = ['Остеохондроз', 'Гипертония I ст.', 'Бронхит хронический', 'Артроз', 'Астения']
+
+GUEST_USERNAME = 'loadtest_guest'
+STAFF_USERNAME = 'loadtest_admin'
+
+
+class DataGenerator:
+    """
+    Пошаговая генерация: users() -> rooms() -> bookings() -> doctors() ->
+    medical_records() -> appointments(). Каждый шаг возвращает число строк.
+    """
+
+    def __init__(self, seed=42, prefix='gen', batch_size=5000, log=None):
+        self.rnd = random.Random(seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.today = date.today()
+        self.password = make_password('generated')
+        self.user_ids = []
+        self.profile_ids = {}  # user_id -> GuestProfile.id
+        self.rooms_list = []
+        self.procedures_list = []
+        self.doctor_ids = []
+        self.doctor_procedures = {}  # doctor_id -> [procedure_id]
+        self.doctor_slots = {}  # (doctor_id, день недели) -> [(slot_id, start_time)]
+
+    def flush(self, model, objects):
+        if objects:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return len(objects)
+
+    def users(self, count):
+        """Пользователи и профили гостей"""
+        created = 0
+        for start in range(0, count, self.batch_size):
+            batch = [
+                User(username=f'{self.prefix}_user{i:07d}', password=self.password,
+                     email=f'{self.prefix}{i}@example.com', first_name=f'Имя{i}', last_name=f'Фамилия{i}')
+                for i in range(start, min(count, start + self.batch_size))
+            ]
+            created += self.flush(User, batch)
+
+        users = User.objects.filter(username__startswith=f'{self.prefix}_user').order_by('id')
+        for start in range(0, count, self.batch_size):
+            batch = users.values_list('id', 'first_name', 'last_name', 'email')[start:start + self.batch_size]
+            self.flush(GuestProfile, [
+                GuestProfile(user_id=user_id, first_name=first_name, last_name=last_name, email=email,
+                             phone=f'+7900{self.rnd.randint(1000000, 9999999)}',
+                             gender=self.rnd.choice('MF'),
+                             birth_date=self.today - timedelta(days=self.rnd.randint(20 * 365, 80 * 365)),
+                             is_profile_complete=True)
+                for user_id, first_name, last_name, email in batch
+            ])
+        self.load_users()
+        self.log(f'Пользователи: {created}')
+        return created
+
+    def load_users(self):
+        # Все профили с префиксом: и созданные здесь, и заведенные заранее (loadtest_guest)
+        self.profile_ids = dict(GuestProfile.objects.filter(
+            user__username__startswith=f'{self.prefix}_'
+        ).values_list('user_id', 'id'))
+        self.user_ids = sorted(self.profile_ids)
+
+    def rooms(self, count):
+        rooms = []
+        for i in range(count):
+            room_type = self.rnd.choice(list(ROOM_PRICES))
+            rooms.append(Room(
+                type=room_type, name=f'{self.prefix} {room_type} {i:05d}', capacity=self.rnd.randint(1, 4),
+                price_per_day=Decimal(ROOM_PRICES[room_type] + self.rnd.randint(0, 20) * 100),
+                description='Сгенерированный номер',
+            ))
+        self.flush(Room, rooms)
+        self.rooms_list = list(Room.objects.filter(name__startswith=f'{self.prefix} ')
+                               .order_by('id').only('id', 'type', 'capacity', 'price_per_day'))
+        self.log(f'Номера: {len(rooms)}')
+        return len(rooms)
+
+    def bookings(self, years=1, total=None, days_ahead=180):
+        """
+        Непересекающиеся брони за years лет до today + days_ahead.
+        Период каждого номера делится на равные окна, в каждом окне одна
+        бронь; без total на номер приходится одна бронь на ~12 дней.
+        """
+        if not self.rooms_list or not self.user_ids:
+            return 0
+        span = int(years * 365) + days_ahead
+        per_room = -(-total // len(self.rooms_list)) if total else span // 12
+        window = span // per_room
+        if window < 2:
+            raise ValueError(f'{per_room} броней на номер не помещаются в {span} дней: '
+                             f'увеличьте число номеров или лет')
+        total = total or per_room * len(self.rooms_list)
+        min_nights = max(1, min(window // 3, 7))
+        max_nights = max(min_nights, min(21, window - 1))
+        start = self.today - timedelta(days=int(years * 365))
+
+        created = 0
+        buffer = []
+        for index in range(total):
+            room = self.rooms_list[index // per_room]
+            nights = self.rnd.randint(min_nights, max_nights)
+            check_in = start + timedelta(days=(index % per_room) * window
+                                         + self.rnd.randint(0, window - 1 - nights))
+            check_out = check_in + timedelta(days=nights)
+            if check_out <= self.today:
+                status = self.rnd.choice(['completed', 'completed', 'completed', 'cancelled'])
+            else:
+                status = self.rnd.choice(['pending', 'confirmed', 'confirmed'])
+            buffer.append(Booking(
+                user_id=self.rnd.choice(self.user_ids), room_id=room.id, room_type=room.type,
+                check_in=check_in, check_out=check_out, guests=self.rnd.randint(1, room.capacity),
+                total_price=room.price_per_day * nights, status=status,
+            ))
+            if len(buffer) >= self.batch_size:
+                created += self.flush(Booking, buffer)
+                buffer = []
+                if created % (self.batch_size * 20) == 0:
+                    self.log(f'  брони: {created} из {total}')
+        created += self.flush(Booking, buffer)
+        self.log(f'Брони: {created}')
+        return created
+
+    def doctors(self, count, procedures=30):
+        """Категории, процедуры, врачи с процедурами и слотами расписания"""
+        categories = self.flush(ProcedureCategory, [
+            ProcedureCategory(name=name, description=f'Категория «{name}»') for name in CATEGORY_NAMES
+        ])
+        category_ids = list(ProcedureCategory.objects.order_by('-id').values_list('id', flat=True)[:categories])
+        self.flush(Procedure, [
+            Procedure(name=f'{self.prefix} процедура {i:04d}', category_id=self.rnd.choice(category_ids),
+                      description='Описание процедуры', duration=self.rnd.choice([15, 30, 45, 60]),
+                      price=Decimal(self.rnd.randint(5, 50) * 100), is_active=self.rnd.random() > 0.1)
+            for i in range(procedures)
+        ])
+        self.procedures_list = list(Procedure.objects.filter(name__startswith=f'{self.prefix} процедура')
+                                    .order_by('id').values_list('id', flat=True))
+
+        self.flush(User, [
+            User(username=f'{self.prefix}_doctor{i:05d}', password=self.password,
+                 first_name=f'Врач{i}', last_name='Сгенерированный')
+            for i in range(count)
+        ])
+        doctor_users = User.objects.filter(username__startswith=f'{self.prefix}_doctor').order_by('id')
+        self.flush(Doctor, [
+            Doctor(user_id=user_id, specialization=self.rnd.choice(SPECIALIZATIONS),
+                   qualification='Высшая категория', experience=self.rnd.randint(1, 30))
+            for user_id in doctor_users.values_list('id', flat=True)
+        ])
+        self.doctor_ids = doctor_ids = list(Doctor.objects.filter(user__in=doctor_users)
+                                            .order_by('id').values_list('id', flat=True))
+
+        through = Doctor.procedures.through
+        links = []
+        for doctor_id in doctor_ids:
+            procedure_ids = self.rnd.sample(self.procedures_list, k=min(8, len(self.procedures_list)))
+            self.doctor_procedures[doctor_id] = procedure_ids
+            links += [through(doctor_id=doctor_id, procedure_id=procedure_id) for procedure_id in procedure_ids]
+        self.flush(through, links)
+
+        self.flush(ScheduleSlot, [
+            ScheduleSlot(doctor_id=doctor_id, day_of_week=day, start_time=time(hour),
+                         end_time=time(hour + 1), max_appointments=2)
+            for doctor_id in doctor_ids for day in WORK_DAYS for hour in SLOT_HOURS
+        ])
+        slots = ScheduleSlot.objects.filter(doctor_id__in=doctor_ids).order_by('id')
+        for slot_id, doctor_id, day, start_time in slots.values_list('id', 'doctor_id', 'day_of_week', 'start_time'):
+            self.doctor_slots.setdefault((doctor_id, day), []).append((slot_id, start_time))
+
+        self.log(f'Врачи: {len(doctor_ids)}, процедуры: {len(self.procedures_list)}')
+        return len(doctor_ids)
+
+    def make_appointment(self, profile_id, day, status):
+        """Запись к случайному врачу на слот его расписания в этот день (или None)"""
+        if not self.doctor_ids:
+            return None
+        doctor_id = self.rnd.choice(self.doctor_ids)
+        slots = self.doctor_slots.get((doctor_id, WEEKDAY_CODES[day.weekday()]))
+        if not slots:
+            return None
+        slot_id, start_time = self.rnd.choice(slots)
+        return Appointment(
+            patient_id=profile_id, procedure_id=self.rnd.choice(self.doctor_procedures[doctor_id]),
+            doctor_id=doctor_id, schedule_slot_id=slot_id, appointment_date=day,
+            appointment_time=start_time, status=status,
+        )
+
+    def medical_records(self, share=0.3, procedures_per_stay=3):
+        """
+        Медицинские карты для части завершенных броней, процедуры во время
+        заезда и записи о лечении по ним.
+        """
+        completed = (Booking.objects
+                     .filter(status='completed', user__username__startswith=f'{self.prefix}_')
+                     .order_by('id')
+                     .values_list('id', 'user_id', 'check_in', 'check_out'))
+
+        doctor_ids = self.doctor_ids
+        records = treatments = 0
+        batch = []
+        for row in completed.iterator(chunk_size=self.batch_size):
+            if self.rnd.random() < share:
+                batch.append(row)
+            if len(batch) >= self.batch_size // max(1, procedures_per_stay):
+                created_records, created_treatments = self.write_stays(batch, doctor_ids, procedures_per_stay)
+                records += created_records
+                treatments += created_treatments
+                batch = []
+        created_records, created_treatments = self.write_stays(batch, doctor_ids, procedures_per_stay)
+        records += created_records
+        treatments += created_treatments
+        self.log(f'Медицинские карты: {records}, записи о лечении: {treatments}')
+        return records
+
+    def write_stays(self, rows, doctor_ids, procedures_per_stay):
+        """Пачка заездов -> MedicalRecord + Appointment + TreatmentEntry"""
+        if not rows:
+            return 0, 0
+        records = [
+            MedicalRecord(patient_id=self.profile_ids[user_id], booking_id=booking_id,
+                          admission_date=check_in, discharge_date=check_out,
+                          diagnosis=self.rnd.choice(DIAGNOSES), treatment_plan='Стандартный курс',
+                          attending_doctor_id=self.rnd.choice(doctor_ids) if doctor_ids else None,
+                          is_active=False)
+            for booking_id, user_id, check_in, check_out in rows
+        ]
+        # SQLite и PostgreSQL возвращают id из bulk_create
+        MedicalRecord.objects.bulk_create(records, batch_size=self.batch_size)
+
+        appointments, owners = [], []
+        for record, (_, user_id, check_in, check_out) in zip(records, rows):
+            for _ in range(procedures_per_stay):
+                day = check_in + timedelta(days=self.rnd.randint(0, max(0, (check_out - check_in).days - 1)))
+                appointment = self.make_appointment(self.profile_ids[user_id], day, 'completed')
+                if appointment:
+                    appointments.append(appointment)
+                    owners.append(record)
+        Appointment.objects.bulk_create(appointments, batch_size=self.batch_size)
+
+        treatments = self.flush(TreatmentEntry, [
+            TreatmentEntry(medical_record_id=record.id, appointment_id=appointment.id,
+                           result='Процедура проведена, переносит хорошо')
+            for record, appointment in zip(owners, appointments)
+        ])
+        return len(records), treatments
+
+    def appointments(self, per_patient=2, days=30):
+        """Записи на процедуры вокруг сегодняшнего дня"""
+        created = 0
+        buffer = []
+        for profile_id in self.profile_ids.values():
+            for _ in range(self.rnd.randint(0, per_patient * 2)):
+                day = self.today + timedelta(days=self.rnd.randint(-days, days))
+                if day >= self.today:
+                    status = self.rnd.choice(['scheduled', 'scheduled', 'scheduled', 'cancelled'])
+                else:
+                    status = self.rnd.choice(['completed', 'completed', 'no_show'])
+                appointment = self.make_appointment(profile_id, day, status)
+                if appointment:
+                    buffer.append(appointment)
+            if len(buffer) >= self.batch_size:
+                created += self.flush(Appointment, buffer)
+                buffer = []
+        created += self.flush(Appointment, buffer)
+        self.log(f'Записи на процедуры: {created}')
+        return created
+
+    def run(self, users=1000, rooms=100, years=1, bookings=None, doctors=20, procedures=30,
+            medical_share=0.3, appointments_per_patient=2):
+        """Полный набор данных в одной транзакции, возвращает число строк по моделям"""
+        started = timezone.now()
+        with transaction.atomic():
+            counts = {
+                'users': self.users(users),
+                'rooms': self.rooms(rooms),
+            }
+            counts['bookings'] = self.bookings(years=years, total=bookings)
+            # bulk_create не вызывает сигналы - сводки и занятость пересчитываются целиком
+            rollups.rebuild()
+            inventory.rebuild()
+            counts['doctors'] = self.doctors(doctors, procedures)
+            counts['medical_records'] = self.medical_records(medical_share)
+            counts['appointments'] = self.appointments(appointments_per_patient)
+            cache.bump_on_commit(cache.ROOMS, cache.PROCEDURE_CATALOG)
+        counts['seconds'] = (timezone.now() - started).total_seconds()
+        return counts
+
+
+def seed_dataset(seed=42, users=200, rooms=30, doctors=8, procedures=30, years=1):
+    """Небольшой набор данных для нагрузочного теста с пользователями loadtest_*"""
+    password = make_password('loadtest')
+    staff = User.objects.create(username=STAFF_USERNAME, password=password,
+                                is_staff=True, is_superuser=True)
+    guest = User.objects.create(username=GUEST_USERNAME, password=password,
+                                first_name='Гость', last_name='Нагрузочный')
+    guest_profile = GuestProfile.objects.create(user=guest, first_name='Гость', last_name='Нагрузочный',
+                                                phone='+79000000000', email='loadtest@example.com')
+
+    generator = DataGenerator(seed=seed, prefix='loadtest')
+    counts = generator.run(users=users, rooms=rooms, years=years, doctors=doctors, procedures=procedures)
+
+    # У пользователя нагрузочного теста должна быть медицинская карта
+    if not MedicalRecord.objects.filter(patient=guest_profile).exists():
+        booking = Booking.objects.filter(user=guest).first()
+        if booking:
+            MedicalRecord.objects.create(patient=guest_profile, booking=booking, admission_date=booking.check_in,
+                                         diagnosis='Осмотр', treatment_plan='План')
+    for document_type, data in [('passport', {'series': '1234', 'number': '567890'}),
+                                ('snils', {'number': '12345678900'})]:
+        document = EncryptedDocument(profile=guest_profile, document_type=document_type, uploaded_by=guest)
+        document.set_data(data)
+        document.save()
+
+    return {**counts, 'staff': staff, 'guest': guest}
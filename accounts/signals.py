@@ -0,0 +1,182 @@
+# accounts/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import cache, events, inventory, outbox, rollups, tasks, waitlist
+from .images import image_sources, schedule_variants
+from .models import Room, Doctor, Booking, Procedure, ProcedureCategory, EncryptedDocument
+from .uploads import delete_document_file
+
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=Doctor)
+def reset_image_hash(sender, instance, **kwargs):
+    """При замене фото старые варианты больше не подходят"""
+    image_field, hash_field = image_sources(sender)
+    if not instance.pk or not getattr(instance, hash_field):
+        return
+    old_name = sender.objects.filter(pk=instance.pk).values_list(image_field, flat=True).first()
+    if old_name != getattr(instance, image_field).name:
+        setattr(instance, hash_field, '')
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Doctor)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    """Генерируем уменьшенные копии нового фото в фоне"""
+    image_field, hash_field = image_sources(sender)
+    if raw or getattr(instance, hash_field) or not getattr(instance, image_field):
+        return
+    schedule_variants(instance)
+
+
+# Инвалидация кеша (см. cache.py)
+
+BOOKING_TRACKED_FIELDS = Booking.TRACKED_FIELDS
+
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_state(sender, instance, raw=False, **kwargs):
+    """
+    Запоминаем состояние брони до изменения. Для загруженной из базы брони
+    оно уже есть (Booking.from_db): без SELECT транзакция Booking.save
+    начинается сразу с записи, и SQLite не отвечает "database is locked".
+    """
+    instance._previous_state = None
+    if instance.pk and not raw:
+        loaded = getattr(instance, '_loaded_state', None)
+        instance._previous_state = loaded if loaded is not None else (
+            sender.objects.filter(pk=instance.pk).values(*BOOKING_TRACKED_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=Booking)
+def refresh_loaded_booking_state(sender, instance, **kwargs):
+    """Следующее сохранение того же объекта сравнивается с только что записанным"""
+    instance._loaded_state = {name: getattr(instance, name) for name in BOOKING_TRACKED_FIELDS}
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_room_bookings(sender, instance, **kwargs):
+    room_ids = {instance.room_id}
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        room_ids.add(previous['room_id'])
+    room_ids.discard(None)
+    if room_ids:
+        cache.bump_on_commit(*(cache.room_bookings(room_id) for room_id in room_ids))
+
+
+# Дневные сводки выручки и загрузки (см. rollups.py)
+
+@receiver(post_save, sender=Booking)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.apply_booking_change(getattr(instance, '_previous_state', None), rollups.booking_stay(instance))
+
+
+@receiver(post_delete, sender=Booking)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    rollups.apply_booking_change(rollups.booking_stay(instance), None)
+
+
+# Свободные номера по типам (см. inventory.py)
+
+@receiver(post_save, sender=Booking)
+def update_inventory_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    inventory.apply_booking_change(getattr(instance, '_previous_state', None), inventory.booking_stay(instance))
+
+
+@receiver(post_delete, sender=Booking)
+def update_inventory_on_delete(sender, instance, **kwargs):
+    inventory.apply_booking_change(inventory.booking_stay(instance), None)
+
+
+# Изменения занятости для SSE-подписчиков (см. events.py)
+
+@receiver(post_save, sender=Booking)
+def publish_availability_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        events.publish_on_commit(getattr(instance, '_previous_state', None), events.booking_state(instance))
+
+
+@receiver(post_delete, sender=Booking)
+def publish_availability_on_delete(sender, instance, **kwargs):
+    events.publish_on_commit(events.booking_state(instance), None)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def update_rooms_total(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.refresh_rooms_total()
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_rooms(sender, instance, **kwargs):
+    # Свободные номера по типам зависят от числа номеров
+    cache.bump_on_commit(cache.ROOMS, cache.INVENTORY)
+
+
+@receiver(post_save, sender=Procedure)
+@receiver(post_delete, sender=Procedure)
+@receiver(post_save, sender=ProcedureCategory)
+@receiver(post_delete, sender=ProcedureCategory)
+def invalidate_procedure_catalog(sender, instance, **kwargs):
+    cache.bump_on_commit(cache.PROCEDURE_CATALOG)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+@receiver(m2m_changed, sender=Doctor.procedures.through)
+def invalidate_doctors(sender, instance, **kwargs):
+    cache.bump_on_commit(cache.DOCTORS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_doctor_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Имя врача берется из User; вход (update_fields=['last_login']) не в счет
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    if Doctor.objects.filter(user_id=instance.pk).exists():
+        cache.bump_on_commit(cache.DOCTORS)
+
+
+@receiver(post_delete, sender=EncryptedDocument)
+def delete_document_scan(sender, instance, **kwargs):
+    # Файл скана удаляем только после коммита: при откате удаления он еще нужен
+    if instance.file_name:
+        transaction.on_commit(lambda: delete_document_file(instance.file_name))
+
+
+# Уведомления гостям (см. outbox.py): письмо пишется в транзакции Booking.save
+
+@receiver(post_save, sender=Booking)
+def notify_booking_status(sender, instance, created=False, raw=False, **kwargs):
+    # Удерживающие брони листа ожидания: гость получает письмо о предложении (waitlist.py)
+    if raw or getattr(instance, 'skip_notification', False):
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if created:
+        outbox.notify_booking_status(instance)
+    elif previous and previous['status'] != instance.status:
+        outbox.notify_booking_status(instance, previous['status'])
+
+
+# Лист ожидания (см. waitlist.py): освободившиеся ночи предлагаются в той же транзакции
+
+@receiver(post_save, sender=Booking)
+def match_waitlist(sender, instance, created=False, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if raw or created or not previous or previous['status'] == instance.status:
+        return
+    offered = waitlist.booking_status_changed(instance, previous['status'])
+    if offered:
+        tasks.expire_waitlist_offers.enqueue(run_at=offered[0].offer_expires_at)
@@ -0,0 +1,95 @@
+# accounts/smtp_sink.py
+"""
+Локальная заглушка SMTP-сервера для проверки отправки почты (send_outbox)
+без настоящего сервера: принимает письма и складывает их в память.
+Поддерживает только то, что нужно smtplib: EHLO/HELO, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT. Адреса из reject_recipients отклоняются кодом 550.
+"""
+import socketserver
+import threading
+from email import message_from_bytes, policy
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 smtp-sink ready')
+        sender, recipients = None, []
+        for raw in self.rfile:
+            command, _, argument = raw.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply('250-smtp-sink')
+                self.reply('250 8BITMIME')
+            elif command == 'HELO':
+                self.reply('250 smtp-sink')
+            elif command == 'MAIL':
+                sender, recipients = argument.partition(':')[2].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                address = argument.partition(':')[2].strip().strip('<>')
+                if address in server.reject_recipients:
+                    self.reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(line[1:] if line.startswith(b'.') else line)
+                server.store(sender, recipients, b''.join(lines))
+                sender, recipients = None, []
+                self.reply('250 OK: queued')
+            elif command == 'RSET':
+                sender, recipients = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """SMTP-заглушка на localhost; port=0 - свободный порт"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, reject_recipients=(), on_message=None):
+        super().__init__((host, port), SmtpHandler)
+        self.messages = []
+        self.connections = 0
+        self.reject_recipients = set(reject_recipients)
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, sender, recipients, data):
+        message = message_from_bytes(data, policy=policy.default)
+        with self._lock:
+            self.messages.append({'from': sender, 'to': recipients, 'message': message})
+        if self.on_message:
+            self.on_message(sender, recipients, message)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
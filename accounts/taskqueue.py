@@ -0,0 +1,163 @@
+# accounts/taskqueue.py
+"""
+Очередь фоновых задач в базе данных (модель Task), без внешнего брокера.
+
+Задача - функция с декоратором @task в модуле tasks.py любого приложения:
+
+    @task(priority=5, max_attempts=3)
+    def rebuild_rollups(date_from=None): ...
+
+    rebuild_rollups.delay(date_from='2026-01-01')   # в очередь
+    rebuild_rollups('2026-01-01')                   # синхронно
+
+delay пишет строку Task в текущей транзакции: задача не уйдет воркеру, если
+транзакция откатится. Команда run_worker забирает задачи в порядке
+приоритета и выполняет их в пуле потоков или процессов. Взятая задача
+занята на timeout секунд (тайм-аут видимости): если воркер упал, задачу
+заберет другой. Ошибки повторяются с экспоненциальной задержкой до
+max_attempts. Аргументы должны сериализоваться в JSON.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 30        # секунд до повтора после первой ошибки, дальше - вдвое больше
+RETRY_DELAY_MAX = 60 * 60
+
+_registry = {}
+
+
+class TaskFunction:
+    """Функция, зарегистрированная в очереди"""
+
+    def __init__(self, func, name, priority, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, priority=None, run_at=None, countdown=None):
+        """В очередь с параметрами: priority, run_at или countdown (секунд)"""
+        if countdown is not None:
+            run_at = timezone.now() + timedelta(seconds=countdown)
+        return Task.objects.create(
+            name=self.name, args=list(args), kwargs=kwargs or {},
+            priority=self.priority if priority is None else priority,
+            run_at=run_at or timezone.now(),
+            max_attempts=self.max_attempts, timeout=self.timeout,
+        )
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=3, timeout=300):
+    """Регистрирует функцию как фоновую задачу"""
+
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        task_function = TaskFunction(func, task_name, priority, max_attempts, timeout)
+        _registry[task_name] = task_function
+        return task_function
+
+    return decorator(func) if func is not None else decorator
+
+
+def autodiscover():
+    """Импортирует tasks.py установленных приложений, чтобы задачи зарегистрировались"""
+    autodiscover_modules('tasks')
+
+
+def registered_tasks():
+    return dict(_registry)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_DELAY * 2 ** (attempts - 1), RETRY_DELAY_MAX))
+
+
+def claim(worker_id, limit):
+    """
+    Забирает до limit готовых задач: из очереди и те, у которых истек
+    тайм-аут видимости. Возвращает список (id, token).
+    """
+    now = timezone.now()
+    # Задачи, которые раз за разом не укладываются в тайм-аут, больше не берем
+    Task.objects.filter(status='running', locked_until__lte=now, attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, locked_by='', locked_until=None,
+        last_error='Истек тайм-аут видимости на последней попытке',
+    )
+    ready = (Q(status='queued', run_at__lte=now) |
+             Q(status='running', locked_until__lte=now))
+    timeouts = dict(Task.objects.filter(ready).order_by('-priority', 'run_at', 'pk')
+                    .values_list('pk', 'timeout')[:limit])
+    if not timeouts:
+        return []
+
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    # Условие ready повторяется в UPDATE: задачи, которые успел забрать
+    # другой воркер, не перезаписываются
+    ids = list(timeouts)
+    Task.objects.filter(ready, pk__in=ids).update(
+        status='running', locked_by=token, attempts=F('attempts') + 1, last_error='',
+        locked_until=Case(*[When(pk=pk, then=Value(now + timedelta(seconds=timeout)))
+                            for pk, timeout in timeouts.items()]),
+    )
+    claimed = Task.objects.filter(pk__in=ids, locked_by=token).order_by('-priority', 'run_at', 'pk')
+    return [(pk, token) for pk in claimed.values_list('pk', flat=True)]
+
+
+def execute(task_id, token):
+    """
+    Выполняет взятую задачу. Запускается в потоке или процессе пула, поэтому
+    получает только id и читает задачу сама. Возвращает итоговый статус.
+    """
+    try:
+        task_row = Task.objects.filter(pk=task_id, locked_by=token).first()
+        if task_row is None:
+            return 'lost'
+        owned = Task.objects.filter(pk=task_id, locked_by=token, status='running')
+
+        if task_row.name not in _registry:
+            # Процесс пула (--pool process) стартует без импорта tasks.py
+            autodiscover()
+        task_function = _registry.get(task_row.name)
+        try:
+            if task_function is None:
+                raise LookupError(f'Задача {task_row.name} не зарегистрирована')
+            task_function.func(*task_row.args, **task_row.kwargs)
+        except Exception:
+            error = traceback.format_exc(limit=20)[-5000:]
+            logger.exception('Задача %s #%s завершилась ошибкой', task_row.name, task_id)
+            if task_function is not None and task_row.attempts < task_row.max_attempts:
+                owned.update(status='queued', run_at=timezone.now() + retry_delay(task_row.attempts),
+                             locked_by='', locked_until=None, last_error=error)
+                return 'retry'
+            owned.update(status='failed', finished_at=timezone.now(), locked_by='', locked_until=None,
+                         last_error=error)
+            return 'failed'
+
+        # Задача могла выполняться дольше тайм-аута и уйти другому воркеру -
+        # тогда ее статус уже не наш
+        owned.update(status='done', finished_at=timezone.now(), locked_by='', locked_until=None)
+        return 'done'
+    finally:
+        # Потоки пула живут долго: соединение не держим между задачами
+        connection.close()
+
@@ -0,0 +1,37 @@
+# accounts/tasks.py
+"""Фоновые задачи accounts (см. taskqueue.py, выполняет run_worker)"""
+from datetime import date
+
+from . import assignment, outbox, reminders, rollups, waitlist
+from .taskqueue import task
+
+
+@task(priority=10, timeout=600)
+def send_outbox(batch_size=100):
+    """Отправляет накопившиеся письма EmailOutbox через одно SMTP-соединение"""
+    outbox.drain(batch_size)
+
+
+@task(priority=-10, timeout=3600, max_attempts=1)
+def rebuild_rollups(date_from=None, date_to=None):
+    """Пересчет сводок выручки и загрузки (даты - ISO-строки)"""
+    rollups.rebuild(date.fromisoformat(date_from) if date_from else None,
+                    date.fromisoformat(date_to) if date_to else None)
+
+
+@task(priority=-5, timeout=900, max_attempts=1)
+def assign_rooms(room_type=None, reoptimize=False):
+    """Подбор номеров для броней без номера (см. assignment.py)"""
+    assignment.assign_rooms(room_type, reoptimize=reoptimize)
+
+
+@task(priority=5)
+def expire_waitlist_offers():
+    """Снимает просроченные предложения листа ожидания (ставится на время истечения)"""
+    waitlist.expire_offers()
+
+
+@task(priority=5, timeout=900, max_attempts=3)
+def send_appointment_reminders(day=None):
+    """Напоминания о записях на процедуры на day (ISO-строка, по умолчанию - на завтра)"""
+    reminders.send_reminders(date.fromisoformat(day) if day else None)
@@ -0,0 +1,35 @@
+# accounts/templatetags/images.py
+from django import template
+from django.utils.html import format_html
+
+from accounts.images import image_sources, srcset, variant_url, variant_widths
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(obj, sizes='100vw', **attrs):
+    """
+    <picture> с WebP/JPEG вариантами фото номера или врача.
+    Пока варианты не готовы, отдает исходное изображение.
+
+    {% responsive_image room sizes="(max-width: 768px) 100vw, 33vw" class="card-img-top" %}
+    """
+    image_field, hash_field = image_sources(type(obj))
+    image = getattr(obj, image_field)
+    content_hash = getattr(obj, hash_field)
+    extra = format_html(''.join(f' {key}="{{}}"' for key in attrs), *attrs.values())
+
+    widths = variant_widths()
+    if not content_hash:
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', image.url, str(obj), extra)
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy"{}>'
+        '</picture>',
+        srcset(content_hash, 'webp'), sizes,
+        variant_url(content_hash, widths[len(widths) // 2], 'jpg'), srcset(content_hash, 'jpg'), sizes,
+        str(obj), extra,
+    )
@@ -0,0 +1,33 @@
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..middleware import QueryRecorder
+from ..seeding import seed_dataset
+from .utils import IsolatedStorageMixin, create_user
+
+
+class AdminChangelistTests(IsolatedStorageMixin, TestCase):
+    """Список в админке - несколько запросов независимо от числа строк"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(seed=3, users=30, rooms=6, doctors=3, procedures=6, years=0.3)
+        cls.admin_user = create_user('admin', is_staff=True, is_superuser=True)
+
+    def test_changelists_have_no_repeated_queries(self):
+        self.client.force_login(self.admin_user)
+        models = [model for model in admin.site._registry if model._meta.app_label == 'accounts']
+        self.assertGreaterEqual(len(models), 15)
+        for model in models:
+            url = reverse(f'admin:accounts_{model._meta.model_name}_changelist')
+            with self.subTest(model._meta.model_name):
+                recorder = QueryRecorder()
+                with connection.execute_wrapper(recorder):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(recorder.suspected_n_plus_one(2), [])
+                self.assertLessEqual(recorder.count, 12)
+                # Без полного COUNT по таблице
+                self.assertFalse(response.context['cl'].show_full_result_count)
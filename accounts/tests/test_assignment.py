@@ -0,0 +1,99 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from .. import assignment
+from ..models import Booking
+from .utils import create_booking, create_room, create_user, day
+
+
+class AssignmentTests(TestCase):
+    def setUp(self):
+        self.user = create_user('guest')
+
+    def test_best_fit_fills_gap_between_bookings(self):
+        holey = create_room('101')
+        create_room('102')
+        create_booking(self.user, holey, day(1), day(10))
+        create_booking(self.user, holey, day(15), day(20))
+        booking = create_booking(self.user, None, day(10), day(15))
+
+        result = assignment.assign_rooms('standard')
+
+        booking.refresh_from_db()
+        self.assertEqual(result.assigned, 1)
+        self.assertEqual(booking.room, holey)
+        self.assertTrue(booking.room_auto_assigned)
+
+    def test_capacity_is_respected(self):
+        create_room('101', capacity=2)
+        family = create_room('201', capacity=4)
+        booking = create_booking(self.user, None, day(1), day(5), guests=3)
+
+        assignment.assign_rooms('standard')
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.room, family)
+
+    def test_no_free_room_leaves_booking_unplaced(self):
+        room = create_room('101')
+        create_booking(self.user, room, day(1), day(10))
+        booking = create_booking(self.user, None, day(5), day(8))
+
+        result = assignment.assign_rooms('standard')
+
+        booking.refresh_from_db()
+        self.assertEqual(result.unplaced, [booking.pk])
+        self.assertIsNone(booking.room)
+
+    def test_conflict_is_retried_with_fresh_plan(self):
+        first = create_room('101')
+        second = create_room('102', price=Decimal('6000'))
+        booking = create_booking(self.user, None, day(1), day(5))
+        plan = assignment.plan_room_type
+        calls = []
+
+        def plan_then_take_room(*args, **kwargs):
+            changes, unplaced = plan(*args, **kwargs)
+            if not calls:
+                # Пока шел подбор, номер заняли другой бронью
+                create_booking(self.user, changes[0][1], day(1), day(5))
+            calls.append(changes)
+            return changes, unplaced
+
+        with mock.patch.object(assignment, 'plan_room_type', side_effect=plan_then_take_room):
+            assignment.assign_rooms('standard')
+
+        booking.refresh_from_db()
+        self.assertEqual(calls[0][0][1], first)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(booking.room, second)
+
+    def test_reoptimize_keeps_confirmed_price(self):
+        cheap = create_room('101', price=Decimal('5000'))
+        pricey = create_room('102', price=Decimal('7000'))
+        create_booking(self.user, pricey, day(1), day(5))
+        booking = create_booking(self.user, None, day(5), day(7))
+        Booking.objects.filter(pk=booking.pk).update(room=cheap, room_auto_assigned=True,
+                                                     total_price=Decimal('10000'))
+
+        # По плотности бронь встала бы в 102 сразу после соседней, но там дороже
+        result = assignment.assign_rooms('standard', reoptimize=True)
+
+        booking.refresh_from_db()
+        self.assertEqual(result.moved, 0)
+        self.assertEqual((booking.room, booking.total_price), (cheap, Decimal('10000')))
+
+    def test_reoptimize_moves_between_rooms_with_same_price(self):
+        loose = create_room('101')
+        tight = create_room('102')
+        create_booking(self.user, tight, day(1), day(5))
+        booking = create_booking(self.user, None, day(5), day(7))
+        Booking.objects.filter(pk=booking.pk).update(room=loose, room_auto_assigned=True)
+
+        result = assignment.assign_rooms('standard', reoptimize=True)
+
+        booking.refresh_from_db()
+        self.assertEqual(result.moved, 1)
+        self.assertEqual((booking.room, booking.total_price), (tight, Decimal('10000')))
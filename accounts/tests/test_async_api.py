@@ -0,0 +1,69 @@
+import json
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from .. import views_async
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+class AsyncApiTests(IsolatedStorageMixin, TestCase):
+    """Async-версии API отвечают так же, как синхронные"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('guest')
+        self.room = create_room('101')
+        create_booking(self.user, self.room, day(10), day(13))
+        self.factory = AsyncRequestFactory()
+
+    def async_request(self, path, data=None, user=None):
+        request = self.factory.get(path, data or {})
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    async def test_availability_matches_sync_view(self):
+        await self.async_client.aforce_login(self.user)
+        for check_in, check_out, available in ((day(11), day(12), False), (day(13), day(15), True)):
+            data = {'room_id': self.room.id, 'check_in': check_in, 'check_out': check_out}
+            sync = await self.async_client.get(reverse('api_room_availability'), data)
+            response = await views_async.api_room_availability(
+                self.async_request(reverse('api_room_availability'), data, self.user))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), sync.json())
+            self.assertIs(sync.json()['available'], available)
+
+    async def test_availability_requires_login(self):
+        anonymous = mock.Mock(is_authenticated=False)
+        response = await views_async.api_room_availability(
+            self.async_request(reverse('api_room_availability'), user=anonymous))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_busy_dates_match_sync_view(self):
+        path = reverse('api_room_busy_dates', args=[self.room.id])
+        sync = await self.async_client.get(path)
+        response = await views_async.api_room_busy_dates(self.async_request(path), self.room.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), sync.json())
+
+    async def test_unknown_room_is_404(self):
+        path = reverse('api_room_busy_dates', args=[self.room.id + 1])
+        response = await views_async.api_room_busy_dates(self.async_request(path), self.room.id + 1)
+        self.assertEqual(response.status_code, 404)
+
+
+class BenchmarkApiCommandTests(TestCase):
+    def test_spawn_requires_servers(self):
+        create_room('101')
+        with mock.patch('importlib.util.find_spec', return_value=None), \
+                mock.patch('accounts.management.commands.benchmark_api.start_server') as start_server:
+            with self.assertRaisesMessage(CommandError, 'uvicorn, gunicorn'):
+                call_command('benchmark_api', '--spawn')
+        start_server.assert_not_called()
@@ -0,0 +1,66 @@
+import json
+
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import batch
+from .utils import IsolatedStorageMixin, create_room, create_user, day
+
+
+class BatchTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('guest')
+        self.room = create_room('101')
+        self.client.force_login(self.user)
+
+    def post_batch(self, requests):
+        response = self.client.post(reverse('api_batch'), json.dumps({'requests': requests}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item for item in response.json()['responses']}
+
+    def test_sub_requests_are_isolated(self):
+        availability = reverse('api_room_availability')
+        responses = self.post_batch([
+            {'id': 'busy', 'path': reverse('api_room_busy_dates', args=[self.room.pk])},
+            {'id': 'bad', 'path': f'{availability}?room_id=²&check_in={day(1)}&check_out={day(3)}'},
+            {'id': 'ok', 'path': f'{availability}?room_id={self.room.pk}&check_in={day(1)}&check_out={day(3)}'},
+            {'id': 'missing', 'path': reverse('api_room_busy_dates', args=[999999])},
+        ])
+        self.assertEqual(responses['busy']['status'], 200)
+        self.assertEqual(responses['bad']['status'], 400)
+        self.assertFalse(responses['bad']['body']['success'])
+        # Ошибка соседнего подзапроса не влияет на остальные
+        self.assertEqual(responses['ok']['status'], 200)
+        self.assertTrue(responses['ok']['body']['available'])
+        self.assertEqual(responses['missing']['status'], 404)
+
+    def test_only_api_routes_are_allowed(self):
+        responses = self.post_batch([
+            {'id': 'page', 'path': reverse('profile')},
+            {'id': 'nested', 'path': reverse('api_batch')},
+            {'id': 'unknown', 'path': '/no/such/path/'},
+        ])
+        self.assertEqual(responses['page']['status'], 400)
+        self.assertEqual(responses['nested']['status'], 400)
+        self.assertEqual(responses['unknown']['status'], 404)
+
+    def test_sub_request_does_not_change_original(self):
+        request = RequestFactory().post('/accounts/api/batch/?x=1', data='{}', content_type='application/json')
+        sub = batch.sub_request(request, f"{reverse('api_room_inventory')}?days=7")
+
+        self.assertEqual(sub.method, 'GET')
+        self.assertEqual(sub.GET['days'], '7')
+        self.assertEqual(request.method, 'POST')
+        self.assertEqual(request.GET['x'], '1')
+        self.assertEqual(request.META['REQUEST_METHOD'], 'POST')
+        self.assertNotIn('days', request.GET)
+
+    def test_batch_is_validated(self):
+        url = reverse('api_batch')
+        too_many = [{'id': str(i), 'path': reverse('api_room_inventory')} for i in range(batch.MAX_REQUESTS + 1)]
+        for body in ['не json', json.dumps({'requests': []}), json.dumps({'requests': too_many})]:
+            response = self.client.post(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import cache
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+class VersionedCacheTests(IsolatedStorageMixin, TestCase):
+    def test_bump_invalidates_only_its_namespace(self):
+        self.assertEqual(cache.get_versions([cache.ROOMS, cache.DOCTORS]), [1, 1])
+        cache.bump(cache.ROOMS)
+        cache.bump(cache.ROOMS)
+        self.assertEqual(cache.get_versions([cache.ROOMS, cache.DOCTORS]), [3, 1])
+
+    def test_cached_builds_once_until_any_namespace_is_bumped(self):
+        builder = mock.Mock(side_effect=[1, 2])
+        namespaces = [cache.room_bookings(5), cache.ROOMS]
+        self.assertEqual(cache.cached(namespaces, 'key', builder), 1)
+        self.assertEqual(cache.cached(namespaces, 'key', builder), 1)
+        cache.bump(cache.DOCTORS)
+        self.assertEqual(cache.cached(namespaces, 'key', builder), 1)
+        cache.bump(cache.ROOMS)
+        self.assertEqual(cache.cached(namespaces, 'key', builder), 2)
+        self.assertEqual(builder.call_count, 2)
+
+    async def test_acached_shares_entries_with_cached(self):
+        cache.cached(cache.ROOMS, 'key', lambda: 'sync')
+
+        async def builder():
+            return 'async'
+
+        self.assertEqual(await cache.acached(cache.ROOMS, 'key', builder), 'sync')
+
+    def test_stats_count_hits_per_namespace_kind(self):
+        before = cache.cache_stats()['namespaces'].get('room:bookings', {'hit': 0, 'miss': 0})
+        for room_id in (1, 2, 1):
+            cache.cached(cache.room_bookings(room_id), 'key', lambda: 'value')
+        after = cache.cache_stats()['namespaces']['room:bookings']
+        self.assertEqual((after['hit'] - before['hit'], after['miss'] - before['miss']), (1, 2))
+
+
+class CacheInvalidationTests(IsolatedStorageMixin, TestCase):
+    def test_booking_bumps_old_and_new_room_after_commit(self):
+        first, second = create_room('101'), create_room('102')
+        namespaces = [cache.room_bookings(first.pk), cache.room_bookings(second.pk)]
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(create_user('guest'), first, day(5), day(7))
+        self.assertEqual(cache.get_versions(namespaces), [2, 1])
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            booking.room = second
+            booking.save()
+        # До коммита версии не меняются: кеш не заполнится данными из транзакции
+        self.assertEqual(cache.get_versions(namespaces), [2, 1])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache.get_versions(namespaces), [3, 2])
+
+    def test_busy_dates_refresh_after_booking(self):
+        room = create_room('101')
+        path = reverse('api_room_busy_dates', args=[room.pk])
+        busy = self.client.get(path).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            create_booking(create_user('guest'), room, day(5), day(7))
+        self.assertNotEqual(self.client.get(path).json(), busy)
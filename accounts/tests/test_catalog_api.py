@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Doctor, Procedure, ProcedureCategory
+from .utils import IsolatedStorageMixin, create_room
+
+
+class CatalogApiTests(IsolatedStorageMixin, TestCase):
+    def get(self, resource, **params):
+        return self.client.get(reverse('api_catalog', args=[resource]), params)
+
+    def test_selected_fields_and_converted_values(self):
+        create_room('101', price=Decimal('5500.50'))
+        data = self.get('rooms', fields='price_per_day,name,type_name,name').json()
+        self.assertEqual(data['fields'], ['name', 'type_name', 'price_per_day'])
+        self.assertEqual(data['data'], [{'name': '101', 'type_name': 'Стандартный', 'price_per_day': 5500.5}])
+
+    def test_cursor_pages(self):
+        rooms = [create_room(str(number)) for number in range(101, 106)]
+        seen, cursor = [], None
+        while True:
+            params = {'fields': 'id', 'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.get('rooms', **params).json()
+            seen += [item['id'] for item in data['data']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [room.pk for room in rooms])
+
+    def test_related_fields_are_joined_only_when_requested(self):
+        category = ProcedureCategory.objects.create(name='Массаж', description='Массаж')
+        procedure = Procedure.objects.create(name='Классический', category=category, description='Описание',
+                                             duration=30, price=Decimal('1500'))
+        doctor = Doctor.objects.create(user=User.objects.create_user('doc', first_name='Иван', last_name='Петров'),
+                                       specialization='Массажист', qualification='Высшая', experience=5)
+        doctor.procedures.add(procedure)
+
+        with CaptureQueriesContext(connection) as context:
+            self.get('procedures', fields='name,price')
+        self.assertNotIn('accounts_procedurecategory', context.captured_queries[-1]['sql'])
+        data = self.get('procedures', fields='category_name', limit=1).json()
+        self.assertEqual(data['data'], [{'category_name': 'Массаж'}])
+
+        data = self.get('doctors', fields='name,procedures').json()
+        self.assertEqual(data['data'], [{'name': 'Иван Петров', 'procedures': [procedure.pk]}])
+
+    def test_cached_until_the_catalog_changes(self):
+        create_room('101')
+        first = self.get('rooms', fields='name')
+        with self.assertNumQueries(0):
+            cached = self.get('rooms', fields='name')
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(self.client.get(reverse('api_catalog', args=['rooms']), {'fields': 'name'},
+                                         headers={'If-None-Match': first['ETag']}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_room('102')
+        self.assertEqual(len(self.get('rooms', fields='name').json()['data']), 2)
+
+    def test_errors(self):
+        cases = [
+            ('castles', {}, 404, 'Неизвестный ресурс'),
+            ('rooms', {'fields': 'name,secret'}, 400, 'Неизвестные поля: secret'),
+            ('rooms', {'cursor': '!!!'}, 400, 'Неверный cursor'),
+            ('rooms', {'limit': 1000}, 400, 'limit'),
+        ]
+        for resource, params, status, message in cases:
+            with self.subTest(resource=resource, params=params):
+                response = self.get(resource, **params)
+                self.assertEqual(response.status_code, status)
+                self.assertIn(message, response.json()['error'])
@@ -0,0 +1,124 @@
+import hashlib
+import io
+import os
+
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..encryption import EncryptionError, EncryptionService
+from ..models import EncryptedDocument
+from ..uploads import document_path
+from .utils import IsolatedStorageMixin, create_user
+
+SCAN = b'%PDF-1.4\n' + os.urandom(150 * 1024)
+
+
+class StreamEncryptionTests(SimpleTestCase):
+    keys = {1: 'first-secret-key-for-tests'}
+
+    def encrypted_file(self, content):
+        encryptor = EncryptionService.stream_encryptor(version=1, keys=self.keys)
+        f = io.BytesIO()
+        f.write(encryptor.start())
+        for start in range(0, len(content), 64 * 1024):
+            f.write(encryptor.update(content[start:start + 64 * 1024]))
+        f.write(encryptor.finalize())
+        return f
+
+    def test_round_trip(self):
+        f = self.encrypted_file(SCAN)
+        decryptor = EncryptionService.stream_decryptor(f, keys=self.keys)
+        self.assertEqual(b''.join(decryptor.read_chunks(f, chunk_size=10_000)), SCAN)
+
+    def test_tampered_file_is_rejected_before_any_data(self):
+        data = bytearray(self.encrypted_file(SCAN).getvalue())
+        data[len(data) // 2] ^= 1
+        tampered = io.BytesIO(bytes(data))
+        decryptor = EncryptionService.stream_decryptor(tampered, keys=self.keys)
+        # Тег проверяется при вызове, до выдачи данных
+        with self.assertRaises(EncryptionError):
+            decryptor.read_chunks(tampered)
+
+
+class DocumentScanTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.guest = create_user('guest')
+        self.staff = create_user('staff', is_staff=True)
+        self.staff.user_permissions.add(Permission.objects.get(codename='can_verify_documents'))
+
+    def upload(self, content=SCAN, name='scan.pdf', **extra):
+        self.client.force_login(self.guest)
+        data = {'document_type': 'medical', 'scan': SimpleUploadedFile(name, content), **extra}
+        return self.client.post(reverse('upload_documents'), data)
+
+    def download(self, document):
+        client = Client(raise_request_exception=False)
+        client.force_login(self.staff)
+        return client.get(reverse('download_document', args=[document.pk]))
+
+    def stored_files(self):
+        root = self.tmp_dir / 'documents'
+        return sorted(str(path.relative_to(root)) for path in root.rglob('*.enc')) if root.exists() else []
+
+    def test_scan_is_stored_encrypted_and_served_decrypted(self):
+        response = self.upload()
+
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        document = EncryptedDocument.objects.get()
+        self.assertEqual(self.stored_files(), [document.file_name])
+        self.assertEqual(document.file_size, len(SCAN))
+        self.assertEqual(document.file_sha256, hashlib.sha256(SCAN).hexdigest())
+        with open(document_path(document.file_name), 'rb') as f:
+            self.assertNotIn(SCAN[:4096], f.read())
+
+        response = self.download(document)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), SCAN)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="document-{document.pk}.pdf"')
+
+    def test_disallowed_extension_is_not_stored(self):
+        response = self.upload(name='page.html')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EncryptedDocument.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_only_one_scan_field_is_stored(self):
+        self.upload(scan_copy=SimpleUploadedFile('copy.pdf', SCAN),
+                    extra=SimpleUploadedFile('extra.pdf', SCAN))
+        self.upload(scan=[SimpleUploadedFile('first.pdf', SCAN), SimpleUploadedFile('second.pdf', SCAN)])
+
+        documents = EncryptedDocument.objects.order_by('pk')
+        self.assertEqual([document.original_name for document in documents], ['scan.pdf', 'first.pdf'])
+        # Лишние файлы в запросе не оставляют зашифрованных копий в хранилище
+        self.assertEqual(self.stored_files(), sorted(document.file_name for document in documents))
+
+    def test_missing_and_tampered_files(self):
+        self.upload()
+        document = EncryptedDocument.objects.get()
+        path = document_path(document.file_name)
+        with open(path, 'r+b') as f:
+            f.seek(1000)
+            byte = f.read(1)
+            f.seek(1000)
+            f.write(bytes([byte[0] ^ 1]))
+
+        with self.assertLogs('accounts.views_documents', 'ERROR'):
+            response = self.download(document)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('поврежден', response.content.decode())
+        os.remove(path)
+        self.assertEqual(self.download(document).status_code, 404)
+
+    def test_file_is_deleted_with_row(self):
+        self.upload()
+        document = EncryptedDocument.objects.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+
+        self.assertEqual(self.stored_files(), [])
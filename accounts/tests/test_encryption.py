@@ -0,0 +1,38 @@
+import base64
+
+from django.test import SimpleTestCase
+
+from ..encryption import EncryptionError, EncryptionService
+
+
+class EncryptionTests(SimpleTestCase):
+    keys = {1: 'first-secret-key-for-tests', 2: 'second-secret-key-for-tests'}
+
+    def test_round_trip(self):
+        encrypted = EncryptionService.encrypt('Паспорт 1234 567890', keys=self.keys, version=1)
+        self.assertTrue(encrypted.startswith(f'{EncryptionService.PREFIX}v1:'))
+        self.assertNotIn('567890', encrypted)
+        self.assertEqual(EncryptionService.decrypt(encrypted, keys=self.keys), 'Паспорт 1234 567890')
+
+    def test_reencrypt_to_new_key(self):
+        encrypted = EncryptionService.encrypt('данные', keys=self.keys, version=1)
+        rotated = EncryptionService.reencrypt(encrypted, 2, self.keys)
+        self.assertEqual(EncryptionService.key_version(rotated), 2)
+        self.assertEqual(EncryptionService.decrypt(rotated, keys={2: self.keys[2]}), 'данные')
+
+    def test_tampered_ciphertext_is_rejected(self):
+        encrypted = EncryptionService.encrypt('данные', keys=self.keys, version=1)
+        prefix, payload = encrypted.rsplit(':', 1)
+        raw = bytearray(base64.b64decode(payload))
+        raw[EncryptionService.NONCE_SIZE] ^= 1
+        tampered = f"{prefix}:{base64.b64encode(bytes(raw)).decode()}"
+        with self.assertRaises(EncryptionError):
+            EncryptionService.decrypt(tampered, keys=self.keys)
+
+    def test_legacy_format_and_unknown_key(self):
+        self.assertEqual(EncryptionService.key_version('ENCRYPTED:старый текст'), 0)
+        self.assertEqual(EncryptionService.decrypt('ENCRYPTED:старый текст', keys=self.keys), 'старый текст')
+
+        encrypted = EncryptionService.encrypt('данные', keys=self.keys, version=2)
+        with self.assertRaises(EncryptionError):
+            EncryptionService.decrypt(encrypted, keys={1: self.keys[1]})
@@ -0,0 +1,92 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import events
+from ..availability import ApiError
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+def state(room_id, check_in, check_out, status='confirmed'):
+    return {'room_id': room_id, 'status': status, 'check_in': check_in, 'check_out': check_out}
+
+
+class AvailabilityChangeTests(SimpleTestCase):
+    def test_changes_per_room(self):
+        booked = state(1, day(1), day(3))
+        self.assertEqual(events.availability_changes(None, booked), {1: {
+            'type': 'availability', 'room_id': 1, 'removed': [],
+            'added': [{'start': day(1).isoformat(), 'end': day(3).isoformat(), 'status': 'confirmed'}],
+        }})
+        self.assertEqual(events.availability_changes(booked, dict(booked)), {})
+        cancelled = events.availability_changes(booked, {**booked, 'status': 'cancelled'})
+        self.assertEqual((cancelled[1]['added'], len(cancelled[1]['removed'])), ([], 1))
+        self.assertEqual(events.availability_changes(None, state(None, day(1), day(3))), {})
+
+        moved = events.merged_changes([(booked, state(2, day(1), day(3))), (None, state(2, day(5), day(6)))])
+        self.assertEqual((len(moved[1]['removed']), len(moved[2]['added'])), (1, 2))
+
+    def test_parse_room_ids(self):
+        self.assertEqual(events.parse_room_ids(QueryDict('room_id=1,2&room_id=3&room_id=1')), {1, 2, 3})
+        for query in ('', 'room_id=x', 'room_id=' + ','.join(map(str, range(events.MAX_ROOMS + 1)))):
+            with self.subTest(query), self.assertRaises(ApiError):
+                events.parse_room_ids(QueryDict(query))
+
+
+class StreamTests(SimpleTestCase):
+    async def test_events_reach_subscribers_of_the_room(self):
+        other = events.stream({2})
+        stream = events.stream({1})
+        self.assertEqual(await stream.__anext__(), f'retry: {events.RETRY_MS}\n\n')
+        await other.__anext__()
+        self.assertEqual(events.broker.stats()['connections'], 2)
+
+        # publish вызывается из потока, который коммитит транзакцию
+        await asyncio.to_thread(events.broker.publish, 1, {'type': 'availability', 'room_id': 1,
+                                                           'added': [], 'removed': []})
+        message = await asyncio.wait_for(stream.__anext__(), 1)
+        lines = message.splitlines()
+        self.assertTrue(lines[0].startswith('id: '))
+        self.assertEqual(lines[1], 'event: availability')
+        self.assertEqual(json.loads(lines[2][len('data: '):])['room_id'], 1)
+        with mock.patch.object(events, 'HEARTBEAT', 0.01):
+            self.assertEqual(await other.__anext__(), ': ping\n\n')
+
+        await stream.aclose()
+        await other.aclose()
+        self.assertEqual(events.broker.stats()['connections'], 0)
+
+    async def test_slow_client_gets_resync(self):
+        subscription = events.Subscription({1}, asyncio.get_running_loop())
+        for index in range(events.QUEUE_SIZE + 1):
+            subscription.deliver({'type': 'availability', 'id': index})
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertIs(subscription.queue.get_nowait(), events.RESYNC)
+
+
+class BookingEventTests(IsolatedStorageMixin, TestCase):
+    def test_booking_changes_are_published_after_commit(self):
+        room, other = create_room('101'), create_room('102')
+        with mock.patch.object(events.broker, 'has_subscribers', return_value=True), \
+                mock.patch.object(events.broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                booking = create_booking(create_user('guest'), room, day(1), day(3))
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+            [(room_id, event)] = [call.args for call in publish.call_args_list]
+            self.assertEqual((room_id, len(event['added'])), (room.pk, 1))
+
+            publish.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                booking.room = other
+                booking.save()
+            self.assertEqual({call.args[0] for call in publish.call_args_list}, {room.pk, other.pk})
+
+    def test_sync_view_explains_asgi_only(self):
+        response = self.client.get(reverse('api_room_events'), {'room_id': 1})
+        self.assertEqual(response.status_code, 501)
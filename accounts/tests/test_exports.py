@@ -0,0 +1,67 @@
+import csv
+import io
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..exports import cell
+from ..models import GuestProfile
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+def read_csv(response):
+    content = b''.join(response.streaming_content).decode('utf-8')
+    return list(csv.reader(io.StringIO(content.lstrip('\ufeff')), delimiter=';'))
+
+
+class CellTests(SimpleTestCase):
+    def test_formulas_become_text(self):
+        for value in ('=HYPERLINK("x")', '+7900', '-1', '@SUM(A1)', '\tcmd'):
+            with self.subTest(value):
+                self.assertEqual(cell(value), "'" + value)
+        self.assertEqual(cell('Иванов'), 'Иванов')
+        self.assertEqual(cell(None), '')
+        self.assertEqual(cell(-5), -5)
+
+
+class ExportTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(create_user('staff', is_staff=True))
+
+    def test_bookings_honour_list_filters(self):
+        guest = create_user('=cmd|calc', first_name='Анна')
+        standard, lux = create_room('101'), create_room('201', price=Decimal('9000'), room_type='lux')
+        create_booking(guest, standard, day(1), day(3))
+        create_booking(guest, lux, day(2), day(4), room_type='lux')
+        create_booking(guest, standard, day(10), day(12), status='cancelled')
+
+        response = self.client.get(reverse('admin_export_bookings'), {'status': 'confirmed', 'room_type': 'lux'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="bookings_', response['Content-Disposition'])
+        header, *rows = read_csv(response)
+        self.assertEqual(header[:3], ['ID', 'Создано', 'Статус'])
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(header, rows[0]))
+        self.assertEqual((row['Номер'], row['Тип номера'], row['Стоимость']), ('201', 'Люкс', '18000.00'))
+        self.assertEqual(row['Логин'], "'=cmd|calc")
+
+        response = self.client.get(reverse('admin_export_bookings'), {'date_to': day(5)})
+        self.assertEqual(len(read_csv(response)) - 1, 2)
+
+    def test_guests_exclude_sensitive_fields(self):
+        guest = create_user('guest')
+        GuestProfile.objects.create(user=guest, last_name='Петров', passport_masked='12** ****90',
+                                    emergency_phone='+79001112233', special_requests='Аллергия')
+        header, row = read_csv(self.client.get(reverse('admin_export_guests')))
+        self.assertEqual(dict(zip(header, row))['Фамилия'], 'Петров')
+        content = ';'.join(header + row)
+        for value in ('12** ****90', '+79001112233', 'Аллергия'):
+            self.assertNotIn(value, content)
+
+    def test_exports_are_staff_only(self):
+        self.client.force_login(create_user('guest'))
+        for name in ('admin_export_bookings', 'admin_export_appointments', 'admin_export_guests'):
+            with self.subTest(name):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 302)
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Appointment, Booking, Doctor, GuestProfile, ScheduleSlot
+from ..seeding import DataGenerator
+from .utils import IsolatedStorageMixin, TODAY
+
+
+class GenerateDataTests(IsolatedStorageMixin, TestCase):
+    def generate(self, prefix='gen', seed=7, **options):
+        options = {'users': 20, 'rooms': 6, 'years': 0.5, 'doctors': 2, 'procedures': 4, **options}
+        args = [f'--{name}={value}' for name, value in options.items()]
+        call_command('generate_data', f'--prefix={prefix}', f'--seed={seed}', *args, stdout=StringIO())
+
+    def test_bookings_do_not_overlap_and_keep_generated_prices(self):
+        self.generate(bookings=120)
+        bookings = list(Booking.objects.select_related('room').order_by('room_id', 'check_in'))
+        self.assertEqual(len(bookings), 120)
+        for previous, booking in zip(bookings, bookings[1:]):
+            if previous.room_id == booking.room_id:
+                self.assertLessEqual(previous.check_out, booking.check_in)
+        for booking in bookings:
+            self.assertEqual(booking.total_price, booking.room.price_per_day * booking.days)
+            self.assertEqual(booking.room_type, booking.room.type)
+            self.assertEqual(booking.status in ('completed', 'cancelled'), booking.check_out <= TODAY)
+
+        self.assertEqual(GuestProfile.objects.count(), 20)
+        self.assertEqual(Doctor.objects.count(), 2)
+        self.assertTrue(ScheduleSlot.objects.exists())
+        self.assertFalse(Appointment.objects.filter(doctor__isnull=True).exists())
+
+    def test_same_seed_gives_same_data(self):
+        def shape(prefix):
+            return list(Booking.objects.filter(user__username__startswith=f'{prefix}_')
+                        .order_by('id').values_list('check_in', 'check_out', 'guests', 'status', 'total_price'))
+
+        self.generate(prefix='first', bookings=30)
+        self.generate(prefix='second', bookings=30)
+        self.assertEqual(shape('first'), shape('second'))
+
+    def test_prefix_must_be_new(self):
+        self.generate(users=2, rooms=1, years=0.1)
+        with self.assertRaisesMessage(CommandError, 'уже есть'):
+            self.generate(users=2, rooms=1, years=0.1)
+
+    def test_too_many_bookings_for_the_period(self):
+        with self.assertRaisesMessage(CommandError, 'не помещаются'):
+            self.generate(rooms=1, years=0.01, bookings=1000)
+
+    def test_bookings_are_written_in_batches(self):
+        generator = DataGenerator(seed=1, batch_size=10)
+        generator.users(5)
+        generator.rooms(2)
+        with self.assertNumQueries(4):
+            self.assertEqual(generator.bookings(total=40), 40)
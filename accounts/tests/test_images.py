@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import cache, images
+from ..models import Doctor, Room
+from .utils import IsolatedStorageMixin, create_room, create_user
+
+
+def png(width=1200, height=800):
+    path = SimpleUploadedFile('photo.png', b'', content_type='image/png')
+    image = Image.new('RGB', (width, height), (200, 120, 40))
+    image.save(path.file, 'PNG')
+    path.file.seek(0)
+    return path
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640])
+class ImageVariantTests(IsolatedStorageMixin, TestCase):
+    def store_hash(self, instance):
+        """То, что делает schedule_variants после коммита, - синхронно, без пула процессов"""
+        image_field, hash_field = images.image_sources(type(instance))
+        name = getattr(instance, image_field).name
+        future = Future()
+        future.set_result(images.build_variants(getattr(instance, image_field).path, images.variants_root(),
+                                                images.variant_widths()))
+        # В тесте соединение общее с транзакцией теста - не закрываем его
+        with mock.patch.object(images, 'connection'):
+            images._store_hash(type(instance), instance.pk, image_field, hash_field, name, future)
+        return future.result()
+
+    def test_variants_are_built_once_per_content(self):
+        room = create_room('101')
+        room.image = png()
+        room.save()
+
+        content_hash = self.store_hash(room)
+
+        root = images.variants_root()
+        for width in (320, 640):
+            for ext in ('webp', 'jpg'):
+                path = os.path.join(root, images.variant_name(content_hash, width, ext))
+                with Image.open(path) as variant:
+                    self.assertEqual(variant.width, width)
+        self.assertEqual(Room.objects.get(pk=room.pk).image_hash, content_hash)
+
+        # Та же картинка у другого номера - те же файлы, без повторной генерации
+        other = create_room('102')
+        other.image = png()
+        other.save()
+        with mock.patch('PIL.Image.open') as image_open:
+            self.assertEqual(self.store_hash(other), content_hash)
+        image_open.assert_not_called()
+
+    def test_small_image_is_not_upscaled(self):
+        room = create_room('101')
+        room.image = png(200, 100)
+        room.save()
+        content_hash = self.store_hash(room)
+        with Image.open(os.path.join(images.variants_root(), images.variant_name(content_hash, 640, 'jpg'))) as v:
+            self.assertEqual(v.size, (200, 100))
+
+    def test_replaced_photo_keeps_new_hash(self):
+        room = create_room('101')
+        room.image = png()
+        room.save()
+        image_field, hash_field = images.image_sources(Room)
+        future = Future()
+        future.set_result('0' * 64)
+
+        with mock.patch.object(images, 'connection'):
+            images._store_hash(Room, room.pk, image_field, hash_field, 'rooms/old.png', future)
+
+        self.assertEqual(Room.objects.get(pk=room.pk).image_hash, '')
+
+    def test_doctor_photo_refreshes_catalog(self):
+        doctor = Doctor.objects.create(user=create_user('doctor', first_name='Иван', last_name='Петров'),
+                                       specialization='Терапевт', qualification='Высшая', experience=10)
+        self.client.force_login(create_user('guest'))
+        url = reverse('api_catalog', args=['doctors'])
+        self.assertIsNone(self.client.get(url).json()['data'][0]['photo_variants'])
+
+        doctor.photo = png()
+        doctor.save()
+        versions = cache.get_versions([cache.DOCTORS])
+        content_hash = self.store_hash(doctor)
+
+        # Хеш пишется update() без сигналов: сбрасывается кеш врачей, а не номеров
+        self.assertEqual(cache.get_versions([cache.DOCTORS]), [versions[0] + 1])
+        variants = self.client.get(url).json()['data'][0]['photo_variants']
+        self.assertEqual(variants['640'], images.variant_url(content_hash, 640))
@@ -0,0 +1,120 @@
+import io
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import cache, rollups
+from ..imports import import_csv
+from ..models import DailyRoomTypeStats, Doctor, Procedure, ProcedureCategory, Room, ScheduleSlot
+from .utils import IsolatedStorageMixin, create_room, create_user
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def rooms_csv(count, start=0):
+    lines = ['name;type;capacity;price_per_day;description']
+    lines += [f'{i};standard;2;5000;Номер' for i in range(start, start + count)]
+    return csv_file('\n'.join(lines))
+
+
+class ImportTests(IsolatedStorageMixin, TestCase):
+    def test_rooms_upsert_by_name_and_report_bad_rows(self):
+        create_room('101', price=Decimal('1000'))
+        result = import_csv('rooms', csv_file(
+            '\ufeffName,Type,Capacity,Price_per_day,Description\n'
+            '101,standard,3,6000,Обновлен\n'
+            '102,lux,2,9000,Новый\n'
+            '103,castle,2,-1,Ошибка\n'
+            '\n'
+            '104,comfort,2,7000,Новый\n'
+        ))
+        self.assertEqual((result.rows, result.created, result.updated, result.error_count), (4, 2, 1, 1))
+        [(line, message)] = result.errors
+        self.assertEqual(line, 4)
+        self.assertIn('type', message)
+        self.assertEqual(Room.objects.get(name='101').price_per_day, Decimal('6000'))
+        self.assertEqual(Room.objects.count(), 3)
+
+    def test_rooms_refresh_caches_and_room_totals(self):
+        rollups.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            import_csv('rooms', rooms_csv(2))
+        self.assertEqual(cache.get_versions([cache.ROOMS, cache.INVENTORY]), [2, 2])
+        stats = DailyRoomTypeStats.objects.filter(room_type='standard').latest('date')
+        self.assertEqual(stats.rooms_total, 2)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries(count, start):
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(import_csv('rooms', rooms_csv(count, start)).created, count)
+            return len(context)
+
+        self.assertEqual(queries(5, 0), queries(100, 1000))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_csv('rooms', rooms_csv(3), dry_run=True)
+        self.assertEqual(result.created, 3)
+        self.assertFalse(Room.objects.exists())
+
+    def test_whole_file_rejections(self):
+        with self.assertRaisesMessage(ValueError, 'Нет обязательных колонок: price_per_day'):
+            import_csv('rooms', csv_file('name;type;description\n101;standard;Номер\n'))
+        with self.assertRaisesMessage(ValueError, 'UTF-8'):
+            content = 'name;type;price_per_day;description\n101;standard;5000;Номер\n'.encode('cp1251')
+            import_csv('rooms', io.BytesIO(content))
+        with self.assertRaisesMessage(ValueError, 'Пустой файл'):
+            import_csv('rooms', csv_file(''))
+
+    def test_procedures_doctors_and_schedule(self):
+        ProcedureCategory.objects.create(name='Массаж', description='Массаж')
+        result = import_csv('procedures', csv_file(
+            'name;category;description;duration;price\n'
+            'Классический;Массаж;Описание;30;1500\n'
+            'Грязи;Нет такой;Описание;30;1500\n'
+        ))
+        self.assertEqual((result.created, result.error_count), (1, 1))
+        self.assertIn('Категория не найдена: Нет такой', result.errors[0][1])
+
+        create_user('ivanov', first_name='Старое')
+        result = import_csv('doctors', csv_file(
+            'username;first_name;specialization;qualification;experience;procedures\n'
+            'ivanov;Иван;Массажист;Высшая;10;Классический\n'
+            'petrov;Петр;Терапевт;Первая;5;\n'
+            'sidorov;Сидор;Терапевт;Первая;5;Йога\n'
+        ))
+        self.assertEqual((result.created, result.error_count), (2, 1))
+        ivanov = Doctor.objects.get(user__username='ivanov')
+        self.assertEqual(ivanov.user.first_name, 'Иван')
+        self.assertEqual(list(ivanov.procedures.values_list('name', flat=True)), ['Классический'])
+        self.assertFalse(Doctor.objects.get(user__username='petrov').procedures.exists())
+
+        schedule = ('doctor;day_of_week;start_time;end_time;max_appointments\n'
+                    'ivanov;mon;09:00;12:00;{}\n'
+                    'ivanov;tue;12:00;09:00;3\n'
+                    'nobody;mon;09:00;12:00;3\n')
+        result = import_csv('schedule', csv_file(schedule.format(5)))
+        self.assertEqual((result.created, result.error_count), (1, 2))
+        result = import_csv('schedule', csv_file(schedule.format(8)))
+        self.assertEqual((result.created, result.updated), (0, 1))
+        self.assertEqual(ScheduleSlot.objects.get().max_appointments, 8)
+        self.assertEqual(Procedure.objects.count(), 1)
+
+
+class ImportViewTests(IsolatedStorageMixin, TestCase):
+    def test_staff_upload(self):
+        url = reverse('admin_import')
+        self.client.force_login(create_user('guest'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(create_user('staff', is_staff=True))
+        upload = SimpleUploadedFile('rooms.csv', rooms_csv(2).getvalue(), content_type='text/csv')
+        response = self.client.post(url, {'kind': 'rooms', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 2)
+        self.assertEqual(Room.objects.count(), 2)
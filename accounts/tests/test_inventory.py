@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase, TestCase
+
+from .. import inventory
+from ..inventory import stay_changes
+from ..models import DailyRoomTypeInventory
+from .utils import TODAY, IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+class StayChangesTests(SimpleTestCase):
+    def stay(self, check_in, check_out, status='confirmed', room_type='standard'):
+        return {'room_type': room_type, 'status': status, 'check_in': check_in, 'check_out': check_out}
+
+    def test_new_booking(self):
+        self.assertEqual(stay_changes(None, self.stay(day(1), day(4)), TODAY),
+                         [('standard', day(1), day(4), 1)])
+
+    def test_shifted_dates_touch_only_edges(self):
+        changes = stay_changes(self.stay(day(1), day(5)), self.stay(day(3), day(7)), TODAY)
+        self.assertEqual(changes, [('standard', day(1), day(3), -1), ('standard', day(5), day(7), 1)])
+
+    def test_cancellation_releases_nights(self):
+        changes = stay_changes(self.stay(day(1), day(3)), self.stay(day(1), day(3), status='cancelled'), TODAY)
+        self.assertEqual(changes, [('standard', day(1), day(3), -1)])
+
+    def test_unchanged_stay_has_no_changes(self):
+        self.assertEqual(stay_changes(self.stay(day(1), day(3)), self.stay(day(1), day(3)), TODAY), [])
+
+    def test_past_nights_are_clipped(self):
+        changes = stay_changes(None, self.stay(day(-3), day(2)), TODAY)
+        self.assertEqual(changes, [('standard', TODAY, day(2), 1)])
+        self.assertEqual(stay_changes(None, self.stay(day(-5), day(-1)), TODAY), [])
+
+    def test_room_type_change(self):
+        changes = stay_changes(self.stay(day(1), day(3)), self.stay(day(1), day(3), room_type='lux'), TODAY)
+        self.assertEqual(sorted(changes), [('lux', day(1), day(3), 1), ('standard', day(1), day(3), -1)])
+
+
+class InventoryTableTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('guest')
+        self.room = create_room('101')
+        create_room('102')
+
+    def free(self, days=5):
+        return inventory.free_rooms(TODAY, days)['standard']
+
+    def test_booking_changes_update_free_rooms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.user, self.room, day(1), day(3))
+        self.assertEqual(self.free(), (2, [2, 1, 1, 2, 2]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.check_in, booking.check_out = day(2), day(4)
+            booking.save()
+        self.assertEqual(self.free(), (2, [2, 2, 1, 1, 2]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'cancelled'
+            booking.save()
+        self.assertEqual(self.free(), (2, [2] * 5))
+
+    def test_rebuild_matches_incremental_updates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_booking(self.user, self.room, day(0), day(4))
+            create_booking(self.user, None, day(2), day(6))
+            create_booking(self.user, None, day(1), day(3), status='cancelled')
+        incremental = set(DailyRoomTypeInventory.objects.values_list('room_type', 'date', 'reserved'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.rebuild()
+
+        rebuilt = set(DailyRoomTypeInventory.objects.values_list('room_type', 'date', 'reserved'))
+        self.assertEqual({row for row in incremental if row[2]}, rebuilt)
+        self.assertEqual(self.free(7), (2, [1, 1, 0, 0, 1, 1, 2]))
@@ -0,0 +1,134 @@
+import io
+import os
+from concurrent.futures import Future
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..encryption import EncryptionService
+from ..management.commands.rotate_encryption_key import Command, reencrypt_rows
+from ..models import EncryptedDocument, GuestProfile
+from ..uploads import document_path, new_storage_name, read_document
+from .utils import IsolatedStorageMixin, create_user
+
+KEYS = {1: 'first-secret-key-for-tests', 2: 'second-secret-key-for-tests'}
+
+
+@override_settings(ENCRYPTION_KEYS=KEYS, ENCRYPTION_KEY_VERSION=2)
+class KeyRotationTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile = GuestProfile.objects.create(user=create_user('guest'), first_name='Анна', last_name='Иванова')
+        self.checkpoint = str(self.tmp_dir / 'rotation.json')
+
+    def document(self, encrypted_data='', file_name=''):
+        return EncryptedDocument.objects.create(profile=self.profile, document_type='other',
+                                                encrypted_data=encrypted_data, file_name=file_name)
+
+    def scan(self, content, version=1):
+        """Файл скана в хранилище, зашифрованный ключом version"""
+        storage_name = new_storage_name()
+        path = document_path(storage_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        encryptor = EncryptionService.stream_encryptor(version=version)
+        with open(path, 'wb') as f:
+            f.write(encryptor.start() + encryptor.update(content) + encryptor.finalize())
+        return storage_name
+
+    def read_scan(self, storage_name):
+        reader = read_document(storage_name)
+        try:
+            return b''.join(reader)
+        finally:
+            reader.close()
+
+    def rotate(self):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('rotate_encryption_key', workers=1, chunk_size=2, checkpoint=self.checkpoint,
+                     stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_rows_move_to_current_key(self):
+        documents = [self.document(EncryptionService.encrypt(f'{{"n": {i}}}', version=1)) for i in range(5)]
+
+        self.rotate()
+
+        for document in documents:
+            document.refresh_from_db()
+            self.assertEqual(EncryptionService.key_version(document.encrypted_data), 2)
+            self.assertEqual(EncryptionService.decrypt(document.encrypted_data, keys={2: KEYS[2]}),
+                             f'{{"n": {documents.index(document)}}}')
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_failed_rows_are_retried_on_resume(self):
+        good = self.document(EncryptionService.encrypt('{"n": 1}', version=1))
+        broken = self.document(EncryptionService.encrypt('{"n": 2}', version=1)[:-8] + 'AAAAAAA=')
+
+        with self.assertRaisesMessage(CommandError, str([broken.pk])):
+            self.rotate()
+
+        # Документ с ошибкой остался в прогрессе, хотя продолжение пойдет с id после него
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+        EncryptedDocument.objects.filter(pk=broken.pk).update(
+            encrypted_data=EncryptionService.encrypt('{"n": 2}', version=1))
+        out, _ = self.rotate()
+
+        self.assertIn('Повторяем документы с ошибками: 1', out)
+        broken.refresh_from_db()
+        good.refresh_from_db()
+        self.assertEqual(EncryptionService.key_version(broken.encrypted_data), 2)
+        self.assertEqual(EncryptionService.key_version(good.encrypted_data), 2)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_scans_move_to_current_key(self):
+        content = os.urandom(100 * 1024)
+        old_name = self.scan(content)
+        scan_only = self.document(file_name=old_name)
+        current = self.document(file_name=self.scan(b'current', version=2))
+
+        self.rotate()
+
+        scan_only.refresh_from_db()
+        self.assertNotEqual(scan_only.file_name, old_name)
+        self.assertFalse(os.path.exists(document_path(old_name)))
+        # Старый ключ больше не нужен
+        with self.settings(ENCRYPTION_KEYS={2: KEYS[2]}):
+            self.assertEqual(self.read_scan(scan_only.file_name), content)
+            self.assertEqual(self.read_scan(current.file_name), b'current')
+        self.assertEqual(EncryptedDocument.objects.get(pk=current.pk).file_name, current.file_name)
+        self.assertFalse(list(self.tmp_dir.rglob('*.tmp')))
+
+    def test_unreadable_scan_blocks_finish(self):
+        name = self.scan(b'scan')
+        with open(document_path(name), 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'!')
+        document = self.document(file_name=name)
+
+        with self.assertRaisesMessage(CommandError, str([document.pk])):
+            self.rotate()
+
+        document.refresh_from_db()
+        self.assertEqual(document.file_name, name)
+        self.assertTrue(os.path.exists(self.checkpoint))
+
+    def test_scan_replaced_during_rotation_is_kept(self):
+        old_name = self.scan(b'old')
+        document = self.document(file_name=old_name)
+        future = Future()
+        future.set_result(reencrypt_rows([(document.pk, '', old_name)], 2, KEYS))
+        new_name = future.result()[0][0][4]
+        # Пока шло шифрование, гость заменил скан
+        replaced = self.scan(b'replaced', version=2)
+        EncryptedDocument.objects.filter(pk=document.pk).update(file_name=replaced)
+
+        command = Command()
+        command.checkpoint_path = self.checkpoint
+        state = {'version': 2, 'last_id': 0, 'processed': 0, 'conflicts': 0, 'failed': []}
+        self.assertEqual(command.write_chunk([future], document.pk, state), (0, [], 1))
+
+        self.assertEqual(EncryptedDocument.objects.get(pk=document.pk).file_name, replaced)
+        # Новый файл пропущенной строки удален, чужие файлы ротация не трогает
+        self.assertFalse(os.path.exists(document_path(new_name)))
+        self.assertTrue(os.path.exists(document_path(old_name)))
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase, TestCase
+from django.urls import resolve
+
+from ..benchmarking import LoadResult, format_table
+from ..loadtest import (
+    ScenarioBuilder, compare_with_baseline, load_baseline, save_baseline, uncovered_routes,
+)
+from ..seeding import seed_dataset
+from .utils import IsolatedStorageMixin
+
+
+class LoadResultTests(SimpleTestCase):
+    def test_percentiles_and_rps(self):
+        result = LoadResult('catalog', 4, latencies=[i / 1000 for i in range(1, 101)], errors=2, elapsed=2.0)
+        row = result.as_dict()
+        self.assertEqual((row['requests'], row['errors'], row['rps']), (102, 2, 51.0))
+        self.assertEqual((row['p50_ms'], row['p95_ms'], row['p99_ms']), (51.0, 95.0, 99.0))
+        self.assertEqual(LoadResult('empty', 1).percentile(99), 0.0)
+
+    def test_format_table(self):
+        table = format_table([{'scenario': 'home', 'rps': 10.5}], ['scenario', 'rps'])
+        self.assertEqual(table.splitlines(), ['scenario  rps ', '--------  ----', 'home      10.5'])
+
+
+class BaselineTests(IsolatedStorageMixin, SimpleTestCase):
+    def row(self, scenario, p50, queries=3.0):
+        return {'scenario': scenario, 'rps': 100, 'p50_ms': p50, 'p95_ms': p50, 'p99_ms': p50, 'queries': queries}
+
+    def test_round_trip(self):
+        path = self.tmp_dir / 'benchmarks' / 'baseline.json'
+        self.assertIsNone(load_baseline(path))
+        save_baseline(path, [self.row('home', 10.0)], {'seed': 42})
+        baseline = load_baseline(path)
+        self.assertEqual(baseline['meta'], {'seed': 42})
+        self.assertEqual(baseline['scenarios']['home']['p50_ms'], 10.0)
+
+    def test_regressions(self):
+        baseline = {'scenarios': {
+            'slower': self.row('slower', 20.0),
+            'noise': self.row('noise', 2.0),
+            'queries': self.row('queries', 10.0),
+        }}
+        rows = [self.row('slower', 40.0), self.row('noise', 5.0), self.row('queries', 10.0, queries=4.0),
+                self.row('added', 10.0)]
+        regressions = compare_with_baseline(rows, baseline, tolerance=0.5)
+        self.assertEqual(regressions, ['slower: p50 20.0→40.0 ms', 'queries: queries 3.0→4.0'])
+        # Рост на 3 мс - шум, а не регрессия, хотя это +150%
+        self.assertEqual([row['vs_baseline'] for row in rows],
+                         ['p50 +100% REGRESSION', 'p50 +150%', 'p50 +0% REGRESSION', 'new'])
+
+
+class ScenarioTests(IsolatedStorageMixin, TestCase):
+    def test_scenarios_cover_every_route(self):
+        seed_dataset(seed=1, users=5, rooms=4, doctors=2, procedures=4, years=0.1)
+        scenarios = ScenarioBuilder(3, seed=1).build()
+        self.assertEqual(uncovered_routes(scenarios), [])
+        for scenario in scenarios:
+            with self.subTest(scenario.name):
+                self.assertTrue(scenario.requests)
+                path = scenario.requests[0]['path']
+                self.assertEqual(resolve(path.split('?')[0]).url_name, scenario.url_name)
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from django.urls import reverse
+
+from ..encryption import EncryptionService
+from ..models import EncryptedDocument, GuestProfile
+from .utils import IsolatedStorageMixin, create_user
+
+
+class MaskedDocumentTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.guest = create_user('guest')
+        self.profile = GuestProfile.objects.create(user=self.guest)
+
+    def create_document(self, document_type, data):
+        document = EncryptedDocument(profile=self.profile, document_type=document_type, uploaded_by=self.guest)
+        document.set_data(data)
+        document.save()
+        return document
+
+    def test_masks_are_computed_when_data_is_set(self):
+        cases = [
+            ('passport', {'series': '1234', 'number': '567890'}, '12** ****90'),
+            ('snils', {'number': '123-456-789 00'}, '***-***-*** 00'),
+            ('oms', {'number': '1234567890123456'}, '************ 3456'),
+            ('medical', {}, '***'),
+        ]
+        for document_type, data, masked in cases:
+            with self.subTest(document_type):
+                document = self.create_document(document_type, data)
+                self.assertEqual(document.get_masked_display(), masked)
+                self.assertNotIn(data.get('number', '-'), document.encrypted_data)
+
+    def test_profile_masks_follow_documents(self):
+        self.create_document('passport', {'series': '1234', 'number': '567890'})
+        self.create_document('snils', {'number': '123-456-789 00'})
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.passport_masked, self.profile.snils_masked),
+                         ('12** ****90', '***-***-*** 00'))
+
+    def test_document_pages_do_not_decrypt(self):
+        self.create_document('passport', {'series': '1234', 'number': '567890'})
+        staff = create_user('staff', is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename='can_verify_documents'))
+
+        with mock.patch.object(EncryptionService, 'decrypt', side_effect=AssertionError('decrypt')):
+            self.client.force_login(staff)
+            response = self.client.get(reverse('verify_documents', args=[self.guest.pk]))
+            self.assertContains(response, '12** ****90')
+
+            self.client.force_login(self.guest)
+            response = self.client.get(reverse('upload_documents'))
+            self.assertContains(response, '12** ****90')
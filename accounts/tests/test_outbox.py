@@ -0,0 +1,112 @@
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import outbox
+from ..models import Booking, EmailOutbox
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+class FailingConnection:
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPServerDisconnected('соединение закрыто')
+
+
+class BookingMailTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('guest')
+        self.booking = create_booking(self.user, create_room('101'), day(1), day(3), status='pending')
+
+    def set_status(self, booking, status):
+        booking.status = status
+        booking.save()
+
+    def keys(self):
+        return list(EmailOutbox.objects.order_by('pk').values_list('dedup_key', flat=True))
+
+    def test_every_transition_gets_a_mail(self):
+        for status in ('confirmed', 'pending', 'confirmed', 'cancelled'):
+            self.set_status(self.booking, status)
+
+        pk = self.booking.pk
+        self.assertEqual(self.keys(), [
+            f'booking:{pk}:new->pending:1',
+            f'booking:{pk}:pending->confirmed:1',
+            f'booking:{pk}:confirmed->pending:1',
+            f'booking:{pk}:pending->confirmed:2',
+            f'booking:{pk}:confirmed->cancelled:2',
+        ])
+        self.assertTrue(all(to == 'guest@example.com' for to in EmailOutbox.objects.values_list('to', flat=True)))
+
+    def test_concurrent_identical_transitions_send_one_mail(self):
+        first = Booking.objects.get(pk=self.booking.pk)
+        second = Booking.objects.get(pk=self.booking.pk)
+
+        self.set_status(first, 'confirmed')
+        self.set_status(second, 'confirmed')
+
+        self.assertEqual(EmailOutbox.objects.filter(subject__contains='подтверждено').count(), 1)
+
+    def test_skipped_notification_and_missing_email(self):
+        self.booking.skip_notification = True
+        self.set_status(self.booking, 'confirmed')
+        no_email = create_booking(create_user('noemail', email=''), None, day(1), day(3))
+        self.set_status(no_email, 'cancelled')
+
+        self.assertEqual(len(self.keys()), 1)
+
+
+class DeliveryTests(TestCase):
+    def enqueue(self, count):
+        for i in range(count):
+            outbox.enqueue(f'guest{i}@example.com', 'Тема', 'Текст', f'test:{i}')
+
+    def test_drain_sends_in_batches(self):
+        self.enqueue(5)
+        outbox.enqueue('guest0@example.com', 'Тема', 'Текст', 'test:0')
+
+        self.assertEqual(outbox.drain(batch_size=2), (5, 0))
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].extra_headers['X-Outbox-Key'], 'test:0')
+        self.assertEqual(set(EmailOutbox.objects.values_list('status', flat=True)), {'sent'})
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    def smtp_down(self):
+        return mock.patch.object(outbox, 'get_connection', return_value=FailingConnection())
+
+    def test_failure_is_retried_with_backoff(self):
+        self.enqueue(1)
+        with self.smtp_down():
+            self.assertEqual(outbox.drain(), (0, 1))
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, 'pending')
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('SMTPServerDisconnected', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=outbox.BACKOFF_BASE - 5))
+        # До истечения задержки письмо не забирается
+        self.assertEqual(outbox.claim_batch(10), [])
+
+    def test_message_fails_after_max_attempts(self):
+        self.enqueue(1)
+        EmailOutbox.objects.update(attempts=outbox.MAX_ATTEMPTS - 1)
+        with self.smtp_down():
+            outbox.drain()
+        self.assertEqual(EmailOutbox.objects.get().status, 'failed')
+
+    def test_backoff_doubles_up_to_limit(self):
+        self.assertEqual(outbox.backoff(1), timedelta(seconds=outbox.BACKOFF_BASE))
+        self.assertEqual(outbox.backoff(3), timedelta(seconds=outbox.BACKOFF_BASE * 4))
+        self.assertEqual(outbox.backoff(50), timedelta(seconds=outbox.BACKOFF_MAX))
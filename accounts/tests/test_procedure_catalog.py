@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory, TestCase
+
+from .. import cache, procedure_catalog
+from ..models import Procedure, ProcedureCategory
+from ..views import AdminProcedureListView, ProcedureListView
+from .utils import IsolatedStorageMixin, create_user
+
+
+class ProcedureCatalogTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.massage = ProcedureCategory.objects.create(name='Массаж', description='Массаж')
+        self.baths = ProcedureCategory.objects.create(name='Ванны', description='Ванны')
+        self.classic = self.procedure('Классический', self.massage, 30, '1500')
+        self.procedure('Спортивный', self.massage, 60, '3000')
+        self.procedure('Архивный', self.massage, 90, '9000', is_active=False)
+
+    def procedure(self, name, category, duration, price, is_active=True):
+        return Procedure.objects.create(name=name, category=category, description='Описание',
+                                        duration=duration, price=Decimal(price), is_active=is_active)
+
+    def test_categories_with_counts_and_ranges(self):
+        with self.assertNumQueries(2):
+            catalog = procedure_catalog.build_catalog()
+        baths, massage = catalog['categories']
+        self.assertEqual((baths['name'], baths['procedure_count'], baths['procedures'], baths['min_price']),
+                         ('Ванны', 0, [], None))
+        self.assertEqual(
+            (massage['procedure_count'], massage['min_price'], massage['max_price'],
+             massage['min_duration'], massage['max_duration']),
+            (2, Decimal('1500'), Decimal('3000'), 30, 60),
+        )
+        self.assertEqual([p['name'] for p in massage['procedures']], ['Классический', 'Спортивный'])
+        self.assertEqual(len(procedure_catalog.catalog_procedures(catalog, active_only=False)), 3)
+        self.assertEqual(procedure_catalog.catalog_procedures(catalog, self.baths.pk), [])
+
+    def test_cached_until_any_procedure_or_category_write(self):
+        procedure_catalog.get_catalog()
+        with self.assertNumQueries(0):
+            procedure_catalog.get_catalog()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classic.price = Decimal('1000')
+            self.classic.save()
+        massage = procedure_catalog.get_catalog()['categories'][1]
+        self.assertEqual(massage['min_price'], Decimal('1000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.baths.name = 'Бальнеология'
+            self.baths.save()
+        self.assertEqual(procedure_catalog.get_catalog()['categories'][0]['name'], 'Бальнеология')
+        self.assertEqual(cache.get_versions([cache.PROCEDURE_CATALOG]), [3])
+
+    def test_views_render_from_the_catalog(self):
+        procedure_catalog.get_catalog()
+        factory = RequestFactory()
+
+        request = factory.get('/procedures/', {'category': self.massage.pk})
+        request.user = create_user('guest')
+        with self.assertNumQueries(0):
+            response = ProcedureListView.as_view()(request)
+            response.render()
+        self.assertEqual([p['name'] for p in response.context_data['procedures']], ['Классический', 'Спортивный'])
+
+        request = factory.get('/admin/procedures/')
+        request.user = create_user('staff', is_staff=True)
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        response = AdminProcedureListView.as_view()(request)
+        self.assertEqual(len(response.context_data['procedures']), 3)
+        self.assertEqual(len(response.context_data['categories']), 2)
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..middleware import QueryRecorder, query_report, sql_fingerprint
+from ..models import Room
+from .utils import IsolatedStorageMixin, create_room, create_user
+
+
+class SqlFingerprintTests(SimpleTestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            sql_fingerprint("SELECT * FROM room WHERE id IN (%s, %s, %s) AND name = 'A''s'  AND n > 10"),
+            'SELECT * FROM room WHERE id IN (...) AND name = ? AND n > ?',
+        )
+        self.assertEqual(sql_fingerprint('SELECT 1 WHERE id IN (?)'), sql_fingerprint('SELECT 2 WHERE id IN (?, ?)'))
+
+
+class QueryRecorderTests(TestCase):
+    def test_repeated_queries_are_flagged(self):
+        rooms = [create_room(str(number)) for number in range(101, 108)]
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for room in rooms:
+                Room.objects.get(pk=room.pk)
+            Room.objects.count()
+        self.assertEqual(recorder.count, 8)
+        [(sql, repeats)] = recorder.suspected_n_plus_one(5)
+        self.assertEqual(repeats, 7)
+        self.assertIn('WHERE "accounts_room"."id" = %s', sql)
+        self.assertEqual(recorder.suspected_n_plus_one(7), [])
+
+
+@override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_INSPECTOR_N1_THRESHOLD=5)
+class QueryInspectorMiddlewareTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        query_report.reset()
+        self.addCleanup(query_report.reset)
+        self.staff = create_user('staff', is_staff=True)
+        # Клиент создается после override_settings: middleware читает настройку при загрузке
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_header_and_report_per_url_name(self):
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['X-Query-Stats'], r'^count=\d+; time_ms=[\d.]+; n_plus_one=0$')
+        self.client.get(reverse('home'))
+
+        [row] = [row for row in query_report.rows() if row['url_name'] == 'home']
+        self.assertEqual(row['requests'], 2)
+        self.assertEqual(row['queries'], 2 * int(response['X-Query-Stats'].split(';')[0].split('=')[1]))
+
+        response = self.client.get(reverse('admin_query_report'))
+        self.assertContains(response, 'home')
+
+    def test_report_is_staff_only(self):
+        self.client.force_login(create_user('guest'))
+        response = self.client.get(reverse('admin_query_report'))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(QUERY_INSPECTOR_ENABLED=False)
+    def test_disabled_by_default(self):
+        response = Client().get(reverse('home'))
+        self.assertNotIn('X-Query-Stats', response)
@@ -0,0 +1,77 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+
+from .. import ratelimit
+from .utils import IsolatedStorageMixin
+
+
+class TokenBucketTests(IsolatedStorageMixin, SimpleTestCase):
+    def test_burst_then_refill(self):
+        results = [ratelimit.take('client', rate=1, burst=3, now=100)[0] for _ in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+
+        allowed, tokens = ratelimit.take('client', rate=1, burst=3, now=102)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 1)
+
+    def test_refill_is_capped_by_burst(self):
+        ratelimit.take('client', rate=1, burst=3, now=100)
+        allowed, tokens = ratelimit.take('client', rate=1, burst=3, now=10_000)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 2)
+
+    def test_denied_request_spends_nothing(self):
+        ratelimit.take('client', rate=1, burst=2, now=100, cost=2)
+        self.assertEqual(ratelimit.take('client', rate=1, burst=2, now=100.5), (False, 0.5))
+        allowed, tokens = ratelimit.take('client', rate=1, burst=2, now=101)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(tokens, 0)
+
+    def test_clients_have_separate_buckets(self):
+        ratelimit.take('first', rate=1, burst=1, now=100)
+        self.assertFalse(ratelimit.take('first', rate=1, burst=1, now=100)[0])
+        self.assertTrue(ratelimit.take('second', rate=1, burst=1, now=100)[0])
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BURST=2, RATE_LIMIT_RATE=0.01)
+class RateLimitMiddlewareTests(IsolatedStorageMixin, SimpleTestCase):
+    path = '/accounts/api/rooms/inventory/'
+
+    def request(self, factory, path=None):
+        request = factory.get(path or self.path, REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+        return request
+
+    def test_sync_chain(self):
+        middleware = ratelimit.RateLimitMiddleware(lambda request: JsonResponse({'success': True}))
+        self.assertFalse(iscoroutinefunction(middleware))
+
+        first, second = [middleware(self.request(RequestFactory())) for _ in range(2)]
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(second['X-RateLimit-Remaining'], '0')
+
+        # Сверх лимита - последний ответ на тот же URL, на другой URL - 429
+        repeated = middleware(self.request(RequestFactory()))
+        self.assertEqual(repeated['X-RateLimit-Cached'], '1')
+        self.assertEqual(repeated.content, second.content)
+        throttled = middleware(self.request(RequestFactory(), f'{self.path}?days=7'))
+        self.assertEqual(throttled.status_code, 429)
+        self.assertIn('Retry-After', throttled)
+        # Пути вне API не ограничиваются
+        self.assertEqual(middleware(self.request(RequestFactory(), '/accounts/rooms/')).status_code, 200)
+
+    async def test_async_chain_stays_async(self):
+        async def view(request):
+            return JsonResponse({'success': True})
+
+        middleware = ratelimit.RateLimitMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        for _ in range(2):
+            self.assertEqual((await middleware(self.request(AsyncRequestFactory()))).status_code, 200)
+        repeated = await middleware(self.request(AsyncRequestFactory()))
+        self.assertEqual(repeated['X-RateLimit-Cached'], '1')
+        throttled = await middleware(self.request(AsyncRequestFactory(), f'{self.path}?days=7'))
+        self.assertEqual(throttled.status_code, 429)
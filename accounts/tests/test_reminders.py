@@ -0,0 +1,90 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .. import reminders
+from ..models import Appointment, Doctor, EmailOutbox, GuestProfile, Procedure, ProcedureCategory, ScheduleSlot
+from .utils import TODAY, create_user
+
+TOMORROW = TODAY + timedelta(days=1)
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        category = ProcedureCategory.objects.create(name='Массаж', description='Массаж')
+        self.massage = Procedure.objects.create(name='Массаж спины', category=category, description='Описание',
+                                                duration=30, price=Decimal('1500'), preparation='Не есть за час')
+        self.baths = Procedure.objects.create(name='Жемчужная ванна', category=category, description='Описание',
+                                              duration=20, price=Decimal('900'))
+        user = User.objects.create_user('doctor', first_name='Иван', last_name='Петров')
+        self.doctor = Doctor.objects.create(user=user, specialization='Терапевт', qualification='Высшая', experience=5)
+        self.slot = ScheduleSlot.objects.create(doctor=self.doctor, day_of_week='mon', start_time=time(9),
+                                                end_time=time(18), max_appointments=10)
+
+    def patient(self, username, email=None, **kwargs):
+        user = create_user(username, email=email if email is not None else f'{username}@example.com')
+        return GuestProfile.objects.create(user=user, first_name=username.title(), **kwargs)
+
+    def appointment(self, patient, procedure=None, day=TOMORROW, hour=10, status='scheduled'):
+        return Appointment.objects.create(patient=patient, procedure=procedure or self.massage, doctor=self.doctor,
+                                          schedule_slot=self.slot, appointment_date=day,
+                                          appointment_time=time(hour), status=status)
+
+    def test_one_message_per_patient_with_all_appointments(self):
+        anna = self.patient('anna', email='', middle_name='Петровна')
+        anna.email = 'profile@example.com'
+        anna.save()
+        self.appointment(anna, self.baths, hour=12)
+        self.appointment(anna, hour=10)
+        boris = self.patient('boris')
+        self.appointment(boris)
+        skipped = [self.appointment(boris, day=TODAY + timedelta(days=2)),
+                   self.appointment(boris, status='cancelled')]
+
+        self.assertEqual(reminders.send_reminders(), (2, 3))
+        message = EmailOutbox.objects.get(to='profile@example.com')
+        self.assertIn(TOMORROW.strftime('%d.%m.%Y'), message.subject)
+        self.assertIn('Anna Петровна', message.body)
+        self.assertLess(message.body.index('10:00 - Массаж спины'), message.body.index('12:00 - Жемчужная ванна'))
+        self.assertIn('Подготовка: Не есть за час', message.body)
+        self.assertTrue(EmailOutbox.objects.filter(to='boris@example.com').exists())
+        for appointment in skipped:
+            appointment.refresh_from_db()
+            self.assertIsNone(appointment.reminded_at)
+
+    def test_rerun_reminds_only_new_appointments(self):
+        anna = self.patient('anna')
+        self.appointment(anna)
+        self.assertEqual(reminders.send_reminders(), (1, 1))
+        self.assertEqual(reminders.send_reminders(), (0, 0))
+        self.appointment(anna, hour=15)
+        self.assertEqual(reminders.send_reminders(), (1, 1))
+        self.assertEqual(EmailOutbox.objects.filter(to='anna@example.com').count(), 2)
+
+    def test_patient_without_email_is_marked(self):
+        self.appointment(self.patient('anna', email=''))
+        self.assertEqual(reminders.send_reminders(), (0, 1))
+        self.assertFalse(Appointment.objects.filter(reminded_at__isnull=True).exists())
+
+    def test_queries_per_batch_do_not_grow_with_patients(self):
+        def queries(count, prefix):
+            for index in range(count):
+                self.appointment(self.patient(f'{prefix}{index}'))
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(reminders.send_reminders(batch_size=100), (count, count))
+            return len(context)
+
+        self.assertEqual(queries(2, 'small'), queries(30, 'large'))
+
+    def test_command_with_date(self):
+        day = TODAY + timedelta(days=3)
+        self.appointment(self.patient('anna'), day=day)
+        out = StringIO()
+        call_command('send_reminders', f'--date={day}', stdout=out)
+        self.assertIn('Писем в очереди: 1, записей отмечено: 1', out.getvalue())
@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .. import rollups
+from ..models import DailyRoomTypeStats
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+def stats_snapshot():
+    """Дни с продажами: дни без броней есть только после rebuild"""
+    return sorted(DailyRoomTypeStats.objects.exclude(booked_nights=0, arrivals=0, revenue=0)
+                  .values_list('date', 'room_type', 'booked_nights', 'arrivals', 'revenue'))
+
+
+class NightlyRevenueTests(SimpleTestCase):
+    def test_remainder_goes_to_the_last_night(self):
+        nights = rollups.nightly_revenue(date(2026, 1, 1), date(2026, 1, 4), Decimal('100'))
+        self.assertEqual([revenue for _, revenue in nights], [Decimal('33.33'), Decimal('33.33'), Decimal('33.34')])
+        self.assertEqual(rollups.nightly_revenue(date(2026, 1, 1), date(2026, 1, 1), Decimal('100')), [])
+
+
+class RollupTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('guest')
+        self.standard = create_room('101', price=Decimal('1000'))
+        self.lux = create_room('201', price=Decimal('3000'), room_type='lux')
+
+    def test_incremental_updates_match_rebuild(self):
+        booking = create_booking(self.user, self.standard, day(1), day(4))
+        moved = create_booking(self.user, self.standard, day(2), day(3), status='pending')
+        create_booking(self.user, self.lux, day(1), day(3), room_type='lux')
+        create_booking(self.user, self.lux, day(5), day(6), room_type='lux', status='cancelled')
+
+        moved.status = 'confirmed'
+        moved.check_out = day(5)
+        moved.save()
+        booking.status = 'cancelled'
+        booking.save()
+
+        incremental = stats_snapshot()
+        rollups.rebuild()
+        self.assertEqual(stats_snapshot(), incremental)
+        self.assertEqual(sum(row[2] for row in incremental), 3 + 2)
+
+    def test_report_reads_rollups(self):
+        create_booking(self.user, self.standard, day(1), day(3))
+        create_booking(self.user, self.lux, day(2), day(3), room_type='lux')
+        rollups.rebuild(day(0), day(9))
+
+        with self.assertNumQueries(1):
+            report = rollups.revenue_report(day(0), day(9), period='month')
+        total = report['total']
+        self.assertEqual((total['revenue'], total['booked_nights'], total['arrivals']), (Decimal('5000.00'), 3, 2))
+        self.assertEqual(total['adr'], Decimal('1666.67'))
+        # Фонд: 2 номера x 10 дней
+        self.assertEqual(total['occupancy'], 0.15)
+        self.assertEqual({item['room_type']: item['revenue'] for item in report['by_type']},
+                         {'comfort': Decimal('0.00'), 'lux': Decimal('3000.00'), 'standard': Decimal('2000.00')})
+
+    def test_api_validates_params_and_is_staff_only(self):
+        url = reverse('api_revenue_report')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(create_user('staff', is_staff=True))
+        create_booking(self.user, self.standard, day(1), day(2))
+        data = self.client.get(url, {'date_from': day(0), 'date_to': day(2), 'room_type': 'standard'}).json()
+        self.assertEqual((data['total']['revenue'], data['total']['booked_nights']), ('1000.00', 1))
+        for params in ({'period': 'year'}, {'room_type': 'castle'}, {'date_from': '2026-13-01'},
+                       {'date_from': day(5), 'date_to': day(1)}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
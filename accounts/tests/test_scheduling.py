@@ -0,0 +1,100 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import scheduling
+from ..models import Appointment, Doctor, GuestProfile, Procedure, ProcedureCategory, ScheduleSlot
+from .utils import IsolatedStorageMixin, TODAY, create_user
+
+# Понедельник не раньше чем через неделю: все слоты окна в будущем
+MONDAY = TODAY + timedelta(days=7 + (7 - TODAY.weekday()) % 7)
+TUESDAY = MONDAY + timedelta(days=1)
+
+
+class EarliestSlotTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        category = ProcedureCategory.objects.create(name='Массаж', description='Массаж')
+        self.procedure = Procedure.objects.create(name='Классический', category=category, description='Описание',
+                                                  duration=30, price=Decimal('1500'))
+        self.first, self.second = self.doctor('first'), self.doctor('second')
+        self.doctor('unqualified', qualified=False)
+        self.monday_first = self.slot(self.first, 'mon', 10)
+        self.monday_second = self.slot(self.second, 'mon', 10, capacity=2)
+        self.slot(self.first, 'mon', 9)
+        self.slot(self.second, 'tue', 8)
+        self.patient = GuestProfile.objects.create(user=create_user('guest'))
+
+    def doctor(self, username, qualified=True):
+        user = User.objects.create_user(username, first_name=username.title(), last_name='Врач')
+        doctor = Doctor.objects.create(user=user, specialization='Массажист', qualification='Высшая', experience=5)
+        if qualified:
+            doctor.procedures.add(self.procedure)
+        else:
+            self.slot(doctor, 'mon', 7)
+        return doctor
+
+    def slot(self, doctor, day_of_week, hour, capacity=1):
+        return ScheduleSlot.objects.create(doctor=doctor, day_of_week=day_of_week, start_time=time(hour),
+                                           end_time=time(hour + 1), max_appointments=capacity)
+
+    def book(self, slot, status='scheduled'):
+        Appointment.objects.create(patient=self.patient, procedure=self.procedure, doctor=slot.doctor,
+                                   schedule_slot=slot, appointment_date=MONDAY,
+                                   appointment_time=slot.start_time, status=status)
+
+    def earliest(self, limit=10, now=None):
+        slots = scheduling.earliest_slots(self.procedure.pk, MONDAY, TUESDAY, limit,
+                                          now=now or datetime.combine(TODAY, time()))
+        return [(slot.start.date(), slot.start.hour, slot.doctor_id, slot.free) for slot in slots]
+
+    def test_slots_of_qualified_doctors_merged_by_time(self):
+        with self.assertNumQueries(3):
+            found = self.earliest()
+        self.assertEqual(found, [
+            (MONDAY, 9, self.first.pk, 1),
+            (MONDAY, 10, self.first.pk, 1),
+            (MONDAY, 10, self.second.pk, 2),
+            (TUESDAY, 8, self.second.pk, 1),
+        ])
+        self.assertEqual(self.earliest(limit=2), found[:2])
+        # Индекс врачей - из кеша
+        with self.assertNumQueries(2):
+            self.earliest()
+
+    def test_booked_and_past_slots_are_skipped(self):
+        self.book(self.monday_first)
+        self.book(self.monday_second)
+        self.book(self.monday_second, status='cancelled')
+        self.assertEqual(self.earliest(), [
+            (MONDAY, 9, self.first.pk, 1),
+            (MONDAY, 10, self.second.pk, 1),
+            (TUESDAY, 8, self.second.pk, 1),
+        ])
+        self.assertEqual(self.earliest(now=datetime.combine(MONDAY, time(9, 30))),
+                         [(MONDAY, 10, self.second.pk, 1), (TUESDAY, 8, self.second.pk, 1)])
+
+    def test_index_follows_doctor_changes(self):
+        self.earliest()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.procedures.remove(self.procedure)
+        self.assertEqual({doctor_id for _, _, doctor_id, _ in self.earliest()}, {self.second.pk})
+
+    def test_api(self):
+        url = reverse('api_earliest_slots', args=[self.procedure.pk])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.patient.user)
+        data = self.client.get(url, {'date_from': MONDAY, 'days': 1, 'limit': 1}).json()
+        self.assertEqual(data['slots'], [{
+            'date': MONDAY.isoformat(), 'start_time': '09:00', 'end_time': '10:00', 'doctor_id': self.first.pk,
+            'doctor_name': 'First Врач', 'slot_id': data['slots'][0]['slot_id'], 'free': 1,
+        }])
+        self.assertEqual(self.client.get(url, {'days': scheduling.MAX_DAYS + 1}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_from': 'tomorrow'}).status_code, 400)
+
+        Procedure.objects.filter(pk=self.procedure.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import taskqueue
+from ..models import Task
+from ..taskqueue import task
+
+calls = []
+
+
+@task(name='tests.record', priority=3, max_attempts=2, timeout=60)
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        # execute закрывает соединение после задачи, а в тесте оно общее с транзакцией теста
+        patcher = mock.patch.object(taskqueue, 'connection')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_claimed(self, limit=10):
+        return [taskqueue.execute(pk, token) for pk, token in taskqueue.claim('worker', limit)]
+
+    def test_delay_enqueues_and_direct_call_runs_now(self):
+        queued = record.delay(1)
+        self.assertEqual((queued.name, queued.args, queued.priority, queued.max_attempts, queued.timeout),
+                         ('tests.record', [1], 3, 2, 60))
+        record(2)
+        self.assertEqual(calls, [2])
+        self.assertIn('tests.record', taskqueue.registered_tasks())
+
+    def test_claim_by_priority_and_run_at(self):
+        low = record.enqueue([1], priority=0)
+        high = record.enqueue([2], priority=9)
+        record.enqueue([3], countdown=60)
+        claimed = taskqueue.claim('worker', 1)
+        self.assertEqual([pk for pk, _ in claimed], [high.pk])
+        self.assertEqual([pk for pk, _ in taskqueue.claim('other', 10)], [low.pk])
+        self.assertEqual(taskqueue.claim('third', 10), [])
+
+        self.assertEqual(self.run_claimed(), [])
+        self.assertEqual(taskqueue.execute(high.pk, claimed[0][1]), 'done')
+        self.assertEqual(calls, [2])
+        high.refresh_from_db()
+        self.assertEqual((high.status, high.attempts, high.locked_by), ('done', 1, ''))
+
+    def test_failed_task_is_retried_with_backoff_then_fails(self):
+        queued = fail.delay()
+        with self.assertLogs('accounts.taskqueue', 'ERROR'):
+            self.assertEqual(self.run_claimed(), ['retry'])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'queued')
+        self.assertIn('RuntimeError: boom', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(self.run_claimed(), [])
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        with self.assertLogs('accounts.taskqueue', 'ERROR'):
+            self.assertEqual(self.run_claimed(), ['failed'])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+
+    def test_expired_lease_is_claimed_again(self):
+        queued = record.delay(1)
+        [(pk, first_token)] = taskqueue.claim('crashed', 1)
+        Task.objects.filter(pk=pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [(_, second_token)] = taskqueue.claim('worker', 1)
+        # Первый воркер очнулся - задача уже не его
+        self.assertEqual(taskqueue.execute(pk, first_token), 'lost')
+        self.assertEqual(taskqueue.execute(pk, second_token), 'done')
+        self.assertEqual(calls, [1])
+
+        Task.objects.filter(pk=queued.pk).update(status='running', attempts=2,
+                                                 locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(taskqueue.claim('worker', 1), [])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+
+    def test_unknown_task_fails(self):
+        Task.objects.create(name='tests.missing', max_attempts=3)
+        with self.assertLogs('accounts.taskqueue', 'ERROR'):
+            self.assertEqual(self.run_claimed(), ['failed'])
+        self.assertIn('не зарегистрирована', Task.objects.get().last_error)
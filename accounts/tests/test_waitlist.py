@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import waitlist
+from ..models import EmailOutbox, WaitlistEntry
+from .utils import IsolatedStorageMixin, create_booking, create_room, create_user, day
+
+
+class WaitlistTests(IsolatedStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.room = create_room('101')
+        self.owner = create_user('owner')
+        self.booking = create_booking(self.owner, self.room, day(10), day(15))
+
+    def join(self, username, check_in=None, check_out=None):
+        user = create_user(username)
+        return WaitlistEntry.objects.create(user=user, room_type='standard', check_in=check_in or day(10),
+                                            check_out=check_out or day(15), guests=1)
+
+    def cancel(self, booking):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'cancelled'
+            booking.save()
+
+    def test_cancellation_offers_nights_to_first_in_queue(self):
+        first = self.join('first')
+        second = self.join('second')
+
+        self.cancel(self.booking)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'offered')
+        self.assertEqual(first.offer.room, self.room)
+        self.assertEqual(first.offer.status, 'pending')
+        self.assertEqual(second.status, 'waiting')
+        self.assertTrue(EmailOutbox.objects.filter(to='first@example.com').exists())
+
+    def test_entry_outside_freed_nights_is_not_offered(self):
+        create_booking(self.owner, self.room, day(15), day(20))
+        entry = self.join('late', day(14), day(20))
+        self.cancel(self.booking)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')
+
+    def test_expired_offer_passes_to_next_in_queue(self):
+        first = self.join('first')
+        second = self.join('second')
+        self.cancel(self.booking)
+        WaitlistEntry.objects.filter(pk=first.pk).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(waitlist.expire_offers(), 1)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'expired')
+        self.assertEqual(first.offer.status, 'cancelled')
+        self.assertEqual(second.status, 'offered')
+
+    def test_expired_offer_cannot_be_accepted(self):
+        entry = self.join('first')
+        self.cancel(self.booking)
+        entry.refresh_from_db()
+        stale = WaitlistEntry.objects.get(pk=entry.pk)
+
+        self.assertTrue(waitlist.release(entry, 'expired'))
+        self.assertFalse(waitlist.accept(stale))
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'expired')
+
+    def test_guest_accepts_offer(self):
+        entry = self.join('first')
+        self.cancel(self.booking)
+        self.client.force_login(entry.user)
+
+        response = self.client.post(reverse('waitlist_respond', args=[entry.pk]), {'action': 'accept'})
+
+        self.assertRedirects(response, reverse('waitlist'), fetch_redirect_response=False)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'booked')
+        self.assertEqual(entry.offer.status, 'pending')
+
+    def test_declined_offer_passes_to_next_in_queue(self):
+        first = self.join('first')
+        second = self.join('second')
+        self.cancel(self.booking)
+        self.client.force_login(first.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('waitlist_respond', args=[first.pk]), {'action': 'decline'})
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'declined')
+        self.assertEqual(second.status, 'offered')
@@ -0,0 +1,61 @@
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import override_settings
+
+from .. import cache, ratelimit
+from ..models import Booking, Room
+
+TODAY = date.today()
+
+
+def day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def create_user(username, **kwargs):
+    kwargs.setdefault('email', f'{username}@example.com')
+    return User.objects.create_user(username, **kwargs)
+
+
+def create_room(name, capacity=2, price=Decimal('5000'), room_type='standard'):
+    return Room.objects.create(name=name, type=room_type, capacity=capacity, price_per_day=price,
+                               description='Номер')
+
+
+def create_booking(user, room, check_in, check_out, status='confirmed', room_type='standard', guests=1):
+    return Booking.objects.create(user=user, room=room, room_type=room_type, check_in=check_in,
+                                  check_out=check_out, guests=guests, status=status)
+
+
+class IsolatedStorageMixin:
+    """Версии кеша, лимиты и файлы - во временном каталоге, кеш очищается"""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_dir = Path(tmp.name)
+        storage = override_settings(
+            CACHE_VERSION_DB=self.tmp_dir / 'cache_versions.sqlite3',
+            RATE_LIMIT_DB=self.tmp_dir / 'rate_limit.sqlite3',
+            DOCUMENT_STORAGE_ROOT=self.tmp_dir / 'documents',
+            MEDIA_ROOT=self.tmp_dir / 'media',
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.addCleanup(reset_connections)
+        reset_connections()
+        caches['default'].clear()
+
+
+def reset_connections():
+    for module in (cache, ratelimit):
+        conn = getattr(module._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        module._local.conn = None
@@ -0,0 +1,216 @@
+# accounts/uploads.py
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+
+from .encryption import EncryptionService
+
+# Тип содержимого скана - только по расширению из белого списка
+# (DOCUMENT_ALLOWED_EXTENSIONS), заголовку браузера при загрузке не верим
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+}
+
+
+def document_path(storage_name):
+    """Полный путь к зашифрованному файлу по ссылке из EncryptedDocument"""
+    root = os.path.realpath(settings.DOCUMENT_STORAGE_ROOT)
+    path = os.path.realpath(os.path.join(root, storage_name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError('Недопустимый путь к документу')
+    return path
+
+
+def document_content_type(file_name):
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in settings.DOCUMENT_ALLOWED_EXTENSIONS:
+        return 'application/octet-stream'
+    return CONTENT_TYPES.get(extension, 'application/octet-stream')
+
+
+class DocumentReader:
+    """
+    Расшифрованное содержимое открытого файла по частям. close() закрывает
+    файл - его вызывает StreamingHttpResponse по завершении ответа.
+    """
+
+    def __init__(self, f, chunks):
+        self.file = f
+        self.chunks = chunks
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.chunks.close()
+        self.file.close()
+
+
+def read_document(storage_name, chunk_size=64 * 1024):
+    """
+    Открывает файл и проверяет его тег сразу, до ответа: отсутствующий файл -
+    FileNotFoundError, поврежденный - EncryptionError, а не оборванный 200.
+    """
+    f = open(document_path(storage_name), 'rb')
+    try:
+        decryptor = EncryptionService.stream_decryptor(f)
+        return DocumentReader(f, decryptor.read_chunks(f, chunk_size))
+    except BaseException:
+        f.close()
+        raise
+
+
+def new_storage_name():
+    token = uuid.uuid4().hex
+    return os.path.join(token[:2], f'{token}.enc')
+
+
+def reencrypt_document(storage_name, version, keys=None, chunk_size=64 * 1024):
+    """
+    Перешифровывает скан ключом версии version в новый файл хранилища;
+    возвращает его имя (None - файл уже зашифрован этим ключом). Файл
+    пишется во временный и переименовывается целиком, так что под именем
+    .enc недописанного файла не бывает. Исходный файл не меняется.
+    """
+    with open(document_path(storage_name), 'rb') as source:
+        decryptor = EncryptionService.stream_decryptor(source, keys=keys)
+        if decryptor.version == version:
+            return None
+        chunks = decryptor.read_chunks(source, chunk_size)
+
+        target_name = new_storage_name()
+        path = document_path(target_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        encryptor = EncryptionService.stream_encryptor(version=version, keys=keys)
+        try:
+            with open(tmp_path, 'wb') as target:
+                target.write(encryptor.start())
+                for chunk in chunks:
+                    target.write(encryptor.update(chunk))
+                target.write(encryptor.finalize())
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return target_name
+
+
+def delete_document_file(storage_name):
+    if storage_name:
+        try:
+            os.remove(document_path(storage_name))
+        except FileNotFoundError:
+            pass
+
+
+class EncryptedUploadedFile(UploadedFile):
+    """Результат потоковой загрузки: файл уже зашифрован и лежит в хранилище"""
+
+    def __init__(self, storage_name, name, content_type, size, sha256):
+        super().__init__(file=None, name=name, content_type=content_type, size=size)
+        self.storage_name = storage_name
+        self.sha256 = sha256
+
+    def open(self, mode=None):
+        raise ValueError('Файл зашифрован, используйте read_document()')
+
+
+class EncryptedFileUploadHandler(FileUploadHandler):
+    """
+    Шифрует загружаемый файл по частям и пишет его сразу на диск.
+
+    В памяти держится только один chunk (chunk_size), SHA-256 и размер
+    считаются на лету, превышение лимита прерывает прием файла.
+    """
+
+    chunk_size = 64 * 1024
+    # Форма ждет один файл в этом поле; остальные части запроса на диск не пишем
+    field = 'scan'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.DOCUMENT_MAX_UPLOAD_SIZE
+        self.error = None
+        self.destination = None
+        self.received = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Заведомо слишком большой запрос отклоняем до чтения тела
+        if content_length and content_length > self.max_size + 64 * 1024:
+            self.error = self.size_error()
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset,
+                         content_type_extra)
+        if self.error or field_name != self.field or self.received:
+            raise SkipFile()
+        self.received = True
+
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in settings.DOCUMENT_ALLOWED_EXTENSIONS:
+            self.error = f'Недопустимый формат файла. Разрешены: ' \
+                         f'{", ".join(settings.DOCUMENT_ALLOWED_EXTENSIONS)}'
+            raise SkipFile()
+
+        self.storage_name = new_storage_name()
+        self.path = document_path(self.storage_name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.encryptor = EncryptionService.stream_encryptor()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.destination = open(self.path, 'wb')
+        self.destination.write(self.encryptor.start())
+        # Стандартные обработчики (память/временный файл) не нужны
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > self.max_size:
+            self.error = self.size_error()
+            self.discard()
+            raise SkipFile()
+
+        self.sha256.update(raw_data)
+        self.destination.write(self.encryptor.update(raw_data))
+        # Не передаем данные следующим обработчикам (они буферизуют в память)
+        return None
+
+    def file_complete(self, file_size):
+        if self.destination is None:
+            return None
+        self.destination.write(self.encryptor.finalize())
+        self.destination.close()
+        self.destination = None
+        return EncryptedUploadedFile(
+            storage_name=self.storage_name,
+            name=self.file_name,
+            content_type=document_content_type(self.file_name),
+            size=self.size,
+            sha256=self.sha256.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def discard(self):
+        if self.destination is not None:
+            self.destination.close()
+            self.destination = None
+            delete_document_file(self.storage_name)
+
+    def size_error(self):
+        limit_mb = self.max_size // (1024 * 1024)
+        return f'Файл слишком большой (максимум {limit_mb} МБ)'
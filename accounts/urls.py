@@ -1,4 +1,5 @@
 # accounts/urls.py
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from .views import (
@@ -9,13 +10,25 @@ from .views import (
     BookingCreateView, UserBookingListView, AdminBookingListView,
     RoomListView, AdminRoomListView, AdminUserListView,
     ProfileUpdateView, booking_cancel, admin_change_booking_status,
-    api_room_availability, api_room_busy_dates,
+    api_room_availability, api_room_busy_dates, api_room_inventory, api_room_events,
+    api_earliest_slots, api_catalog, api_batch, admin_cache_stats, admin_rate_limit_stats, admin_query_report,
+    admin_revenue_report, api_revenue_report, admin_import,
     admin_toggle_user_active, admin_delete_user,
     redirect_based_on_role,
 )
 
+from . import views_async
+
+# Под ASGI API обслуживается асинхронными версиями представлений
+if settings.ASYNC_API_VIEWS:
+    api_room_availability = views_async.api_room_availability
+    api_room_busy_dates = views_async.api_room_busy_dates
+    api_room_events = views_async.api_room_events
+
 # Импортируем новые views
-from .views_documents import upload_documents, verify_documents
+from .views_documents import upload_documents, verify_documents, download_document
+from .views_exports import export_bookings, export_appointments, export_guests
+from .views_waitlist import waitlist_view, waitlist_respond
 
 urlpatterns = [
     # Главная страница (публичная)
@@ -38,6 +51,8 @@ urlpatterns = [
     path('booking/create/', BookingCreateView.as_view(), name='booking_create'),
     path('booking/list/', UserBookingListView.as_view(), name='user_booking_list'),
     path('booking/cancel/', booking_cancel, name='booking_cancel'),
+    path('booking/waitlist/', waitlist_view, name='waitlist'),
+    path('booking/waitlist/<int:entry_id>/respond/', waitlist_respond, name='waitlist_respond'),
 
     # Админ: управление бронированиями
     path('admin/bookings/', AdminBookingListView.as_view(), name='admin_booking_list'),
@@ -56,12 +71,43 @@ urlpatterns = [
     # Документы (новые пути)
     path('profile/documents/', upload_documents, name='upload_documents'),
     path('admin/users/<int:user_id>/verify-documents/', verify_documents, name='verify_documents'),
+    path('admin/documents/<int:document_id>/file/', download_document, name='download_document'),
 
     # Профиль (только для пользователей)
     path('profile/', ProfileView.as_view(), name='profile'),
     path('profile/edit/', ProfileUpdateView.as_view(), name='profile_edit'),
 
+    # Админ: статистика кеша
+    path('admin/cache/stats/', admin_cache_stats, name='admin_cache_stats'),
+
+    # Админ: ограничение частоты запросов к API (ratelimit.py)
+    path('admin/ratelimit/stats/', admin_rate_limit_stats, name='admin_rate_limit_stats'),
+
+    # Админ: SQL-запросы по страницам (QueryInspectorMiddleware)
+    path('admin/queries/', admin_query_report, name='admin_query_report'),
+
+    # Админ: выручка и загрузка по типам номеров (сводки rollups.py)
+    path('admin/reports/revenue/', admin_revenue_report, name='admin_revenue_report'),
+
+    # Админ: импорт справочников из CSV (imports.py)
+    path('admin/import/', admin_import, name='admin_import'),
+
+    # Админ: потоковые CSV-выгрузки (фильтры как в списках)
+    path('admin/bookings/export/', export_bookings, name='admin_export_bookings'),
+    path('admin/appointments/export/', export_appointments, name='admin_export_appointments'),
+    path('admin/guests/export/', export_guests, name='admin_export_guests'),
+
     # API endpoints
     path('api/room/availability/', api_room_availability, name='api_room_availability'),
     path('api/room/<int:room_id>/busy-dates/', api_room_busy_dates, name='api_room_busy_dates'),
+    path('api/rooms/inventory/', api_room_inventory, name='api_room_inventory'),
+    path('api/rooms/events/', api_room_events, name='api_room_events'),
+    path('api/procedures/<int:procedure_id>/earliest-slots/', api_earliest_slots, name='api_earliest_slots'),
+    path('api/reports/revenue/', api_revenue_report, name='api_revenue_report'),
+
+    # Версионированный API справочников (только чтение)
+    path('api/v1/<slug:resource>/', api_catalog, name='api_catalog'),
+
+    # Несколько запросов к API одним POST (batch.py)
+    path('api/batch/', api_batch, name='api_batch'),
 ]
\ No newline at end of file
@@ -6,7 +6,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.db.models import Count, Sum, Avg, Q, Max
 
 # Импорт из datetime
@@ -14,7 +14,7 @@ from datetime import date, timedelta, datetime
 import json
 
 # Импорт из других модулей проекта
-from .forms import GuestRegistrationForm, BookingForm, GuestProfileForm, AdminCreateUserForm
+from .forms import GuestRegistrationForm, BookingForm, GuestProfileForm, AdminCreateUserForm, CsvImportForm
 from .procedure_forms import AppointmentForm, MedicalRecordForm, ScheduleSlotForm
 from .models import Booking, Room, GuestProfile, Procedure, ProcedureCategory, Doctor, ScheduleSlot, Appointment, MedicalRecord, TreatmentEntry
 
@@ -22,6 +22,16 @@ from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
 from .mixins import StaffRequiredMixin, NotStaffMixin
+from django.conf import settings
+from . import batch, cache, catalog_api, inventory, procedure_catalog, ratelimit, rollups, scheduling
+from .middleware import query_report
+from .filters import filter_appointments, filter_bookings
+from .imports import IMPORTERS, import_csv
+from .availability import (
+    ApiError, availability_request, overlapping_bookings,
+    availability_payload, busy_dates_window, busy_periods_queryset, busy_period,
+    busy_dates_payload, room_not_found,
+)
 # ГЛАВНАЯ СТРАНИЦА (публичная)
 def home(request):
     """Главная страница - информационная для всех."""
@@ -160,6 +170,10 @@ class RoomListView(ListView):
         context['filter_params'] = self.request.GET.copy()
         if 'page' in context['filter_params']:
             del context['filter_params']['page']
+        # Бейдж "осталось N": свободные номера типа на сегодняшнюю ночь
+        rooms_left = inventory.rooms_left_tonight()
+        for room in context['rooms']:
+            room.rooms_left = rooms_left.get(room.type)
         return context
 
 
@@ -174,31 +188,7 @@ class AdminBookingListView(StaffRequiredMixin, ListView):
 
     def get_queryset(self):
         queryset = Booking.objects.select_related('user', 'room').order_by('-created_at')
-
-        # Фильтры
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        room_type = self.request.GET.get('room_type')
-        if room_type:
-            queryset = queryset.filter(room__type=room_type)
-
-        date_from = self.request.GET.get('date_from')
-        if date_from:
-            try:
-                queryset = queryset.filter(check_in__gte=date_from)
-            except ValueError:
-                pass
-
-        date_to = self.request.GET.get('date_to')
-        if date_to:
-            try:
-                queryset = queryset.filter(check_out__lte=date_to)
-            except ValueError:
-                pass
-
-        return queryset
+        return filter_bookings(queryset, self.request.GET)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -218,6 +208,17 @@ class AdminRoomListView(StaffRequiredMixin, ListView):
     def get_queryset(self):
         return Room.objects.all().order_by('type', 'name')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Сводка одним запросом
+        context['room_stats'] = Room.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            lux=Count('id', filter=Q(type='lux')),
+            avg_price=Avg('price_per_day'),
+        )
+        return context
+
 
 # АДМИН: ИЗМЕНЕНИЕ СТАТУСА БРОНИРОВАНИЯ
 @require_POST
@@ -442,129 +443,199 @@ class ProceduresView(NotStaffMixin, TemplateView):
 
 
 # API ФУНКЦИИ (доступны всем авторизованным)
+# Асинхронные версии для ASGI - в views_async.py, общая логика - в availability.py
 @require_GET
 @login_required
 def api_room_availability(request):
     """API для проверки доступности номера"""
-    room_id = request.GET.get('room_id')
-    check_in_str = request.GET.get('check_in')
-    check_out_str = request.GET.get('check_out')
+    try:
+        room_id, check_in, check_out = availability_request(request.GET)
 
-    if not all([room_id, check_in_str, check_out_str]):
-        return JsonResponse({
-            'success': False,
-            'error': 'Необходимы параметры: room_id, check_in, check_out'
-        }, status=400)
+        def build():
+            try:
+                room = Room.objects.get(id=room_id, is_active=True)
+            except Room.DoesNotExist:
+                raise room_not_found()
+            is_available = not overlapping_bookings(room.id, check_in, check_out).exists()
+            return availability_payload(room, check_in, check_out, is_available)
 
-    try:
-        # Получаем номер
-        room = Room.objects.get(id=room_id, is_active=True)
-
-        # Парсим даты
-        check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-        check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-
-        # Проверяем корректность дат
-        if check_in >= check_out:
-            return JsonResponse({
-                'success': False,
-                'error': 'Дата выезда должна быть позже даты заезда'
-            })
-
-        if check_in < datetime.now().date():
-            return JsonResponse({
-                'success': False,
-                'error': 'Нельзя бронировать на прошедшую дату'
-            })
-
-        # Проверяем доступность
-        overlapping_bookings = Booking.objects.filter(
-            room=room,
-            status__in=['pending', 'confirmed'],
-            check_in__lt=check_out,
-            check_out__gt=check_in
-        )
+        payload = cache.cached([cache.room_bookings(room_id), cache.ROOMS],
+                               f'availability:{room_id}:{check_in}:{check_out}', build)
+        return JsonResponse(payload)
 
-        is_available = not overlapping_bookings.exists()
-
-        # Рассчитываем стоимость
-        days = (check_out - check_in).days
-        total_price = room.price_per_day * days
-
-        # Формируем ответ
-        response_data = {
-            'success': True,
-            'room': {
-                'id': room.id,
-                'name': room.name,
-                'type': room.get_type_display(),
-                'capacity': room.capacity
-            },
-            'check_in': check_in_str,
-            'check_out': check_out_str,
-            'days': days,
-            'price_per_day': float(room.price_per_day),
-            'total_price': float(total_price),
-            'available': is_available,
-            'message': 'Номер доступен' if is_available else 'Номер занят на выбранные даты'
-        }
-
-        return JsonResponse(response_data)
-
-    except Room.DoesNotExist:
-        return JsonResponse({
-            'success': False,
-            'error': 'Номер не найден'
-        }, status=404)
-    except ValueError as e:
-        return JsonResponse({
-            'success': False,
-            'error': f'Неверный формат даты: {str(e)}'
-        }, status=400)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
 
 
 @require_GET
 def api_room_busy_dates(request, room_id):
     """API для получения занятых дат номера"""
+    # Бронирования на ближайшие 3 месяца
+    date_from, date_to = busy_dates_window()
+
+    def build():
+        try:
+            room = Room.objects.get(id=room_id, is_active=True)
+        except Room.DoesNotExist:
+            raise room_not_found()
+        busy_periods = [busy_period(row) for row in busy_periods_queryset(room.id, date_from, date_to)]
+        return busy_dates_payload(room, busy_periods, date_from, date_to)
+
     try:
-        room = Room.objects.get(id=room_id, is_active=True)
-
-        # Получаем бронирования на ближайшие 3 месяца
-        three_months_later = datetime.now().date() + timedelta(days=90)
-
-        bookings = Booking.objects.filter(
-            room=room,
-            status__in=['pending', 'confirmed'],
-            check_out__gte=datetime.now().date(),
-            check_in__lte=three_months_later
-        ).order_by('check_in')
-
-        # Формируем список занятых периодов
-        busy_periods = []
-        for booking in bookings:
-            busy_periods.append({
-                'start': booking.check_in.isoformat(),
-                'end': booking.check_out.isoformat(),
-                'status': booking.status,
-                'guests': booking.guests
-            })
-
-        return JsonResponse({
-            'success': True,
-            'room_id': room.id,
-            'room_name': room.name,
-            'busy_periods': busy_periods,
-            'period': {
-                'from': datetime.now().date().isoformat(),
-                'to': three_months_later.isoformat()
-            }
-        })
+        payload = cache.cached([cache.room_bookings(room_id), cache.ROOMS],
+                               f'busy_dates:{room_id}:{date_from}', build)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    return JsonResponse(payload)
+
+
+@require_GET
+def api_room_inventory(request):
+    """Свободные номера по типам на каждую ночь (по умолчанию - на полгода вперед)"""
+    try:
+        payload = inventory.inventory_payload(*inventory.parse_inventory_params(request.GET))
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    return JsonResponse(payload)
+
+
+@require_GET
+@login_required
+def api_earliest_slots(request, procedure_id):
+    """Ближайшие свободные слоты на процедуру у всех ее врачей (scheduling.py)"""
+    try:
+        procedure = scheduling.get_procedure(procedure_id)
+        date_from, date_to, limit = scheduling.parse_slot_params(request.GET)
+        slots = scheduling.earliest_slots(procedure.pk, date_from, date_to, limit)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    return JsonResponse(scheduling.slots_payload(procedure, date_from, date_to, slots))
+
+
+@require_GET
+def api_catalog(request, resource):
+    """Справочники для мобильного приложения: поля ?fields=, страницы ?cursor= (catalog_api.py)"""
+    try:
+        params = catalog_api.parse_catalog_params(catalog_api.get_resource(resource), request.GET)
+        body, etag = catalog_api.render_page(resource, *params)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
 
-    except Room.DoesNotExist:
-        return JsonResponse({
-            'success': False,
-            'error': 'Номер не найден'
-        }, status=404)
+
+@require_GET
+def api_room_events(request):
+    """Поток изменений занятости работает только под ASGI (views_async.api_room_events)"""
+    return JsonResponse({'success': False, 'error': 'Поток событий доступен только под ASGI'}, status=501)
+
+
+@require_POST
+def api_batch(request):
+    """Несколько GET-запросов к API одним POST в одной транзакции (batch.py)"""
+    try:
+        items = batch.parse_batch(request.body)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    # Пакет стоит столько же, сколько его подзапросы по отдельности
+    if not ratelimit.charge(request, len(items) - 1):
+        return JsonResponse({'success': False, 'error': 'Слишком много запросов, повторите позже'}, status=429)
+    return HttpResponse(batch.run_batch(request, items), content_type='application/json')
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def admin_cache_stats(request):
+    """Попадания/промахи кеша в текущем процессе (только для админа)"""
+    return JsonResponse(cache.cache_stats())
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def admin_rate_limit_stats(request):
+    """Счетчики ограничения частоты API (только для админа)"""
+    return JsonResponse(ratelimit.rate_limit_stats())
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def admin_query_report(request):
+    """Сводка SQL-запросов и вероятных N+1 по страницам (только для админа)"""
+    if request.method == 'POST':
+        query_report.reset()
+        messages.success(request, 'Статистика запросов сброшена')
+        return redirect('admin_query_report')
+
+    return render(request, 'admin/query_report.html', {
+        'routes': query_report.rows(),
+        'enabled': settings.QUERY_INSPECTOR_ENABLED,
+        'threshold': settings.QUERY_INSPECTOR_N1_THRESHOLD,
+    })
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def admin_revenue_report(request):
+    """Выручка, ADR и загрузка по дням/неделям/месяцам (только для админа)"""
+    context = {
+        'period_choices': [('day', 'По дням'), ('week', 'По неделям'), ('month', 'По месяцам')],
+        'room_type_choices': Room.TYPE_CHOICES,
+    }
+    try:
+        report = rollups.revenue_report(*rollups.parse_report_params(request.GET))
+    except ApiError as e:
+        context['error'] = e.message
+    else:
+        labels = dict(Room.TYPE_CHOICES)
+        for row in report['rows'] + report['by_type']:
+            row['room_type_label'] = labels.get(row['room_type'], row['room_type'])
+        context['report'] = report
+    return render(request, 'admin/revenue_report.html', context)
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def api_revenue_report(request):
+    """JSON-версия отчета по выручке (читает только сводки)"""
+    try:
+        report = rollups.revenue_report(*rollups.parse_report_params(request.GET))
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    return JsonResponse(rollups.report_payload(report))
+
+
+# АДМИН: ИМПОРТ СПРАВОЧНИКОВ ИЗ CSV
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def admin_import(request):
+    """Загрузка номеров, процедур, врачей и расписания из CSV (только для админа)"""
+    result = None
+    form = CsvImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        try:
+            result = import_csv(form.cleaned_data['kind'], form.cleaned_data['file'],
+                                dry_run=form.cleaned_data['dry_run'])
+        except ValueError as e:
+            form.add_error('file', str(e))
+
+    importers = [
+        {'kind': kind, 'title': importer.title, 'columns': importer.fields + importer.extra_columns,
+         'required': importer.required}
+        for kind, importer in IMPORTERS.items()
+    ]
+    return render(request, 'admin/import.html', {
+        'form': form, 'result': result, 'importers': importers,
+        'dry_run': result is not None and form.cleaned_data['dry_run'],
+    })
 
 
 # ДЕКОРАТОР ДЛЯ ПЕРЕНАПРАВЛЕНИЯ АДМИНОВ
@@ -681,17 +752,17 @@ class ProcedureListView(ListView):
     context_object_name = 'procedures'
 
     def get_queryset(self):
-        queryset = Procedure.objects.filter(is_active=True).select_related('category')
+        # Из кешированного каталога (procedure_catalog.py), без запросов к базе
+        self.catalog = procedure_catalog.get_catalog()
 
         category_id = self.request.GET.get('category')
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-
-        return queryset
+        category_id = int(category_id) if category_id and category_id.isdecimal() else None
+        return procedure_catalog.catalog_procedures(self.catalog, category_id)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = ProcedureCategory.objects.all()
+        # Категории с числом процедур и диапазонами цен и длительности
+        context['categories'] = self.catalog['categories']
         return context
 
 
@@ -713,9 +784,13 @@ class AppointmentCreateView(NotStaffMixin, CreateView):
         return context
 
     def get_available_slots(self):
-        """Получение доступных слотов для записи"""
-        # Здесь будет логика получения свободных слотов
-        return []
+        """Ближайшие свободные слоты на процедуру из ?procedure="""
+        procedure_id = self.request.GET.get('procedure', '')
+        if not procedure_id.isdecimal():
+            return []
+        date_from = date.today()
+        return scheduling.earliest_slots(int(procedure_id), date_from,
+                                         date_from + timedelta(days=scheduling.DEFAULT_DAYS - 1))
 
     def form_valid(self, form):
         appointment = form.save(commit=False)
@@ -734,14 +809,14 @@ class AppointmentCreateView(NotStaffMixin, CreateView):
         return reverse_lazy('patient_appointments')
 
     def is_slot_available(self, appointment):
-        """Проверка доступности слота"""
-        existing_appointments = Appointment.objects.filter(
-            doctor=appointment.doctor,
-            appointment_date=appointment.appointment_date,
-            appointment_time=appointment.appointment_time,
-            status__in=['scheduled', 'completed']
-        )
-        return not existing_appointments.exists()
+        """Проверка доступности слота - по тому же правилу, что и поиск свободных (scheduling.py)"""
+        slot = scheduling.schedule_slot_for(appointment.doctor_id, appointment.appointment_date,
+                                            appointment.appointment_time)
+        if slot is None:
+            # Время не совпадает с началом слота в расписании врача
+            return False
+        appointment.schedule_slot = slot
+        return scheduling.slot_has_place(slot, appointment.appointment_date)
 
 
 @method_decorator(login_required, name='dispatch')
@@ -792,6 +867,16 @@ class AdminProcedureListView(StaffRequiredMixin, ListView):
     template_name = 'admin/procedures/list.html'
     context_object_name = 'procedures'
 
+    def get_queryset(self):
+        # Все процедуры, включая неактивные, из кешированного каталога
+        self.catalog = procedure_catalog.get_catalog()
+        return procedure_catalog.catalog_procedures(self.catalog, active_only=False)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['categories'] = self.catalog['categories']
+        return context
+
 
 @method_decorator(login_required, name='dispatch')
 class AdminDoctorsListView(StaffRequiredMixin, ListView):
@@ -813,25 +898,7 @@ class AdminAppointmentsListView(StaffRequiredMixin, ListView):
         queryset = Appointment.objects.select_related(
             'patient', 'procedure', 'doctor'
         ).order_by('-appointment_date', '-appointment_time')
-
-        # Фильтры
-        status = self.request.GET.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        doctor_id = self.request.GET.get('doctor')
-        if doctor_id:
-            queryset = queryset.filter(doctor_id=doctor_id)
-
-        date_from = self.request.GET.get('date_from')
-        if date_from:
-            queryset = queryset.filter(appointment_date__gte=date_from)
-
-        date_to = self.request.GET.get('date_to')
-        if date_to:
-            queryset = queryset.filter(appointment_date__lte=date_to)
-
-        return queryset
+        return filter_appointments(queryset, self.request.GET)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
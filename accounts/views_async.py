@@ -0,0 +1,92 @@
+# accounts/views_async.py
+"""
+Асинхронные версии JSON API для запуска под ASGI (uvicorn).
+
+Логика общая с синхронными представлениями (см. availability.py),
+запросы выполняются через асинхронный ORM без пула потоков.
+"""
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import cache, events
+from .availability import (
+    ApiError, availability_request, overlapping_bookings,
+    availability_payload, busy_dates_window, busy_periods_queryset, busy_period,
+    busy_dates_payload, room_not_found,
+)
+from .models import Room
+
+
+def async_login_required(view_func):
+    """Аналог login_required для async-представлений"""
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+@require_GET
+@async_login_required
+async def api_room_availability(request):
+    """API для проверки доступности номера (async)"""
+    try:
+        room_id, check_in, check_out = availability_request(request.GET)
+
+        async def build():
+            try:
+                room = await Room.objects.aget(id=room_id, is_active=True)
+            except Room.DoesNotExist:
+                raise room_not_found()
+            is_available = not await overlapping_bookings(room.id, check_in, check_out).aexists()
+            return availability_payload(room, check_in, check_out, is_available)
+
+        payload = await cache.acached([cache.room_bookings(room_id), cache.ROOMS],
+                                      f'availability:{room_id}:{check_in}:{check_out}', build)
+        return JsonResponse(payload)
+
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+
+
+@require_GET
+async def api_room_busy_dates(request, room_id):
+    """API для получения занятых дат номера (async)"""
+    date_from, date_to = busy_dates_window()
+
+    async def build():
+        try:
+            room = await Room.objects.aget(id=room_id, is_active=True)
+        except Room.DoesNotExist:
+            raise room_not_found()
+        busy_periods = [busy_period(row) async for row in busy_periods_queryset(room.id, date_from, date_to)]
+        return busy_dates_payload(room, busy_periods, date_from, date_to)
+
+    try:
+        payload = await cache.acached([cache.room_bookings(room_id), cache.ROOMS],
+                                      f'busy_dates:{room_id}:{date_from}', build)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+    return JsonResponse(payload)
+
+
+@require_GET
+async def api_room_events(request):
+    """Изменения занятости номеров ?room_id=... (server-sent events, см. events.py)"""
+    try:
+        room_ids = events.parse_room_ids(request.GET)
+    except ApiError as e:
+        return JsonResponse(e.payload(), status=e.status)
+
+    response = StreamingHttpResponse(events.stream(room_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,30 +1,57 @@
 # accounts/views_documents.py
+import logging
+import os
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
+from django.http import Http404, HttpResponseServerError, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from .encryption import EncryptionError
 from .forms_documents import DocumentUploadForm
 from .models import GuestProfile, EncryptedDocument
+from .uploads import EncryptedFileUploadHandler, delete_document_file, document_content_type, read_document
 from django.contrib.auth.models import User
 
+logger = logging.getLogger(__name__)
+
 
+@csrf_exempt
 @login_required
 def upload_documents(request):
-    """Упрощенная страница загрузки документов"""
+    """Загрузка документов: скан шифруется потоково, без буферизации в памяти"""
+    # Обработчик нужно подменить до чтения request.POST (в т.ч. CSRF-проверкой)
+    request.upload_handlers = [EncryptedFileUploadHandler(request)]
+    return _upload_documents(request)
+
+
+@csrf_protect
+def _upload_documents(request):
     profile, created = GuestProfile.objects.get_or_create(user=request.user)
 
     if request.method == 'POST':
-        form = DocumentUploadForm(request.POST)
+        form = DocumentUploadForm(request.POST, request.FILES)
+        upload_error = request.upload_handlers[0].error
+        if upload_error:
+            form.add_error('scan', upload_error)
+
+        scan = request.FILES.get('scan')
         if form.is_valid():
             try:
                 document_type = form.cleaned_data['document_type']
 
-                # Создаем запись документа
-                document = EncryptedDocument.objects.create(
+                # Создаем запись документа (маска считается при шифровании)
+                document = EncryptedDocument(
                     profile=profile,
                     document_type=document_type,
                     uploaded_by=request.user
                 )
+                document.set_data(form.get_document_data())
+                if scan:
+                    document.attach_file(scan)
+                document.save()
 
                 # Обновляем статус профиля
                 profile.document_status = 'pending'
@@ -34,12 +61,17 @@ def upload_documents(request):
                 return redirect('profile')
 
             except Exception as e:
+                if scan:
+                    delete_document_file(scan.storage_name)
                 messages.error(request, f'Ошибка: {str(e)}')
+        elif scan:
+            # Форма не прошла проверку - файл в хранилище не нужен
+            delete_document_file(scan.storage_name)
     else:
         form = DocumentUploadForm()
 
-    # Получаем существующие документы
-    documents = profile.documents.all()
+    # Получаем существующие документы (шифротекст списку не нужен)
+    documents = profile.documents.defer('encrypted_data')
 
     return render(request, 'documents/upload.html', {
         'form': form,
@@ -84,11 +116,45 @@ def verify_documents(request, user_id):
         except EncryptedDocument.DoesNotExist:
             messages.error(request, 'Документ не найден')
 
-    # Получаем все документы пользователя
-    documents = profile.documents.all()
+    # Получаем все документы пользователя (шифротекст списку не нужен)
+    documents = profile.documents.select_related('verified_by').defer('encrypted_data')
 
     return render(request, 'admin/verify_documents.html', {
         'profile_user': user,
         'profile': profile,
         'documents': documents,
-    })
\ No newline at end of file
+    })
+
+
+@login_required
+@permission_required('accounts.can_verify_documents', raise_exception=True)
+def download_document(request, document_id):
+    """Потоковая выдача расшифрованного скана документа"""
+    document = get_object_or_404(EncryptedDocument.objects.exclude(file_name=''), id=document_id)
+    # Файл открывается и проверяется до заголовков ответа: поврежденный -
+    # 500, а не обрезанный ответ с кодом 200
+    try:
+        content = read_document(document.file_name)
+    except EncryptionError as e:
+        # Подкласс ValueError: проверяется до ветки "файл не найден"
+        logger.error('Скан документа %s не расшифрован: %s', document.id, e)
+        return HttpResponseServerError('Файл документа поврежден или зашифрован неизвестным ключом',
+                                       content_type='text/plain; charset=utf-8')
+    except (FileNotFoundError, ValueError):
+        # ValueError - путь вне хранилища (document_path)
+        raise Http404('Файл документа не найден')
+
+    # Тип - по расширению из белого списка, а не сохраненный от браузера:
+    # иначе загруженный гостем HTML/SVG выполнился бы у сотрудника
+    extension = os.path.splitext(document.original_name)[1].lower()
+    if extension not in settings.DOCUMENT_ALLOWED_EXTENSIONS:
+        extension = ''
+    response = StreamingHttpResponse(
+        content,
+        content_type=document_content_type(document.original_name)
+    )
+    response['Content-Length'] = document.file_size
+    response['Content-Disposition'] = f'attachment; filename="document-{document.id}{extension}"'
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,42 @@
+# accounts/views_exports.py
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .exports import APPOINTMENT_COLUMNS, BOOKING_COLUMNS, GUEST_COLUMNS, csv_response
+from .filters import filter_appointments, filter_bookings, filter_guests
+from .models import Appointment, Booking, GuestProfile
+
+
+def _filename(name):
+    return f"{name}_{timezone.localdate():%Y%m%d}.csv"
+
+
+# Выгрузки сортируются по id (первичный ключ), чтобы первые строки
+# приходили без сортировки всей таблицы
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def export_bookings(request):
+    """CSV-выгрузка бронирований с фильтрами списка бронирований"""
+    queryset = filter_bookings(Booking.objects.order_by('-id'), request.GET)
+    return csv_response(_filename('bookings'), BOOKING_COLUMNS, queryset)
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def export_appointments(request):
+    """CSV-выгрузка записей на процедуры (status, doctor, date_from, date_to)"""
+    queryset = filter_appointments(Appointment.objects.order_by('-id'), request.GET)
+    return csv_response(_filename('appointments'), APPOINTMENT_COLUMNS, queryset)
+
+
+@require_GET
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def export_guests(request):
+    """CSV-выгрузка профилей гостей без медицинских и паспортных данных"""
+    queryset = filter_guests(GuestProfile.objects.order_by('-id'), request.GET)
+    return csv_response(_filename('guests'), GUEST_COLUMNS, queryset)
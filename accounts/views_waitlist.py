@@ -0,0 +1,46 @@
+# accounts/views_waitlist.py
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from . import waitlist
+from .forms import WaitlistForm
+from .models import WaitlistEntry
+
+
+@login_required
+@user_passes_test(lambda u: not u.is_staff)
+def waitlist_view(request):
+    """Лист ожидания гостя: новые записи и ответ на предложения"""
+    form = WaitlistForm(request.POST or None, user=request.user, initial={'guests': 1})
+    if request.method == 'POST' and form.is_valid():
+        form.save()
+        return redirect('waitlist')
+
+    entries = (WaitlistEntry.objects.filter(user=request.user)
+               .select_related('room', 'offer__room').order_by('-created_at')[:50])
+    return render(request, 'waitlist.html', {'form': form, 'entries': entries, 'now': timezone.now()})
+
+
+@require_POST
+@login_required
+@user_passes_test(lambda u: not u.is_staff)
+def waitlist_respond(request, entry_id):
+    """Принять или отклонить предложение, либо выйти из листа ожидания"""
+    entry = get_object_or_404(WaitlistEntry.objects.select_related('offer'), pk=entry_id, user=request.user)
+    action = request.POST.get('action')
+
+    if entry.status == 'offered':
+        # Просроченное предложение принять нельзя, даже если задача его еще не сняла
+        if action == 'accept' and entry.offer_expires_at > timezone.now() and entry.offer:
+            if not waitlist.accept(entry):
+                messages.error(request, 'Предложение уже истекло')
+        elif action in ('accept', 'decline'):
+            waitlist.release(entry, 'declined' if action == 'decline' else 'expired')
+    elif entry.status == 'waiting' and action == 'leave':
+        entry.status = 'cancelled'
+        entry.save(update_fields=['status'])
+
+    return redirect('waitlist')
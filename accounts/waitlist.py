@@ -0,0 +1,158 @@
+# accounts/waitlist.py
+"""
+Лист ожидания (WaitlistEntry): освободившиеся после отмены ночи
+предлагаются гостям, которые их ждали.
+
+При отмене брони номера match_cancellation выбирает кандидатов одним
+диапазонным запросом по индексу waitlist_match_idx (тип номера + дата
+заезда в окне вокруг освободившихся ночей), а не просмотром всего листа.
+Занятость номера в том же окне сливается в отсортированный список
+интервалов; кандидаты в порядке очереди проверяют его бинарным поиском,
+и каждый подошедший получает удерживающую бронь (pending) на HOLD_DURATION
+и письмо с предложением. Не принятое вовремя предложение снимает задача
+expire_waitlist_offers: удерживающая бронь отменяется, и эта отмена
+передает ночи следующему в очереди.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import outbox
+from .availability import ACTIVE_BOOKING_STATUSES, BusyIntervals
+from .models import Booking, WaitlistEntry
+
+HOLD_DURATION = timedelta(hours=4)
+# Насколько раньше и позже освободившихся ночей может выходить период кандидата
+MATCH_WINDOW_DAYS = 60
+# Кандидатов на одну отмену: больше в освободившиеся ночи все равно не поместится
+MAX_CANDIDATES = 200
+HOLD_NOTE = 'Удерживается для гостя из листа ожидания'
+
+
+def candidates_for(room, start, end):
+    """Ожидающие записи, чей период задевает ночи [start, end) номера room"""
+    window_start = max(date.today(), start - timedelta(days=MATCH_WINDOW_DAYS))
+    return (
+        WaitlistEntry.objects
+        .filter(status='waiting', room_type=room.type,
+                check_in__gte=window_start, check_in__lt=end,
+                check_out__gt=start, check_out__lte=end + timedelta(days=MATCH_WINDOW_DAYS),
+                guests__lte=room.capacity)
+        .filter(Q(room__isnull=True) | Q(room=room))
+        .select_related('user')
+        .order_by('created_at', 'pk')[:MAX_CANDIDATES]
+    )
+
+
+def match_cancellation(booking):
+    """
+    Предлагает ночи отмененной брони гостям из листа ожидания. Вызывается
+    в транзакции отмены; возвращает записи, получившие предложение.
+    """
+    room = booking.room
+    start, end = max(booking.check_in, date.today()), booking.check_out
+    if room is None or not room.is_active or start >= end:
+        return []
+
+    candidates = list(candidates_for(room, start, end))
+    if not candidates:
+        return []
+
+    window_start = min(entry.check_in for entry in candidates)
+    window_end = max(entry.check_out for entry in candidates)
+    busy = BusyIntervals(
+        Booking.objects.filter(room=room, status__in=ACTIVE_BOOKING_STATUSES,
+                               check_in__lt=window_end, check_out__gt=window_start)
+        .values_list('check_in', 'check_out')
+    )
+
+    offered = []
+    expires_at = timezone.now() + HOLD_DURATION
+    for entry in candidates:
+        # Не предлагаем ночи тому, кто только что от них отказался
+        if entry.user_id == booking.user_id or not busy.is_free(entry.check_in, entry.check_out):
+            continue
+        hold(entry, room, expires_at)
+        busy.add(entry.check_in, entry.check_out)
+        offered.append(entry)
+    return offered
+
+
+def hold(entry, room, expires_at):
+    """Удерживающая бронь и письмо с предложением"""
+    booking = Booking(user=entry.user, room=room, room_type=room.type, check_in=entry.check_in,
+                      check_out=entry.check_out, guests=entry.guests, status='pending', notes=HOLD_NOTE)
+    # Вместо письма о новой заявке гость получает предложение
+    booking.skip_notification = True
+    booking.save()
+
+    entry.status = 'offered'
+    entry.offer = booking
+    entry.offer_expires_at = expires_at
+    entry.save(update_fields=['status', 'offer', 'offer_expires_at'])
+    notify_offer(entry)
+
+
+def notify_offer(entry):
+    if not entry.user.email:
+        return
+    booking = entry.offer
+    body = render_to_string('emails/waitlist_offer.txt', {'entry': entry, 'booking': booking, 'user': entry.user})
+    outbox.enqueue(entry.user.email, f'Освободился номер {booking.room.name} на ваши даты', body,
+                   f'waitlist:{entry.pk}:offer:{booking.pk}')
+
+
+def booking_status_changed(booking, previous_status):
+    """
+    Реакция на смену статуса брони (сигнал post_save): удерживающая бронь
+    закрывает предложение, отмена активной брони запускает подбор.
+    Возвращает записи, получившие предложение.
+    """
+    if booking.status in ('cancelled', 'confirmed'):
+        WaitlistEntry.objects.filter(offer=booking, status='offered').update(
+            status='declined' if booking.status == 'cancelled' else 'booked'
+        )
+    if booking.status == 'cancelled' and previous_status in ACTIVE_BOOKING_STATUSES:
+        return match_cancellation(booking)
+    return []
+
+
+def accept(entry):
+    """
+    Гость принимает предложение: бронь остается и ждет подтверждения
+    администратора. Условный UPDATE: если предложение тем временем сняли
+    (истекло, задача expire_waitlist_offers), возвращает False.
+    """
+    accepted = WaitlistEntry.objects.filter(
+        pk=entry.pk, status='offered', offer_expires_at__gt=timezone.now(),
+    ).update(status='booked')
+    if accepted:
+        entry.status = 'booked'
+    return bool(accepted)
+
+
+def release(entry, status):
+    """
+    Снимает предложение (отказ или истечение): ночи уходят следующему в
+    очереди. Если гость успел принять предложение, ничего не делает.
+    """
+    with transaction.atomic():
+        if not WaitlistEntry.objects.filter(pk=entry.pk, status='offered').update(status=status):
+            return False
+        entry.status = status
+        booking = entry.offer
+        if booking is not None and booking.status == 'pending':
+            booking.status = 'cancelled'
+            booking.skip_notification = True
+            booking.save()
+    return True
+
+
+def expire_offers():
+    """Снимает просроченные предложения; возвращает их число"""
+    due = list(WaitlistEntry.objects.filter(status='offered', offer_expires_at__lte=timezone.now())
+               .select_related('offer__room', 'offer__user'))
+    return sum(release(entry, 'expired') for entry in due)
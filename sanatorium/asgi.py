@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sanatorium.settings')
+# Под ASGI JSON API и поток изменений занятости (SSE, accounts/events.py)
+# обслуживают async-представления (accounts/views_async.py)
+os.environ.setdefault('DJANGO_ASYNC_API_VIEWS', '1')
 
 application = get_asgi_application()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,8 +38,15 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.ratelimit.RateLimitMiddleware',
+    'accounts.middleware.QueryInspectorMiddleware',
 ]
 
+# Подсчет SQL-запросов и поиск N+1 по страницам (заголовок X-Query-Stats,
+# отчет /accounts/admin/queries/). Включается переменной DJANGO_QUERY_INSPECTOR=1
+QUERY_INSPECTOR_ENABLED = os.environ.get('DJANGO_QUERY_INSPECTOR') == '1'
+QUERY_INSPECTOR_N1_THRESHOLD = 5
+
 ROOT_URLCONF = 'sanatorium.urls'
 
 TEMPLATES = [
@@ -59,6 +67,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'sanatorium.wsgi.application'
 
+# Асинхронные версии JSON API (accounts/views_async.py).
+# Включаются в sanatorium/asgi.py, под WSGI остаются синхронные
+ASYNC_API_VIEWS = os.environ.get('DJANGO_ASYNC_API_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
@@ -71,6 +83,41 @@ DATABASES = {
 }
 
 
+# Ключи шифрования документов (версия -> секрет).
+# Новые данные шифруются версией ENCRYPTION_KEY_VERSION; старые версии
+# остаются здесь, пока не отработает manage.py rotate_encryption_key
+ENCRYPTION_KEYS = {
+    1: 'django-insecure-documents-key-v1',
+}
+ENCRYPTION_KEY_VERSION = 1
+
+
+# Кеш: записи локальны для процесса, а версии пространств имен
+# (accounts/cache.py) общие для всех процессов через SQLite-файл
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sanatorium',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+CACHE_VERSION_DB = BASE_DIR / 'cache_versions.sqlite3'
+
+# Ограничение частоты запросов к API (accounts/ratelimit.py): ведро на
+# RATE_LIMIT_BURST запросов, пополняется на RATE_LIMIT_RATE в секунду.
+# Ведра общие для всех процессов через SQLite-файл
+RATE_LIMIT_ENABLED = os.environ.get('DJANGO_RATE_LIMIT', '1') == '1'
+RATE_LIMIT_PATH_PREFIX = '/accounts/api/'
+RATE_LIMIT_RATE = 5
+RATE_LIMIT_BURST = 60
+# Сколько секунд клиенту сверх лимита отдается его последний ответ
+RATE_LIMIT_CACHED_TIMEOUT = 30
+RATE_LIMIT_DB = BASE_DIR / 'rate_limit.sqlite3'
+# Брать IP из X-Forwarded-For (только за своим прокси)
+RATE_LIMIT_TRUST_FORWARDED = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -106,7 +153,31 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
 STATIC_URL = 'static/'
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Загруженные файлы (фото номеров, врачей)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Уменьшенные копии фото (WebP/JPEG), см. accounts/images.py
+IMAGE_VARIANT_WIDTHS = [320, 640, 1024]
+IMAGE_VARIANT_WORKERS = 2
+
+# Сканы документов: хранятся зашифрованными вне MEDIA_ROOT
+DOCUMENT_STORAGE_ROOT = BASE_DIR / 'private' / 'documents'
+DOCUMENT_MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20 МБ
+DOCUMENT_ALLOWED_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png']
+
+# Почта уходит через EmailOutbox и команду send_outbox (accounts/outbox.py).
+# По умолчанию письма печатаются в консоль; DJANGO_EMAIL_HOST включает SMTP
+# (локально - заглушка: python manage.py smtp_sink)
+EMAIL_HOST = os.environ.get('DJANGO_EMAIL_HOST', '')
+EMAIL_PORT = int(os.environ.get('DJANGO_EMAIL_PORT', '25'))
+EMAIL_TIMEOUT = 30
+if EMAIL_HOST:
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+else:
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = os.environ.get('DJANGO_DEFAULT_FROM_EMAIL', 'noreply@sanatorium.local')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include  # ← Полный импорт!
 from django.shortcuts import redirect  # ← Для главной
@@ -11,3 +13,6 @@ urlpatterns = [
     path('', lambda request: redirect('home') if request.user.is_authenticated
           else redirect('login'), name='index'),
 ]
+
+# Фото номеров/врачей и их уменьшенные копии в режиме разработки
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)